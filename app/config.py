@@ -1,36 +1,104 @@
-from pydantic_settings import BaseSettings
-from dotenv import load_dotenv
-import os
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional
 
-load_dotenv()
+ENV_CONFIG = SettingsConfigDict(env_file='.env', extra='ignore')
 
 
 class DB_Settings(BaseSettings):
-    DB_HOST: str = os.environ.get('DB_HOST')
-    DB_PORT: int = os.environ.get('DB_PORT')
-    DB_USER: str = os.environ.get('DB_USER')
-    DB_PASSWORD: str = os.environ.get('DB_PASSWORD')
-    DB_NAME: str = os.environ.get('DB_NAME')
+    model_config = ENV_CONFIG
 
-    DB_TEST_HOST: str = os.environ.get('DB_TEST_HOST')
-    DB_TEST_PORT: int = os.environ.get('DB_TEST_PORT')
-    DB_TEST_USER: str = os.environ.get('DB_TEST_USER')
-    DB_TEST_PASSWORD: str = os.environ.get('DB_TEST_PASSWORD')
-    DB_TEST_NAME: str = os.environ.get('DB_TEST_NAME')
+    DB_HOST: str
+    DB_PORT: int
+    DB_USER: str
+    DB_PASSWORD: str
+    DB_NAME: str
 
+    DB_TEST_HOST: Optional[str] = None
+    DB_TEST_PORT: Optional[int] = None
+    DB_TEST_USER: Optional[str] = None
+    DB_TEST_PASSWORD: Optional[str] = None
+    DB_TEST_NAME: Optional[str] = None
 
 
 class TokenSettings(BaseSettings):
-    ALGORITHM: str = os.environ.get('ALGORITHM')
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES')
-    REFRESH_TOKEN_EXPIRE_MINUTES: int = os.environ.get('REFRESH_TOKEN_EXPIRE_MINUTES')
-    JWT_SECRET_KEY: str = os.environ.get('JWT_SECRET_KEY')
-    JWT_REFRESH_SECRET_KEY: str = os.environ.get('JWT_REFRESH_SECRET_KEY')
+    model_config = ENV_CONFIG
+
+    ALGORITHM: str
+    ACCESS_TOKEN_EXPIRE_MINUTES: int
+    REFRESH_TOKEN_EXPIRE_MINUTES: int
+    JWT_SECRET_KEY: str
+    JWT_REFRESH_SECRET_KEY: str
+
+
+class ValidatorSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    APA_RULE_PROFILES: Dict[str, List[str]] = {}
+
+
+class UploadSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    UPLOAD_MAX_UNCOMPRESSED_BYTES: int = 200 * 1024 * 1024
+    UPLOAD_MAX_COMPRESSION_RATIO: float = 100
+    UPLOAD_MAX_ZIP_ENTRIES: int = 5000
+    USER_STORAGE_QUOTA_BYTES: int = 200 * 1024 * 1024
+    ANNOTATED_CACHE_MAX_BYTES: int = 500 * 1024 * 1024
+
+
+class SchedulerSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    SCHEDULER_SMALL_WORKERS: int = 2
+    SCHEDULER_LARGE_WORKERS: int = 1
+    SCHEDULER_MAX_QUEUED_PER_USER: int = 20
+    SCHEDULER_LARGE_DOCUMENT_BYTES: int = 5 * 1024 * 1024
+    SCHEDULER_LARGE_DOCUMENT_XML_BYTES: int = 2 * 1024 * 1024
+    SCHEDULER_LARGE_DOCUMENT_PARAGRAPHS: int = 2000
+
+
+class RateLimitSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    RATE_LIMIT_BACKEND: Literal["memory", "database"] = "memory"
+    RATE_LIMIT_UPLOADS_PER_MINUTE: int = 10
+    RATE_LIMIT_CHECKS_PER_MINUTE: int = 30
+
+
+class LoggingSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    LOG_LEVEL: str = "INFO"
+    LOG_SLOW_REQUEST_MS: float = 500
+    LOG_SLOW_QUERY_MS: float = 100
+    LOG_SLOW_SAMPLE_RATE: float = 1.0
+    LOG_SLOW_MAX_PER_MINUTE: int = 10
+
+
+class TracingSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    # Fraction of requests traced; 0 turns tracing off except for callers sending a sampled traceparent.
+    TRACING_SAMPLE_RATE: float = 0.0
+    TRACING_EXPORTER: Literal["console", "file"] = "console"
+    TRACING_FILE: str = "traces.jsonl"
 
 
 class Settings(BaseSettings):
-    db: DB_Settings = DB_Settings()
-    token: TokenSettings = TokenSettings()
+    model_config = ENV_CONFIG
+
+    db: DB_Settings = Field(default_factory=DB_Settings)
+    token: TokenSettings = Field(default_factory=TokenSettings)
+    validator: ValidatorSettings = Field(default_factory=ValidatorSettings)
+    upload: UploadSettings = Field(default_factory=UploadSettings)
+    scheduler: SchedulerSettings = Field(default_factory=SchedulerSettings)
+    rate_limit: RateLimitSettings = Field(default_factory=RateLimitSettings)
+    logging: LoggingSettings = Field(default_factory=LoggingSettings)
+    tracing: TracingSettings = Field(default_factory=TracingSettings)
 
 
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
@@ -1,39 +1,257 @@
-from database.settings import get_session
+from database.settings import get_session, get_sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException
-from schemas.document import DocumentResponseSchema, FormattingSuggestionResponse
+from schemas.document import AutofixResponse, DocumentResponseSchema, FormattingSuggestionResponse, \
+    DocumentVersionSchema, DocumentVersionDiffSchema
+from utils.docx_inspect import DocxInspection, inspect_docx
+from utils.docx_store import store_docx_parts, build_docx, diff_manifests
+from services.scheduler import get_scheduler, SchedulerQueueFull
+from services.tracing import traced
 from sqlalchemy import select, func
-from models.document import Document, FormattingSuggestion
-from utils.helper_apa import APAValidator
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
+from models.document import Document, DocumentVersion, FormattingSuggestion
+from crud.search import index_document, index_issues
+from crud.statistics import record_issue_statistics
+from config import get_settings
+import asyncio
+import hashlib
 import os
-from typing import Optional
+import json
+import logging
+import shutil
+import tempfile
+import uuid
+from typing import AsyncIterator, Optional, List, Tuple
 
+DOCUMENT_PARTS_DIR = "document_parts"
 
+logger = logging.getLogger("app.document")
+
+
+@traced()
 async def document_create(user_id: int,
                           file_path: str,
                           file_name: str,
                           db: AsyncSession = Depends(get_session),
+                          inspection: Optional[DocxInspection] = None,
                           ) -> DocumentResponseSchema:
     new_document = Document(
         user_id=user_id,
         file_path=file_path,
         file_name=file_name,
+        **(inspection.model_dump() if inspection else {}),
     )
 
     db.add(new_document)
+    await db.flush()
+    await create_document_version(new_document, file_path, file_name, db)
+    await index_document(new_document, db, is_new=True)
 
     await db.commit()
     await db.refresh(new_document)
 
-    return DocumentResponseSchema.from_orm(new_document)
+    return DocumentResponseSchema.model_validate(new_document)
+
+
+def document_parts_dir(document_id: int) -> str:
+    return os.path.join(DOCUMENT_PARTS_DIR, str(document_id))
+
+
+@traced()
+async def get_latest_version(document_id: int, db: AsyncSession) -> Optional[DocumentVersion]:
+    result = await db.execute(
+        select(DocumentVersion)
+        .where(DocumentVersion.document_id == document_id)
+        .order_by(DocumentVersion.version.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
+
+
+@traced()
+async def create_document_version(document: Document, file_path: str, file_name: str,
+                                  db: AsyncSession) -> DocumentVersion:
+    latest = await get_latest_version(document.id, db)
+    manifest, stored_bytes = await asyncio.to_thread(store_docx_parts, file_path, document_parts_dir(document.id))
+    version = DocumentVersion(
+        document_id=document.id,
+        version=latest.version + 1 if latest else 1,
+        file_name=file_name,
+        size_bytes=os.path.getsize(file_path),
+        stored_bytes=stored_bytes,
+        manifest=manifest,
+    )
+    db.add(version)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Only reachable where FOR UPDATE is not supported (SQLite), see document_add_version.
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Another version of this document was uploaded at the same "
+                                                    "time, try again.")
+    return version
+
+
+async def is_file_shared(file_path: str, document_id: int, db: AsyncSession) -> bool:
+    # Uploads from before unique file names may point several documents at the same file.
+    result = await db.execute(
+        select(select(Document.id).where(Document.file_path == file_path, Document.id != document_id).exists())
+    )
+    return result.scalar()
+
+
+@traced()
+async def get_owned_document(document_id: int, user_id: int, db: AsyncSession,
+                             for_update: bool = False) -> Document:
+    statement = select(Document).filter(Document.id == document_id)
+    if for_update:
+        statement = statement.with_for_update()
+    result = await db.execute(statement)
+    document = result.scalars().first()
+
+    if not document:
+        raise HTTPException(status_code=404, detail=f"Document with id {document_id} not found.")
+
+    if document.user_id != user_id:
+        raise HTTPException(status_code=403, detail="You do not have permission to access this document")
+
+    return document
+
+
+@traced()
+async def document_add_version(user_id: int,
+                               document_id: int,
+                               file_path: str,
+                               file_name: str,
+                               db: AsyncSession,
+                               inspection: Optional[DocxInspection] = None,
+                               ) -> DocumentVersion:
+    """Store ``file_path`` as the next version of a document and make it the working copy.
+
+    Parts that differ from every earlier version are added to the part store in full,
+    unchanged ones are reused; there are no deltas within a part. Documents
+    uploaded before versioning existed get their current file recorded as version 1 first.
+    """
+    # Locked until the commit, concurrent uploads then number their versions one after another.
+    document = await get_owned_document(document_id, user_id, db, for_update=True)
+
+    if await get_latest_version(document.id, db) is None and os.path.exists(document.file_path):
+        await create_document_version(document, document.file_path, document.file_name, db)
+
+    version = await create_document_version(document, file_path, file_name, db)
+
+    previous_path = document.file_path
+    document.file_path = file_path
+    document.file_name = file_name
+    # Charged against the quota, keep it the size of the current working copy.
+    document.size_bytes = os.path.getsize(file_path)
+    for field, value in (inspection.model_dump() if inspection else {}).items():
+        setattr(document, field, value)
+    await index_document(document, db)
+
+    await db.commit()
+    await db.refresh(version, ["formatting_suggestions"])
+
+    if previous_path != file_path and os.path.exists(previous_path) \
+            and not await is_file_shared(previous_path, document.id, db):
+        os.remove(previous_path)
+
+    return version
+
+
+@traced()
+async def get_document_versions(document_id: int, user_id: int, db: AsyncSession) -> List[DocumentVersionSchema]:
+    await get_owned_document(document_id, user_id, db)
+    result = await db.execute(
+        select(DocumentVersion)
+        .where(DocumentVersion.document_id == document_id)
+        .options(selectinload(DocumentVersion.formatting_suggestions))
+        .order_by(DocumentVersion.version)
+    )
+    return [DocumentVersionSchema.model_validate(version) for version in result.scalars().all()]
+
+
+@traced()
+async def get_document_version(document_id: int, version: int, user_id: int, db: AsyncSession) -> DocumentVersion:
+    await get_owned_document(document_id, user_id, db)
+    result = await db.execute(
+        select(DocumentVersion)
+        .where(DocumentVersion.document_id == document_id, DocumentVersion.version == version)
+    )
+    document_version = result.scalars().first()
+
+    if not document_version:
+        raise HTTPException(status_code=404, detail=f"Version {version} of document {document_id} not found.")
+
+    return document_version
+
+
+@traced()
+async def build_document_version_file(document_id: int, version: int, user_id: int,
+                                      db: AsyncSession) -> Tuple[str, str]:
+    """Reassemble a stored version into a temporary file; the caller removes it once sent.
 
+    Returns the temporary path and the file name the version was uploaded with.
+    """
+    document_version = await get_document_version(document_id, version, user_id, db)
 
+    file_descriptor, path = tempfile.mkstemp(suffix=".docx")
+    os.close(file_descriptor)
+    try:
+        await asyncio.to_thread(build_docx, document_version.manifest, document_parts_dir(document_id), path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, document_version.file_name
+
+
+@traced()
+async def diff_document_versions(document_id: int, from_version: int, to_version: int, user_id: int,
+                                 db: AsyncSession) -> DocumentVersionDiffSchema:
+    old = await get_document_version(document_id, from_version, user_id, db)
+    new = await get_document_version(document_id, to_version, user_id, db)
+
+    return DocumentVersionDiffSchema(
+        document_id=document_id,
+        from_version=from_version,
+        to_version=to_version,
+        **diff_manifests(old.manifest, new.manifest),
+    )
+
+
+@traced()
+async def get_user_storage_bytes(user_id: int, db: AsyncSession) -> int:
+    """Bytes the user's documents take on disk: each working copy plus the parts stored for its versions.
+
+    The working copy is kept as a whole file next to the part store, so both count.
+    """
+    working_copies = (
+        select(func.coalesce(func.sum(Document.size_bytes), 0))
+        .where(Document.user_id == user_id)
+        .scalar_subquery()
+    )
+    stored_parts = (
+        select(func.coalesce(func.sum(DocumentVersion.stored_bytes), 0))
+        .join(Document, Document.id == DocumentVersion.document_id)
+        .where(Document.user_id == user_id)
+        .scalar_subquery()
+    )
+    result = await db.execute(select(working_copies + stored_parts))
+    return result.scalar_one()
+
+
+@traced()
 async def document_delete(user_id: int,
                           document_id: int,
                           db: AsyncSession = Depends(get_session),
                           ):
+    # The cascade visits every version's suggestions, load them all up front instead of one query per version.
     document = await db.execute(
         select(Document).filter(Document.id == document_id)
+        .options(selectinload(Document.formatting_suggestions),
+                 selectinload(Document.versions).selectinload(DocumentVersion.formatting_suggestions),
+                 selectinload(Document.search_entry))
     )
     document = document.scalars().first()
 
@@ -43,46 +261,227 @@ async def document_delete(user_id: int,
     if document.user_id != user_id:
         raise HTTPException(status_code=403, detail="You do not have permission to delete this document")
 
-    if os.path.exists(document.file_path):
+    if os.path.exists(document.file_path) and not await is_file_shared(document.file_path, document.id, db):
         os.remove(document.file_path)
+    shutil.rmtree(document_parts_dir(document.id), ignore_errors=True)
+    shutil.rmtree(annotated_files_dir(document.id), ignore_errors=True)
 
     await db.delete(document)
     await db.commit()
 
 
-async def create_formatting_suggestions(document_id: int, db: AsyncSession) -> FormattingSuggestionResponse:
-    result = await db.execute(select(Document).filter(Document.id == document_id))
-    document = result.scalars().first()
+@traced()
+async def get_document_for_check(document_id: int, user_id: int, db: AsyncSession,
+                                 profile: str = "full",
+                                 skip: Optional[List[str]] = None) -> Tuple[Document, List[str]]:
+    # Only the rule registry is needed here, the checks themselves run in the scheduler's worker processes.
+    from utils.helper_apa import select_rules
+
+    try:
+        rules = select_rules(profile, skip, get_settings().validator.APA_RULE_PROFILES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return await get_owned_document(document_id, user_id, db), rules
+
+
+@traced()
+async def create_formatting_suggestions(document_id: int, db: AsyncSession,
+                                        user_id: int,
+                                        profile: str = "full",
+                                        skip: Optional[List[str]] = None,
+                                        max_issues: Optional[int] = None) -> FormattingSuggestionResponse:
+    document, rules = await get_document_for_check(document_id, user_id, db, profile, skip)
+
+    try:
+        issues, truncated, rule_counts = await get_scheduler().validate(user_id, document, rules, max_issues)
+    except SchedulerQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    # A truncated run stopped early, its counts would understate the rules it never reached.
+    if not truncated:
+        await record_issue_statistics(document.user_id, rule_counts, db)
+    return await save_formatting_suggestion(document_id, issues, truncated, db)
+
+
+@traced()
+async def stream_formatting_suggestions(document: Document, rules: List[str], user_id: int,
+                                        max_issues: Optional[int] = None) -> AsyncIterator[str]:
+    try:
+        async for event in get_scheduler().stream(user_id, document, rules, max_issues):
+            if event["event"] == "result":
+                # The request's session is closed before a streamed body runs, the result gets a session of its own.
+                async with get_sessionmaker()() as db:
+                    if not event["truncated"]:
+                        await record_issue_statistics(document.user_id, event["rule_counts"], db)
+                    formatting_suggestion = await save_formatting_suggestion(
+                        document.id, event["issues"], event["truncated"], db)
+                yield sse_event("done", formatting_suggestion.model_dump_json())
+            else:
+                yield sse_event(event["event"], json.dumps(event))
+    except SchedulerQueueFull as e:
+        yield sse_event("error", json.dumps({"detail": str(e)}))
+    except Exception:
+        # The response has started already, the client can only learn of the failure from an event.
+        logger.exception("Streamed check of document %s failed", document.id)
+        yield sse_event("error", json.dumps({"detail": "The check failed."}))
+
+
+ANNOTATED_FILES_DIR = "annotated_files"
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def annotated_files_dir(document_id: int) -> str:
+    return os.path.join(ANNOTATED_FILES_DIR, str(document_id))
+
+
+def prune_annotated_files(max_bytes: int, keep: str) -> None:
+    """Remove the least recently used annotated files, other than ``keep``, until the cache fits in ``max_bytes``."""
+    entries = []
+    for directory, _, names in os.walk(ANNOTATED_FILES_DIR):
+        for name in names:
+            # .tmp files are annotations still being written.
+            if not name.endswith(".docx"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+@traced()
+async def get_annotated_document(document: Document, rules: List[str], user_id: int) -> str:
+    """Return the path of ``document`` annotated with Word comments, cached by content hash and rule version.
+
+    Each document has its own cache directory, removed with the document; all of them together
+    are kept under ``ANNOTATED_CACHE_MAX_BYTES`` by evicting the least recently used files.
+    """
+    from utils.helper_apa import RULES_VERSION
+
+    if document.user_id != user_id:
+        raise HTTPException(status_code=403, detail="You do not have permission to access this document")
+
+    content_hash = await asyncio.to_thread(file_sha256, document.file_path)
+    rules_hash = hashlib.sha256(",".join(sorted(rules)).encode()).hexdigest()[:12]
+    cache_dir = annotated_files_dir(document.id)
+    annotated_path = os.path.join(cache_dir, f"{content_hash}-v{RULES_VERSION}-{rules_hash}.docx")
+    if os.path.exists(annotated_path):
+        # The modification time doubles as the last use for the LRU eviction.
+        os.utime(annotated_path)
+        return annotated_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+    os.close(file_descriptor)
+    try:
+        await get_scheduler().annotate(user_id, document, rules, temporary_path)
+        os.replace(temporary_path, annotated_path)
+    except SchedulerQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+    await asyncio.to_thread(prune_annotated_files, get_settings().upload.ANNOTATED_CACHE_MAX_BYTES, annotated_path)
+    return annotated_path
+
+
+@traced()
+async def create_autofixed_document(document_id: int, db: AsyncSession, user_id: int) -> AutofixResponse:
+    document = await get_owned_document(document_id, user_id, db)
+
+    stem = os.path.splitext(document.file_name)[0]
+    output_path = os.path.join(os.path.dirname(document.file_path), f"{stem}_apa_fixed_{uuid.uuid4().hex[:8]}.docx")
+    try:
+        try:
+            fixes = await get_scheduler().autofix(user_id, document, output_path)
+        except SchedulerQueueFull as e:
+            raise HTTPException(status_code=429, detail=str(e))
+
+        upload_settings = get_settings().upload
+        with open(output_path, "rb") as output_file:
+            inspection = await asyncio.to_thread(
+                inspect_docx, output_file,
+                max_uncompressed_bytes=upload_settings.UPLOAD_MAX_UNCOMPRESSED_BYTES,
+                max_compression_ratio=upload_settings.UPLOAD_MAX_COMPRESSION_RATIO,
+                max_entries=upload_settings.UPLOAD_MAX_ZIP_ENTRIES)
+        used_bytes = await get_user_storage_bytes(user_id, db)
+        if used_bytes + inspection.size_bytes > upload_settings.USER_STORAGE_QUOTA_BYTES:
+            raise HTTPException(status_code=413, detail="Storage quota exceeded, delete some documents first.")
+
+        version = await document_add_version(user_id, document_id, output_path, document.file_name, db, inspection)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+
+    return AutofixResponse(document=DocumentResponseSchema.model_validate(document), version=version.version,
+                           fixes=fixes)
+
+
+def sse_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
 
-    if not document:
-        raise HTTPException(status_code=404, detail=f"Document with id {document_id} not found.")
 
+@traced()
+async def save_formatting_suggestion(document_id: int, issues: List[str], truncated: bool,
+                                     db: AsyncSession) -> FormattingSuggestionResponse:
+    latest_version = await get_latest_version(document_id, db)
+    version_id = latest_version.id if latest_version else None
     result = await db.execute(
-        select(FormattingSuggestion).where(FormattingSuggestion.document_id == document_id)
+        select(FormattingSuggestion).where(FormattingSuggestion.document_id == document_id,
+                                           FormattingSuggestion.version_id == version_id)
     )
     existing_suggestion = result.scalars().first()
-    apa_validator = APAValidator()
-    issues = apa_validator.validate_document(document.file_path)
     suggestion = "\n".join(issues)
+    suggestion_status = "partial" if truncated else "complete"
     if existing_suggestion:
         existing_suggestion.description = suggestion
+        existing_suggestion.status = suggestion_status
         existing_suggestion.created_at = func.now()
         formatting_suggestion = existing_suggestion
     else:
-        new_suggestion = FormattingSuggestion(document_id=document_id, description=suggestion)
+        new_suggestion = FormattingSuggestion(document_id=document_id, version_id=version_id, description=suggestion,
+                                              status=suggestion_status)
         db.add(new_suggestion)
         formatting_suggestion = new_suggestion
+    await index_issues(document_id, issues, db)
 
     await db.commit()
     await db.refresh(formatting_suggestion)
 
-    return FormattingSuggestionResponse.from_orm(formatting_suggestion)
+    return FormattingSuggestionResponse.model_validate(formatting_suggestion)
 
 
+@traced()
 async def get_formatting_suggestion_by_document_id(document_id: int, db: AsyncSession) -> Optional[
     FormattingSuggestionResponse]:
     result = await db.execute(
-        select(FormattingSuggestion).where(FormattingSuggestion.document_id == document_id)
+        select(FormattingSuggestion)
+        .where(FormattingSuggestion.document_id == document_id)
+        .order_by(FormattingSuggestion.id.desc())
+        .limit(1)
     )
 
     formatting_suggestion = result.scalars().first()
@@ -91,9 +490,10 @@ async def get_formatting_suggestion_by_document_id(document_id: int, db: AsyncSe
         raise HTTPException(status_code=404,
                             detail=f"No formatting suggestion found for document with id {document_id}")
 
-    return FormattingSuggestionResponse.from_orm(formatting_suggestion)
+    return FormattingSuggestionResponse.model_validate(formatting_suggestion)
 
 
+@traced()
 async def delete_formatting_suggestion(formatting_suggestion: int, db: AsyncSession) -> None:
     result = await db.execute(
         select(FormattingSuggestion).where(FormattingSuggestion.id == formatting_suggestion)
@@ -0,0 +1,118 @@
+import asyncio
+import re
+from typing import List, Optional
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, func, literal_column, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.document import Document
+from models.search import DocumentSearch
+from schemas.document import DocumentResponseSchema
+from schemas.search import SearchHit, SearchResponse
+from services.tracing import traced
+from utils.docx_text import extract_docx_text
+
+# The FTS5 table is created by DDL events on document_search, it is not part of Base.metadata.
+document_search_fts = Table(
+    "document_search_fts", MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("file_name", Text),
+    Column("content", Text),
+    Column("issues", Text),
+)
+FTS_TOKEN = re.compile(r"\w+", re.UNICODE)
+SNIPPET_WORDS = 12
+
+
+@traced()
+async def index_document(document: Document, db: AsyncSession, is_new: bool = False) -> None:
+    """Add or refresh the search entry of ``document`` from its current file; the caller commits."""
+    content = await asyncio.to_thread(extract_docx_text, document.file_path)
+    entry = None if is_new else await db.get(DocumentSearch, document.id)
+    if entry is None:
+        db.add(DocumentSearch(document_id=document.id, user_id=document.user_id,
+                              file_name=document.file_name, content=content))
+    else:
+        entry.file_name = document.file_name
+        entry.content = content
+
+
+@traced()
+async def index_issues(document_id: int, issues: List[str], db: AsyncSession) -> None:
+    await db.execute(
+        update(DocumentSearch).where(DocumentSearch.document_id == document_id).values(issues="\n".join(issues))
+    )
+
+
+def fts5_query(query: str) -> Optional[str]:
+    # Quote every word so user input can never be read as FTS5 syntax; the last one matches as a prefix.
+    tokens = FTS_TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"' for token in tokens) + "*"
+
+
+def postgres_search_statement(user_id: int, query: str):
+    ts_query = func.websearch_to_tsquery("english", query)
+    search_vector = literal_column("document_search.search_vector")
+    rank = func.ts_rank_cd(search_vector, ts_query)
+    snippet = func.ts_headline("english", func.coalesce(DocumentSearch.content, DocumentSearch.issues), ts_query,
+                               f"MaxFragments=1, MaxWords={SNIPPET_WORDS}, MinWords=4")
+    return (
+        select(Document, rank.label("rank"), snippet.label("snippet"), func.count().over().label("total"))
+        .join(DocumentSearch, DocumentSearch.document_id == Document.id)
+        .where(DocumentSearch.user_id == user_id, search_vector.op("@@")(ts_query))
+        .order_by(rank.desc(), Document.id.desc())
+    )
+
+
+def sqlite_search_statement(user_id: int, query: str):
+    fts = document_search_fts
+    # bm25 is lower-is-better; weights follow the Postgres setweight order: file name, issues, then body text.
+    # FTS5 auxiliary functions refuse to run next to a window function, so the matches are ranked first in a
+    # materialized CTE; left to itself SQLite would flatten it and run the MATCH once for every document of the user.
+    matches = (
+        select(
+            fts.c.rowid,
+            (-func.bm25(literal_column(fts.name), 10.0, 1.0, 5.0)).label("rank"),
+            func.snippet(literal_column(fts.name), 1, "<b>", "</b>", "...", SNIPPET_WORDS).label("snippet"),
+        )
+        .where(literal_column(fts.name).op("MATCH")(query))
+        .cte("matches")
+        .prefix_with("MATERIALIZED")
+    )
+    return (
+        select(Document, matches.c.rank, matches.c.snippet, func.count().over().label("total"))
+        .join(DocumentSearch, DocumentSearch.document_id == Document.id)
+        .join(matches, matches.c.rowid == Document.id)
+        .where(DocumentSearch.user_id == user_id)
+        .order_by(matches.c.rank.desc(), Document.id.desc())
+    )
+
+
+def search_statement(user_id: int, query: str, dialect_name: str):
+    """The search for ``dialect_name``, or ``None`` if ``query`` has nothing to search for."""
+    if dialect_name == "postgresql":
+        return postgres_search_statement(user_id, query)
+    query = fts5_query(query)
+    if query is None:
+        return None
+    return sqlite_search_statement(user_id, query)
+
+
+@traced()
+async def search_documents(user_id: int, query: str, db: AsyncSession,
+                           limit: int = 20, offset: int = 0) -> SearchResponse:
+    statement = search_statement(user_id, query, db.bind.dialect.name)
+    if statement is None:
+        return SearchResponse(total=0, hits=[])
+
+    rows = (await db.execute(statement.limit(limit).offset(offset))).all()
+    return SearchResponse(
+        # The total comes from a window over the whole match set, an empty page past the end has none to report.
+        total=rows[0].total if rows else 0,
+        hits=[
+            SearchHit(document=DocumentResponseSchema.model_validate(document), rank=rank, snippet=snippet)
+            for document, rank, snippet, _ in rows
+        ],
+    )
@@ -0,0 +1,145 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.statistics import Cohort, IssueStatistic, USER_SCOPE, COHORT_SCOPE, GLOBAL_SCOPE, ALL_RULES
+from models.user import User
+from schemas.statistics import CohortSchema, IssueStatisticsResponse, RuleStatisticsSchema
+from services.tracing import traced
+
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 366
+
+
+def statistics_scopes(user: User) -> List[Tuple[str, str]]:
+    scopes = [(USER_SCOPE, str(user.id)), (GLOBAL_SCOPE, "")]
+    if user.cohort:
+        scopes.append((COHORT_SCOPE, user.cohort))
+    return scopes
+
+
+@traced()
+async def record_issue_statistics(user_id: int, rule_counts: Dict[str, int], db: AsyncSession) -> None:
+    """Add one completed check to the user's, their cohort's and the global counters; the caller commits.
+
+    All rows are incremented by a single upsert, so a check costs one statement however
+    many rules ran.
+    """
+    if not rule_counts:
+        return
+
+    # get_document_for_check only lets owners check a document, so get_current_user has loaded this user already.
+    user = await db.get(User, user_id)
+    day = datetime.utcnow().date()
+    counts = {**rule_counts, ALL_RULES: sum(rule_counts.values())}
+    rows = [
+        {"scope": scope, "scope_key": scope_key, "day": day, "rule": rule, "checks": 1,
+         "checks_with_issues": int(issue_count > 0), "issue_count": issue_count}
+        for scope, scope_key in statistics_scopes(user)
+        for rule, issue_count in counts.items()
+    ]
+
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(IssueStatistic).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[IssueStatistic.scope, IssueStatistic.scope_key, IssueStatistic.day, IssueStatistic.rule],
+        set_={
+            "checks": IssueStatistic.checks + statement.excluded.checks,
+            "checks_with_issues": IssueStatistic.checks_with_issues + statement.excluded.checks_with_issues,
+            "issue_count": IssueStatistic.issue_count + statement.excluded.issue_count,
+        },
+    )
+    await db.execute(statement)
+
+
+def statistics_window(start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"The time window can span at most {MAX_WINDOW_DAYS} days")
+    return start, end
+
+
+@traced()
+async def get_issue_statistics(scope: str, scope_key: str, db: AsyncSession,
+                               start: Optional[date] = None, end: Optional[date] = None) -> IssueStatisticsResponse:
+    start, end = statistics_window(start, end)
+    result = await db.execute(
+        select(
+            IssueStatistic.rule,
+            func.sum(IssueStatistic.checks).label("checks"),
+            func.sum(IssueStatistic.checks_with_issues).label("checks_with_issues"),
+            func.sum(IssueStatistic.issue_count).label("issue_count"),
+        )
+        .where(IssueStatistic.scope == scope, IssueStatistic.scope_key == scope_key,
+               IssueStatistic.day.between(start, end))
+        .group_by(IssueStatistic.rule)
+    )
+    rows = {row.rule: row for row in result.all()}
+    total = rows.pop(ALL_RULES, None)
+
+    return IssueStatisticsResponse(
+        scope=scope,
+        start=start,
+        end=end,
+        checks=total.checks if total else 0,
+        issue_count=total.issue_count if total else 0,
+        rules=sorted(
+            (RuleStatisticsSchema(rule=row.rule, checks=row.checks, checks_with_issues=row.checks_with_issues,
+                                  issue_count=row.issue_count) for row in rows.values()),
+            key=lambda rule: (-rule.issue_count, rule.rule),
+        ),
+    )
+
+
+@traced()
+async def create_cohort(name: str, instructor_id: int, db: AsyncSession) -> CohortSchema:
+    if await db.get(Cohort, name) is not None:
+        raise HTTPException(status_code=409, detail=f"Cohort {name} already exists")
+    cohort = Cohort(name=name, instructor_id=instructor_id)
+    db.add(cohort)
+    await db.commit()
+    return CohortSchema.model_validate(cohort)
+
+
+@traced()
+async def get_instructed_cohort(name: str, user_id: int, db: AsyncSession) -> Cohort:
+    cohort = await db.get(Cohort, name)
+    if cohort is None:
+        raise HTTPException(status_code=404, detail=f"Cohort {name} not found")
+    if cohort.instructor_id != user_id:
+        raise HTTPException(status_code=403, detail="Only the cohort's instructor can change its members")
+    return cohort
+
+
+@traced()
+async def set_cohort_member(name: str, username: str, instructor_id: int, db: AsyncSession,
+                            member: bool = True) -> None:
+    await get_instructed_cohort(name, instructor_id, db)
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise HTTPException(status_code=404, detail=f"User {username} not found")
+
+    if member:
+        user.cohort = name
+    elif user.cohort == name:
+        user.cohort = None
+    await db.commit()
+
+
+@traced()
+async def can_read_cohort(name: str, user: User, db: AsyncSession) -> bool:
+    if user.cohort == name:
+        return True
+    cohort = await db.get(Cohort, name)
+    return cohort is not None and cohort.instructor_id == user.id
@@ -5,12 +5,16 @@ from fastapi import Depends, HTTPException
 from database.settings import get_session
 from schemas.user import UserResponseSchemas, UserCreateSchemas
 from services.user_auth import create_access_token, create_refresh_token, get_hashed_password
-from sqlalchemy import select
+from services.tracing import traced
+from sqlalchemy import and_, or_, select, func
+from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.document import Document
-from schemas.document import DocumentResponseSchema
-from typing import List
+from models.document import Document, DocumentVersion, FormattingSuggestion
+from schemas.document import DocumentResponseSchema, DocumentSuggestionsSummarySchema, \
+    DocumentWithSuggestionsSchema
+from typing import List, Union
 
+@traced()
 async def create_user(db: Depends(get_session), user_in: UserCreateSchemas) -> UserResponseSchemas:
     user_in.password = get_hashed_password(user_in.password)
     existing_user = await db.execute(select(User).filter(
@@ -18,19 +22,64 @@ async def create_user(db: Depends(get_session), user_in: UserCreateSchemas) -> U
     existing_user = existing_user.scalars().first()
     if existing_user:
         raise HTTPException(status_code=400, detail="User with this email already exists")
-    user = User(**user_in.dict())
+    user = User(**user_in.model_dump())
     db.add(user)
     await db.commit()
     await db.refresh(user)
     access = await create_access_token(user.id)
     refresh = await create_refresh_token(user.id)
     token = schemas.token.Token(access_token=access, refresh_token=refresh)
-    return UserResponseSchemas(**user_in.dict(), id=user.id, token=token)
+    return UserResponseSchemas(**user_in.model_dump(), id=user.id, token=token)
 
 
+@traced()
 async def get_user_documents(user_id: int, db: AsyncSession) -> List[DocumentResponseSchema]:
     result = await db.execute(
         select(Document).where(Document.user_id == user_id)
     )
     documents = result.scalars().all()
-    return [DocumentResponseSchema.from_orm(doc) for doc in documents]
\ No newline at end of file
+    return [DocumentResponseSchema.model_validate(doc) for doc in documents]
+
+
+def made_for_latest_version():
+    """Suggestions of their document's latest version, or for a document without versions the unversioned ones.
+
+    Each version has at most one suggestion, so this is a document's latest suggestion.
+    """
+    latest_version_id = (
+        select(DocumentVersion.id)
+        .where(DocumentVersion.document_id == FormattingSuggestion.document_id)
+        .order_by(DocumentVersion.version.desc())
+        .limit(1)
+        .correlate(FormattingSuggestion)
+        .scalar_subquery()
+    )
+    return or_(FormattingSuggestion.version_id == latest_version_id,
+               and_(FormattingSuggestion.version_id.is_(None), latest_version_id.is_(None)))
+
+
+@traced()
+async def get_user_documents_with_suggestions(user_id: int, db: AsyncSession, details: bool = False) -> Union[
+    List[DocumentSuggestionsSummarySchema], List[DocumentWithSuggestionsSchema]]:
+    if details:
+        result = await db.execute(
+            select(Document)
+            .where(Document.user_id == user_id)
+            .options(selectinload(Document.formatting_suggestions.and_(made_for_latest_version())))
+            .order_by(Document.id)
+        )
+        documents = result.scalars().all()
+        return [DocumentWithSuggestionsSchema.model_validate(doc) for doc in documents]
+
+    # Plain columns rather than Document entities, each row is validated into its schema directly.
+    result = await db.execute(
+        select(Document.id, Document.user_id, Document.file_path, Document.file_name, Document.status,
+               func.count(FormattingSuggestion.id).label("suggestion_count"),
+               func.max(FormattingSuggestion.created_at).label("last_checked_at"))
+        .outerjoin(FormattingSuggestion,
+                   and_(FormattingSuggestion.document_id == Document.id, made_for_latest_version()))
+        .where(Document.user_id == user_id)
+        .group_by(Document.id)
+        .order_by(Document.id)
+    )
+    return [DocumentSuggestionsSummarySchema.model_validate(row) for row in result.all()]
@@ -1,20 +1,40 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, AsyncEngine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from config import settings
+from functools import lru_cache
+from config import get_settings
+from services.logs import instrument_engine
+from services.tracing import trace_engine
 
 Base = declarative_base()
-DATABASE_URL = (f"postgresql+asyncpg://{settings.db.DB_USER}:{settings.db.DB_PASSWORD}@{settings.db.DB_HOST}:{settings.db.DB_PORT}/"
-                f"{settings.db.DB_NAME}")
-engine = create_async_engine(DATABASE_URL, echo=True, future=True)
+
+
+def get_database_url() -> str:
+    settings = get_settings()
+    return (f"postgresql+asyncpg://{settings.db.DB_USER}:{settings.db.DB_PASSWORD}@{settings.db.DB_HOST}:{settings.db.DB_PORT}/"
+            f"{settings.db.DB_NAME}")
+
+
+@lru_cache
+def get_engine() -> AsyncEngine:
+    engine = create_async_engine(get_database_url(), future=True)
+    instrument_engine(engine, get_settings().logging)
+    trace_engine(engine)
+    return engine
+
+
+@lru_cache
+def get_sessionmaker() -> sessionmaker:
+    return sessionmaker(
+        get_engine(), class_=AsyncSession, expire_on_commit=False
+    )
+
 
 async def init_db():
     pass
 
 
 async def get_session() -> AsyncSession:
-    async_session = sessionmaker(
-        engine, class_=AsyncSession, expire_on_commit=False
-    )
+    async_session = get_sessionmaker()
     async with async_session() as session:
         yield session
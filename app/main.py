@@ -1,9 +1,27 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, APIRouter
+from fastapi.responses import ORJSONResponse
+from config import get_settings
+from services.logs import RequestContextMiddleware, configure_logging, shutdown_logging
+from services.scheduler import get_scheduler
+from services.tracing import TracingMiddleware
 from routers.main_router import router as api_v1
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.settings = get_settings()
+    configure_logging(app.state.settings.logging)
+    yield
+    get_scheduler().shutdown()
+    shutdown_logging()
+
+
 router = APIRouter(
     prefix="/api",
 )
 router.include_router(api_v1)
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.include_router(router)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestContextMiddleware)
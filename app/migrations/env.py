@@ -4,14 +4,18 @@ from logging.config import fileConfig
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
-from config import settings
+from config import get_settings
 from database.settings import Base
 from alembic import context
 from models.user import User
-from models.document import Document,FormattingSuggestion
+from models.document import Document,FormattingSuggestion,DocumentVersion
+from models.rate_limit import RateLimitCounter
+from models.search import DocumentSearch
+from models.statistics import IssueStatistic, Cohort
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
+settings = get_settings()
 section = config.config_ini_section
 config.set_section_option(section, 'DB_HOST', settings.db.DB_HOST)
 config.set_section_option(section, 'DB_USER', settings.db.DB_USER)
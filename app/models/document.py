@@ -1,27 +1,53 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text,JSON
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Text,JSON, UniqueConstraint
 from sqlalchemy import DateTime, func
 from sqlalchemy.orm import relationship
 from database.settings import Base
+from models.search import DocumentSearch  # noqa: F401, registers the search_entry relationship target
 
 
 class Document(Base):
     __tablename__ = "documents"
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     file_path = Column(String, nullable=False)
     file_name = Column(String, nullable=False)
     status = Column(String, default="uploaded")
+    size_bytes = Column(BigInteger)
+    uncompressed_bytes = Column(BigInteger)
+    document_xml_bytes = Column(BigInteger)
+    paragraph_count_hint = Column(Integer)
     uploaded_at = Column(DateTime, default=func.now())
     processed_at = Column(DateTime)
     user = relationship("User", back_populates="documents")
     formatting_suggestions = relationship("FormattingSuggestion", back_populates="document", cascade="all, delete")
+    versions = relationship("DocumentVersion", back_populates="document", cascade="all, delete",
+                            order_by="DocumentVersion.version")
+    search_entry = relationship("DocumentSearch", back_populates="document", uselist=False,
+                                cascade="all, delete-orphan")
+
+
+class DocumentVersion(Base):
+    __tablename__ = "document_versions"
+    __table_args__ = (UniqueConstraint("document_id", "version"),)
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    version = Column(Integer, nullable=False)
+    file_name = Column(String, nullable=False)
+    size_bytes = Column(BigInteger)
+    stored_bytes = Column(BigInteger, default=0)
+    manifest = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    document = relationship("Document", back_populates="versions")
+    formatting_suggestions = relationship("FormattingSuggestion", back_populates="version")
 
 
 class FormattingSuggestion(Base):
     __tablename__ = "formatting_suggestions"
     id = Column(Integer, primary_key=True)
     document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
+    version_id = Column(Integer, ForeignKey("document_versions.id"), index=True)
     description = Column(Text)
     status = Column(String, default="pending")
     created_at = Column(DateTime, default=func.now())
     document = relationship("Document", back_populates="formatting_suggestions")
+    version = relationship("DocumentVersion", back_populates="formatting_suggestions")
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from database.settings import Base
+
+
+class RateLimitCounter(Base):
+    __tablename__ = "rate_limit_counters"
+    key = Column(String, primary_key=True)
+    window = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
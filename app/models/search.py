@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, DDL, event
+from sqlalchemy import DateTime, func
+from sqlalchemy.orm import relationship
+from database.settings import Base
+
+# Postgres: a weighted tsvector kept up to date by the database itself, behind a GIN index.
+SEARCH_VECTOR = ("setweight(to_tsvector('english', translate(coalesce(file_name, ''), '_.-', '   ')), 'A') || "
+                 "setweight(to_tsvector('english', coalesce(issues, '')), 'B') || "
+                 "setweight(to_tsvector('english', coalesce(content, '')), 'C')")
+POSTGRES_DDL = [
+    f"ALTER TABLE document_search ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED",
+    "CREATE INDEX ix_document_search_search_vector ON document_search USING gin (search_vector)",
+]
+
+# SQLite: an external content FTS5 index over the same rows, synced by triggers.
+FTS_COLUMNS = "file_name, content, issues"
+FTS_NEW_ROW = "new.document_id, new.file_name, new.content, new.issues"
+FTS_DELETE_OLD_ROW = (f"INSERT INTO document_search_fts(document_search_fts, rowid, {FTS_COLUMNS}) "
+                      "VALUES ('delete', old.document_id, old.file_name, old.content, old.issues);")
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS document_search_fts USING fts5({FTS_COLUMNS}, content='document_search', "
+    "content_rowid='document_id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS document_search_ai AFTER INSERT ON document_search BEGIN "
+    f"INSERT INTO document_search_fts(rowid, {FTS_COLUMNS}) VALUES ({FTS_NEW_ROW}); END",
+    f"CREATE TRIGGER IF NOT EXISTS document_search_ad AFTER DELETE ON document_search BEGIN {FTS_DELETE_OLD_ROW} END",
+    f"CREATE TRIGGER IF NOT EXISTS document_search_au AFTER UPDATE ON document_search BEGIN {FTS_DELETE_OLD_ROW} "
+    f"INSERT INTO document_search_fts(rowid, {FTS_COLUMNS}) VALUES ({FTS_NEW_ROW}); END",
+]
+
+
+class DocumentSearch(Base):
+    """Searchable text of a document: its file name, extracted body text and latest issues."""
+    __tablename__ = "document_search"
+    document_id = Column(Integer, ForeignKey("documents.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    file_name = Column(String, nullable=False)
+    content = Column(Text)
+    issues = Column(Text)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    document = relationship("Document", back_populates="search_entry")
+
+
+for statement in POSTGRES_DDL:
+    event.listen(DocumentSearch.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in SQLITE_DDL:
+    event.listen(DocumentSearch.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(DocumentSearch.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS document_search_fts").execute_if(dialect="sqlite"))
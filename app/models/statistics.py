@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, func
+from database.settings import Base
+
+USER_SCOPE = "user"
+COHORT_SCOPE = "cohort"
+GLOBAL_SCOPE = "global"
+# The row under this rule id counts whole checks rather than a single rule.
+ALL_RULES = "*"
+
+
+class IssueStatistic(Base):
+    """Issue counts of one rule, summed over the checks of one scope (a user, a cohort or everyone) on one day.
+
+    Rows are only ever incremented when a check completes, dashboards read them instead
+    of parsing formatting suggestions.
+    """
+    __tablename__ = "issue_statistics"
+    scope = Column(String, primary_key=True)
+    scope_key = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    rule = Column(String, primary_key=True)
+    checks = Column(Integer, nullable=False, default=0)
+    checks_with_issues = Column(Integer, nullable=False, default=0)
+    issue_count = Column(Integer, nullable=False, default=0)
+
+
+class Cohort(Base):
+    """A class or group whose members' statistics are pooled.
+
+    The user who creates a cohort is its instructor and the only one who can add or
+    remove members, users cannot put themselves into a cohort.
+    """
+    __tablename__ = "cohorts"
+    name = Column(String, primary_key=True)
+    instructor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, default=func.now())
@@ -1,42 +1,150 @@
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
-from schemas.document import DocumentResponseSchema, FormattingSuggestionResponse
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, Query
+from schemas.document import AutofixResponse, DocumentResponseSchema, FormattingSuggestionResponse, \
+    DocumentVersionSchema, DocumentVersionDiffSchema
 from sqlalchemy.ext.asyncio import AsyncSession
 from models.user import User
 from starlette import status
 from database.settings import get_session
+from config import get_settings
+from utils.docx_inspect import inspect_docx, DocxInspection, DocxInspectionError
+from services.scheduler import get_scheduler
+from schemas.scheduler import SchedulerLaneMetrics
 from services.user_auth import get_current_user
 from crud.document import document_create, document_delete, create_formatting_suggestions, \
-    get_formatting_suggestion_by_document_id,delete_formatting_suggestion
+    get_formatting_suggestion_by_document_id,delete_formatting_suggestion, get_user_storage_bytes, \
+    get_document_for_check, stream_formatting_suggestions, get_annotated_document, create_autofixed_document, \
+    document_add_version, get_document_versions, build_document_version_file, \
+    diff_document_versions
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from services.rate_limit import RateLimit, UPLOAD_SCOPE, CHECK_SCOPE
+from services.responses import SchemaResponse
+from services.tracing import span
 import aiofiles
 import os
+import uuid
+from io import BytesIO
+from typing import List, Optional, Tuple
 
 document_router = APIRouter(prefix="/document", tags=["document"])
 
 
-@document_router.post("/create", response_model=DocumentResponseSchema, status_code=status.HTTP_201_CREATED)
-async def create_document(file: UploadFile = File(...),
-                          db: AsyncSession = Depends(get_session),
-                          current_user: User = Depends(get_current_user)
-                          ):
+async def read_docx_upload(file: UploadFile, db: AsyncSession, current_user: User) -> Tuple[bytes, DocxInspection]:
     if not file.filename.lower().endswith('.docx'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Only .docx files are allowed."
         )
 
-    out_file_path = f"uploaded_files/{file.filename}"
+    with span("upload.read") as read_span:
+        content = await file.read()
+        read_span.set_attribute("file.bytes", len(content))
+    upload_settings = get_settings().upload
+    try:
+        with span("docx.inspect"):
+            inspection = inspect_docx(BytesIO(content),
+                                      max_uncompressed_bytes=upload_settings.UPLOAD_MAX_UNCOMPRESSED_BYTES,
+                                      max_compression_ratio=upload_settings.UPLOAD_MAX_COMPRESSION_RATIO,
+                                      max_entries=upload_settings.UPLOAD_MAX_ZIP_ENTRIES)
+    except DocxInspectionError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    used_bytes = await get_user_storage_bytes(current_user.id, db)
+    if used_bytes + inspection.size_bytes > upload_settings.USER_STORAGE_QUOTA_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Storage quota exceeded, delete some documents first."
+        )
+
+    return content, inspection
+
+
+@document_router.post("/create", response_model=DocumentResponseSchema, status_code=status.HTTP_201_CREATED,
+                      dependencies=[Depends(RateLimit(UPLOAD_SCOPE))])
+async def create_document(file: UploadFile = File(...),
+                          db: AsyncSession = Depends(get_session),
+                          current_user: User = Depends(get_current_user)
+                          ):
+    content, inspection = await read_docx_upload(file, db, current_user)
+
+    # Unique per upload, documents of different users may well share a file name.
+    out_file_path = f"uploaded_files/{uuid.uuid4().hex[:8]}_{file.filename}"
 
     os.makedirs(os.path.dirname(out_file_path), exist_ok=True)
 
-    async with aiofiles.open(out_file_path, 'wb') as out_file:
-        content = await file.read()
-        await out_file.write(content)
+    with span("file.write", **{"file.path": out_file_path, "file.bytes": len(content)}):
+        async with aiofiles.open(out_file_path, 'wb') as out_file:
+            await out_file.write(content)
 
-    document = await document_create(current_user.id, out_file_path, file.filename, db)
+    try:
+        document = await document_create(current_user.id, out_file_path, file.filename, db, inspection)
+    except BaseException:
+        os.remove(out_file_path)
+        raise
 
     return document
 
 
+@document_router.post("/{document_id}/versions", response_model=DocumentVersionSchema,
+                      status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimit(UPLOAD_SCOPE))])
+async def create_document_version(document_id: int,
+                                  file: UploadFile = File(...),
+                                  db: AsyncSession = Depends(get_session),
+                                  current_user: User = Depends(get_current_user)):
+    content, inspection = await read_docx_upload(file, db, current_user)
+
+    # A fresh name, the current working copy may still be needed to record version 1 of older documents.
+    out_file_path = f"uploaded_files/{uuid.uuid4().hex[:8]}_{file.filename}"
+
+    os.makedirs(os.path.dirname(out_file_path), exist_ok=True)
+
+    with span("file.write", **{"file.path": out_file_path, "file.bytes": len(content)}):
+        async with aiofiles.open(out_file_path, 'wb') as out_file:
+            await out_file.write(content)
+
+    try:
+        version = await document_add_version(current_user.id, document_id, out_file_path, file.filename, db,
+                                             inspection)
+    except BaseException:
+        os.remove(out_file_path)
+        raise
+
+    return DocumentVersionSchema.model_validate(version)
+
+
+@document_router.get("/{document_id}/versions", response_model=List[DocumentVersionSchema])
+async def get_versions(document_id: int,
+                       db: AsyncSession = Depends(get_session),
+                       current_user: User = Depends(get_current_user)):
+    return SchemaResponse(await get_document_versions(document_id, current_user.id, db))
+
+
+@document_router.get("/{document_id}/versions/diff", response_model=DocumentVersionDiffSchema)
+async def get_versions_diff(document_id: int,
+                            from_version: int,
+                            to_version: int,
+                            db: AsyncSession = Depends(get_session),
+                            current_user: User = Depends(get_current_user)):
+    return await diff_document_versions(document_id, from_version, to_version, current_user.id, db)
+
+
+@document_router.get("/{document_id}/versions/{version}/file", response_class=FileResponse)
+async def get_version_file(document_id: int,
+                           version: int,
+                           db: AsyncSession = Depends(get_session),
+                           current_user: User = Depends(get_current_user)):
+    path, file_name = await build_document_version_file(document_id, version, current_user.id, db)
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        filename=file_name,
+        background=BackgroundTask(os.remove, path),
+    )
+
+
 @document_router.delete("/delete/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(document_id: int,
                           db: AsyncSession = Depends(get_session),
@@ -48,11 +156,62 @@ async def delete_document(document_id: int,
 
 
 @document_router.post("/apa_style_check", response_model=FormattingSuggestionResponse,
-                      status_code=status.HTTP_201_CREATED)
+                      status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimit(CHECK_SCOPE))])
 async def create_apa_style_check(document_id: int,
+                          profile: str = "full",
+                          skip: Optional[List[str]] = Query(None),
+                          max_issues: Optional[int] = Query(None, ge=1),
+                          fail_fast: bool = False,
                           db: AsyncSession = Depends(get_session),
                           current_user: User = Depends(get_current_user)):
-    response = await create_formatting_suggestions(document_id, db)
+    if fail_fast:
+        max_issues = 1
+    response = await create_formatting_suggestions(document_id, db, current_user.id, profile, skip, max_issues)
+    return SchemaResponse(response, status_code=status.HTTP_201_CREATED)
+
+
+@document_router.get("/apa_style_check/stream", response_class=StreamingResponse,
+                     dependencies=[Depends(RateLimit(CHECK_SCOPE))])
+async def stream_apa_style_check(document_id: int,
+                                 profile: str = "full",
+                                 skip: Optional[List[str]] = Query(None),
+                                 max_issues: Optional[int] = Query(None, ge=1),
+                                 fail_fast: bool = False,
+                                 db: AsyncSession = Depends(get_session),
+                                 current_user: User = Depends(get_current_user)):
+    if fail_fast:
+        max_issues = 1
+    document, rules = await get_document_for_check(document_id, current_user.id, db, profile, skip)
+    return StreamingResponse(
+        stream_formatting_suggestions(document, rules, current_user.id, max_issues),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@document_router.get("/apa_annotated/{document_id}", response_class=FileResponse,
+                     dependencies=[Depends(RateLimit(CHECK_SCOPE))])
+async def get_apa_annotated_document(document_id: int,
+                                     profile: str = "full",
+                                     skip: Optional[List[str]] = Query(None),
+                                     db: AsyncSession = Depends(get_session),
+                                     current_user: User = Depends(get_current_user)):
+    document, rules = await get_document_for_check(document_id, current_user.id, db, profile, skip)
+    annotated_path = await get_annotated_document(document, rules, current_user.id)
+    file_name = f"{os.path.splitext(document.file_name)[0]}_annotated.docx"
+    return FileResponse(
+        annotated_path,
+        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        filename=file_name,
+    )
+
+
+@document_router.post("/{document_id}/apa_autofix", response_model=AutofixResponse,
+                      status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimit(UPLOAD_SCOPE))])
+async def create_apa_autofix(document_id: int,
+                             db: AsyncSession = Depends(get_session),
+                             current_user: User = Depends(get_current_user)):
+    response = await create_autofixed_document(document_id, db, current_user.id)
     return response
 
 
@@ -60,10 +219,15 @@ async def create_apa_style_check(document_id: int,
 async def get_apa_style_suggestions(document_id: int, db: AsyncSession = Depends(get_session),
                                 current_user: User = Depends(get_current_user)):
     response = await get_formatting_suggestion_by_document_id(document_id, db)
-    return response
+    return SchemaResponse(response)
 
 @document_router.delete("/apa_style_suggestions/{formatting_suggestion}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_apa_style_suggestions(formatting_suggestion: int, db: AsyncSession = Depends(get_session),
                                 current_user: User = Depends(get_current_user)):
     await delete_formatting_suggestion(formatting_suggestion, db)
-    return None
\ No newline at end of file
+    return None
+
+
+@document_router.get("/scheduler/metrics", response_model=List[SchedulerLaneMetrics])
+async def get_scheduler_metrics(current_user: User = Depends(get_current_user)):
+    return get_scheduler().metrics()
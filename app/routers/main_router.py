@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 from .user import user_router
 from .document import document_router
+from .statistics import statistics_router
 router = APIRouter(
     prefix="/v1",
 )
 router.include_router(user_router)
 router.include_router(document_router)
+router.include_router(statistics_router)
@@ -0,0 +1,77 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from starlette import status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.settings import get_session
+from services.user_auth import get_current_user
+import crud.statistics as crud_statistics
+from models.statistics import USER_SCOPE, COHORT_SCOPE, GLOBAL_SCOPE
+from models.user import User
+from schemas.statistics import CohortCreateSchema, CohortSchema, IssueStatisticsResponse
+
+statistics_router = APIRouter(prefix="/statistics", tags=["statistics"])
+
+
+@statistics_router.get('/me', summary='Most common APA issues in your own checks',
+                       response_model=IssueStatisticsResponse)
+async def get_my_statistics(
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    return await crud_statistics.get_issue_statistics(USER_SCOPE, str(current_user.id), db, start, end)
+
+
+@statistics_router.get('/cohorts/{cohort}', summary='Most common APA issues across a cohort',
+                       response_model=IssueStatisticsResponse)
+async def get_cohort_statistics(
+        cohort: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    if not await crud_statistics.can_read_cohort(cohort, current_user, db):
+        raise HTTPException(status_code=403, detail="You do not have permission to access this cohort")
+    return await crud_statistics.get_issue_statistics(COHORT_SCOPE, cohort, db, start, end)
+
+
+@statistics_router.post('/cohorts', summary='Create a cohort, you become its instructor',
+                        response_model=CohortSchema, status_code=status.HTTP_201_CREATED)
+async def create_cohort(
+        cohort: CohortCreateSchema,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    return await crud_statistics.create_cohort(cohort.name, current_user.id, db)
+
+
+@statistics_router.put('/cohorts/{cohort}/members/{username}', summary='Add a user to a cohort you instruct',
+                       status_code=status.HTTP_204_NO_CONTENT)
+async def add_cohort_member(
+        cohort: str,
+        username: str,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    await crud_statistics.set_cohort_member(cohort, username, current_user.id, db)
+
+
+@statistics_router.delete('/cohorts/{cohort}/members/{username}', summary='Remove a user from a cohort you instruct',
+                          status_code=status.HTTP_204_NO_CONTENT)
+async def remove_cohort_member(
+        cohort: str,
+        username: str,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    await crud_statistics.set_cohort_member(cohort, username, current_user.id, db, member=False)
+
+
+@statistics_router.get('/global', summary='Most common APA issues across all users',
+                       response_model=IssueStatisticsResponse)
+async def get_global_statistics(
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    return await crud_statistics.get_issue_statistics(GLOBAL_SCOPE, "", db, start, end)
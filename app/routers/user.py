@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
 from database.settings import get_session
 from schemas.user import UserCreateSchemas, UserResponseSchemas
+from services.responses import SchemaResponse
 from services.user_auth import login_user, get_current_user
 import crud.user as crud_user
+import crud.search as crud_search
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import List
-from schemas.document import DocumentResponseSchema
+from typing import List, Union
+from schemas.document import DocumentResponseSchema, DocumentSuggestionsSummarySchema, \
+    DocumentWithSuggestionsSchema
+from schemas.search import SearchResponse
 from models.user import User
 
 user_router = APIRouter(prefix="/user", tags=["user"])
@@ -36,4 +40,28 @@ async def get_documents(
         db: AsyncSession = Depends(get_session),
         current_user: User = Depends(get_current_user)):
     response = await crud_user.get_user_documents(current_user.id, db)
-    return response
+    return SchemaResponse(response)
+
+
+@user_router.get('/documents/search',
+                 summary='Search user documents by file name, text and formatting issues',
+                 response_model=SearchResponse)
+async def search_documents(
+        q: str = Query(..., min_length=1, max_length=200),
+        limit: int = Query(20, ge=1, le=100),
+        offset: int = Query(0, ge=0),
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    response = await crud_search.search_documents(current_user.id, q, db, limit=limit, offset=offset)
+    return SchemaResponse(response)
+
+
+@user_router.get('/documents/suggestions',
+                 summary='Get all user documents with their formatting suggestions',
+                 response_model=Union[List[DocumentWithSuggestionsSchema], List[DocumentSuggestionsSummarySchema]])
+async def get_documents_with_suggestions(
+        details: bool = False,
+        db: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)):
+    response = await crud_user.get_user_documents_with_suggestions(current_user.id, db, details)
+    return SchemaResponse(response)
@@ -1,25 +1,62 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional, List
 
 
 class DocumentResponseSchema(BaseModel):
     id: int
     user_id: int
     file_path: str
+    file_name: str
     status: Optional[str] = "uploaded"
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class FormattingSuggestionResponse(BaseModel):
     id: int
     document_id: int
+    version_id: Optional[int] = None
     description: str
+    status: Optional[str] = None
     created_at: datetime
 
-    class Config:
-        orm_mode = True
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DocumentSuggestionsSummarySchema(DocumentResponseSchema):
+    suggestion_count: int = 0
+    last_checked_at: Optional[datetime] = None
+
+
+class DocumentWithSuggestionsSchema(DocumentResponseSchema):
+    formatting_suggestions: List[FormattingSuggestionResponse]
+
+
+class DocumentVersionSchema(BaseModel):
+    id: int
+    document_id: int
+    version: int
+    file_name: str
+    size_bytes: Optional[int] = None
+    stored_bytes: Optional[int] = None
+    created_at: datetime
+    formatting_suggestions: List[FormattingSuggestionResponse] = []
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class DocumentVersionDiffSchema(BaseModel):
+    document_id: int
+    from_version: int
+    to_version: int
+    added: List[str]
+    removed: List[str]
+    changed: List[str]
+    unchanged: List[str]
+
+
+class AutofixResponse(BaseModel):
+    document: DocumentResponseSchema
+    version: int
+    fixes: Dict[str, int]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class SchedulerLaneMetrics(BaseModel):
+    lane: str
+    workers: int
+    queued: int
+    running: int
+    completed: int
+    failed: int
+    wait_seconds_avg: float
+    wait_seconds_p50: float
+    wait_seconds_p95: float
+    wait_seconds_max: float
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from schemas.document import DocumentResponseSchema
+
+
+class SearchHit(BaseModel):
+    document: DocumentResponseSchema
+    rank: float
+    snippet: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    total: int
+    hits: List[SearchHit]
@@ -0,0 +1,31 @@
+from datetime import date
+from typing import List
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class RuleStatisticsSchema(BaseModel):
+    rule: str
+    checks: int
+    checks_with_issues: int
+    issue_count: int
+
+
+class IssueStatisticsResponse(BaseModel):
+    scope: str
+    start: date
+    end: date
+    checks: int
+    issue_count: int
+    rules: List[RuleStatisticsSchema]
+
+
+class CohortCreateSchema(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+
+
+class CohortSchema(BaseModel):
+    name: str
+    instructor_id: int
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Optional
 
 
 class UserBaseSchemas(BaseModel):
@@ -19,6 +20,6 @@ class UserLoginSchemas(BaseModel):
 
 class UserResponseSchemas(UserBaseSchemas):
     id: int
+    cohort: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
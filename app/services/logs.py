@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Callable, Dict, Optional
+
+from config import LoggingSettings, get_settings
+
+REQUEST_ID_HEADER = "x-request-id"
+MAX_STATEMENT_CHARS = 2000
+# Attributes every LogRecord has; anything else was passed through ``extra`` and ends up in the JSON line.
+RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[QueueListener] = None
+_configured_pid: Optional[int] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request id while still on the thread that logged them."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        line.update((key, value) for key, value in vars(record).items()
+                    if key not in RECORD_ATTRIBUTES and key != "request_id")
+        if record.exc_info:
+            line["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str)
+
+
+def _stream_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def configure_logging(settings: LoggingSettings) -> None:
+    """Send every log record through a queue to a background thread that formats and writes it.
+
+    Logging on a request path then costs an enqueue; JSON encoding and the write to
+    stdout happen on the listener thread. Safe to call more than once.
+    """
+    global _listener, _configured_pid
+    if _listener is not None:
+        return
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+    # SQL is logged by the slow query hook below, not statement by statement.
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    _listener = QueueListener(log_queue, _stream_handler(), respect_handler_level=True)
+    _listener.start()
+    _configured_pid = os.getpid()
+
+
+def shutdown_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _configure_worker_logging() -> None:
+    # Forked scheduler workers inherit a queue handler nobody drains; they write their own lines instead.
+    global _configured_pid
+    if _configured_pid is None or _configured_pid == os.getpid():
+        return
+    handler = _stream_handler()
+    handler.addFilter(RequestIdFilter())
+    logging.getLogger().handlers[:] = [handler]
+    _configured_pid = os.getpid()
+
+
+def run_with_request_id(request_id: Optional[str], fn: Callable, *args: Any) -> Any:
+    """Run ``fn`` in a scheduler worker with the request id of the request that queued it."""
+    _configure_worker_logging()
+    token = request_id_var.set(request_id)
+    try:
+        return fn(*args)
+    finally:
+        request_id_var.reset(token)
+
+
+class LogSampler:
+    """Let through a ``rate`` fraction of records, and at most ``per_minute`` for each key.
+
+    Keys are route templates or SQL statements, so one hot, slow path cannot flood the
+    log while rare slow ones are still all seen.
+    """
+
+    def __init__(self, rate: float, per_minute: int, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.per_minute = per_minute
+        self.clock = clock
+        self.window = None
+        # Counts of the current minute only, so keys seen once do not pile up.
+        self.counts: Dict[str, int] = {}
+
+    def allow(self, key: str) -> bool:
+        if self.rate < 1 and random.random() >= self.rate:
+            return False
+        window = int(self.clock() // 60)
+        if window != self.window:
+            self.window = window
+            self.counts = {}
+        count = self.counts.get(key, 0)
+        if count >= self.per_minute:
+            return False
+        self.counts[key] = count + 1
+        return True
+
+
+def instrument_engine(engine, settings: LoggingSettings) -> None:
+    """Log statements slower than ``LOG_SLOW_QUERY_MS`` on ``engine``, sampled per statement."""
+    from sqlalchemy import event
+
+    logger = logging.getLogger("app.db")
+    sampler = LogSampler(settings.LOG_SLOW_SAMPLE_RATE, settings.LOG_SLOW_MAX_PER_MINUTE)
+    threshold = settings.LOG_SLOW_QUERY_MS / 1000
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        duration = time.perf_counter() - conn.info["query_started"].pop()
+        if duration >= threshold and sampler.allow(statement):
+            logger.warning("slow query", extra={"duration_ms": round(duration * 1000, 1),
+                                                "statement": statement[:MAX_STATEMENT_CHARS]})
+
+
+class RequestContextMiddleware:
+    """Give every request an id (``X-Request-ID`` if the client sent one) and log the slow ones.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware``, so streamed responses
+    are passed through untouched.
+    """
+
+    def __init__(self, app, settings: Optional[LoggingSettings] = None):
+        self.app = app
+        self.logger = logging.getLogger("app.request")
+        self.settings = settings
+        self.sampler = None
+        self.threshold = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        if self.sampler is None:
+            # Built on the first request, importing the app must not need the settings.
+            settings = self.settings or get_settings().logging
+            self.sampler = LogSampler(settings.LOG_SLOW_SAMPLE_RATE, settings.LOG_SLOW_MAX_PER_MINUTE)
+            self.threshold = settings.LOG_SLOW_REQUEST_MS / 1000
+
+        headers = dict(scope["headers"])
+        request_id = headers.get(REQUEST_ID_HEADER.encode(), b"").decode("latin-1")[:64] or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", []),
+                                      (REQUEST_ID_HEADER.encode(), request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            duration = time.perf_counter() - started
+            route = scope.get("route")
+            path = getattr(route, "path", scope["path"])
+            fields = {"method": scope["method"], "path": path, "status": status,
+                      "duration_ms": round(duration * 1000, 1)}
+            if duration >= self.threshold and self.sampler.allow(f"{scope['method']} {path}"):
+                self.logger.warning("slow request", extra=fields)
+            else:
+                self.logger.debug("request", extra=fields)
+            request_id_var.reset(token)
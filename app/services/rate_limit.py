@@ -0,0 +1,115 @@
+import math
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import case, literal
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from config import get_settings
+from database.settings import get_engine
+from models.rate_limit import RateLimitCounter
+from models.user import User
+from services.user_auth import get_current_user
+
+UPLOAD_SCOPE = "upload"
+CHECK_SCOPE = "check"
+WINDOW_SECONDS = 60
+
+
+class TokenBucket:
+    __slots__ = ("capacity", "refill_per_second", "tokens", "updated_at")
+
+    def __init__(self, capacity: int, refill_per_second: float, now: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated_at = now
+
+    def take(self, now: float) -> Tuple[bool, float]:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True, 0.0
+        return False, (1 - self.tokens) / self.refill_per_second
+
+
+class MemoryRateLimiter:
+    """Per-process token buckets; every worker enforces the limits on its own."""
+
+    def __init__(self, limits: Dict[str, int], clock: Callable[[], float] = time.monotonic):
+        self.limits = limits
+        self.clock = clock
+        self.buckets: Dict[Tuple[str, int], TokenBucket] = {}
+
+    async def hit(self, scope: str, user_id: int) -> Tuple[bool, float]:
+        now = self.clock()
+        bucket = self.buckets.get((scope, user_id))
+        if bucket is None:
+            limit = self.limits[scope]
+            bucket = self.buckets[(scope, user_id)] = TokenBucket(limit, limit / WINDOW_SECONDS, now)
+        return bucket.take(now)
+
+
+class DatabaseRateLimiter:
+    """Fixed one-minute windows counted in the database, shared by all workers.
+
+    Counters are upserted on a connection of their own, so a hit commits without touching
+    the request's session and its pending changes.
+    """
+
+    def __init__(self, limits: Dict[str, int], clock: Callable[[], float] = time.time,
+                 engine: Optional[AsyncEngine] = None):
+        self.limits = limits
+        self.clock = clock
+        self.engine = engine
+
+    async def hit(self, scope: str, user_id: int) -> Tuple[bool, float]:
+        now = self.clock()
+        window = int(now // WINDOW_SECONDS)
+        engine = self.engine or get_engine()
+
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        statement = insert(RateLimitCounter).values(key=f"{scope}:{user_id}", window=window, count=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[RateLimitCounter.key],
+            set_={
+                "count": case((RateLimitCounter.window == window, RateLimitCounter.count + 1), else_=literal(1)),
+                "window": window,
+            },
+        ).returning(RateLimitCounter.count)
+        async with engine.begin() as connection:
+            count = (await connection.execute(statement)).scalar_one()
+
+        if count <= self.limits[scope]:
+            return True, 0.0
+        return False, (window + 1) * WINDOW_SECONDS - now
+
+
+@lru_cache
+def get_rate_limiter():
+    settings = get_settings().rate_limit
+    limits = {UPLOAD_SCOPE: settings.RATE_LIMIT_UPLOADS_PER_MINUTE, CHECK_SCOPE: settings.RATE_LIMIT_CHECKS_PER_MINUTE}
+    if settings.RATE_LIMIT_BACKEND == "database":
+        return DatabaseRateLimiter(limits)
+    return MemoryRateLimiter(limits)
+
+
+class RateLimit:
+    def __init__(self, scope: str):
+        self.scope = scope
+
+    async def __call__(self, current_user: User = Depends(get_current_user)) -> None:
+        allowed, retry_after = await get_rate_limiter().hit(self.scope, current_user.id)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, try again later",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
@@ -0,0 +1,20 @@
+from typing import Any
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+# Dumps schema instances, lists of them and plain data alike, each model by its own schema.
+_PLAIN_DATA = TypeAdapter(Any)
+
+
+class SchemaResponse(ORJSONResponse):
+    """JSON response for content made of schema instances that were validated when they were built.
+
+    Returned from an endpoint it bypasses the ``response_model`` pass, where FastAPI
+    validates every model a second time and runs it through ``jsonable_encoder``.
+    pydantic-core dumps the models to plain data and orjson encodes that; the
+    ``response_model`` still documents the endpoint.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return super().render(_PLAIN_DATA.dump_python(content))
@@ -0,0 +1,261 @@
+import asyncio
+import multiprocessing
+from queue import Empty
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from config import get_settings, SchedulerSettings
+from services.logs import request_id_var, run_with_request_id
+from services.tracing import TraceParent, current_trace_parent, get_tracer, span
+
+SMALL_LANE = "small"
+LARGE_LANE = "large"
+WAIT_SAMPLES = 1000
+EVENT_POLL_SECONDS = 0.25
+
+
+class SchedulerQueueFull(Exception):
+    pass
+
+
+def run_validation(file_path: str, rules: List[str], max_issues: Optional[int],
+                   events=None) -> Tuple[List[str], bool, Dict[str, int]]:
+    # Runs inside the lane's worker process, so python-docx is only ever imported there.
+    from utils.helper_apa import APAValidator
+
+    validator = APAValidator(rules, max_issues, listener=events.put if events is not None else None, span=span)
+    issues = validator.validate_document(file_path)
+    return issues, validator.truncated, validator.rule_counts
+
+
+def run_annotation(file_path: str, rules: List[str], output_path: str) -> int:
+    from utils.docx_annotate import annotate_docx
+    from utils.helper_apa import APAValidator
+
+    validator = APAValidator(rules, span=span)
+    issues = validator.validate_document(file_path)
+    return annotate_docx(file_path, output_path, issues, validator.issue_paragraphs)
+
+
+def run_autofix(file_path: str, output_path: str) -> Dict[str, int]:
+    from utils.docx_autofix import autofix_docx
+
+    return autofix_docx(file_path, output_path)
+
+
+def run_job(request_id: Optional[str], trace_parent: Optional[TraceParent], attributes: Dict[str, Any],
+            fn: Callable, *args: Any) -> Any:
+    """Runs in the lane's worker with the request id and, if it was traced, the trace of the submitting request."""
+    if trace_parent is None:
+        return run_with_request_id(request_id, fn, *args)
+    with get_tracer().continue_trace(f"scheduler.{fn.__name__}", trace_parent, **attributes):
+        return run_with_request_id(request_id, fn, *args)
+
+
+class Job:
+    __slots__ = ("user_id", "fn", "args", "future", "enqueued_at", "request_id", "trace_parent")
+
+    def __init__(self, user_id: int, fn: Callable, args: tuple, future: asyncio.Future):
+        self.user_id = user_id
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        # Jobs are dispatched later from another task and run in a worker process, neither sees the request's context.
+        self.request_id = request_id_var.get()
+        self.trace_parent = current_trace_parent()
+
+
+class Lane:
+    """A pool of workers with one FIFO queue per user, served round-robin.
+
+    A user with a hundred queued checks only gets every n-th free worker slot when n
+    users are waiting, so batch submissions cannot starve everybody else.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued_per_user: int,
+                 executor_factory: Callable[[int], Executor] = ProcessPoolExecutor):
+        self.name = name
+        self.workers = workers
+        self.max_queued_per_user = max_queued_per_user
+        self.queues: "OrderedDict[int, Deque[Job]]" = OrderedDict()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLES)
+        self._executor_factory = executor_factory
+        self._executor: Optional[Executor] = None
+        self._tasks = set()
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = self._executor_factory(self.workers)
+        return self._executor
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def submit(self, user_id: int, fn: Callable, *args: Any) -> asyncio.Future:
+        queue = self.queues.get(user_id)
+        if len(queue or ()) >= self.max_queued_per_user:
+            raise SchedulerQueueFull(f"Too many queued checks in the {self.name} lane, try again later")
+        if queue is None:
+            queue = self.queues[user_id] = deque()
+
+        future = asyncio.get_running_loop().create_future()
+        queue.append(Job(user_id, fn, args, future))
+        self._dispatch()
+        return future
+
+    def _next_job(self) -> Job:
+        user_id, queue = next(iter(self.queues.items()))
+        job = queue.popleft()
+        if queue:
+            self.queues.move_to_end(user_id)
+        else:
+            del self.queues[user_id]
+        return job
+
+    def _dispatch(self) -> None:
+        while self.running < self.workers and self.queues:
+            job = self._next_job()
+            if job.future.cancelled():
+                continue
+            wait = time.monotonic() - job.enqueued_at
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+            self.waits.append(wait)
+
+            self.running += 1
+            task = asyncio.ensure_future(self._run(job, wait))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: Job, wait: float) -> None:
+        attributes = {"scheduler.lane": self.name, "scheduler.wait_ms": round(wait * 1000, 1)}
+        executor = self.executor
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, run_job, job.request_id, job.trace_parent, attributes, job.fn, *job.args)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and self._executor is executor:
+                # A worker died (crashed, out of memory), the pool takes no more jobs; later ones get a new one.
+                executor.shutdown(wait=False)
+                self._executor = None
+            self.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            self.completed += 1
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self.running -= 1
+            self._dispatch()
+
+    def metrics(self) -> Dict[str, Any]:
+        waits = sorted(self.waits)
+        started = self.completed + self.failed + self.running
+        return {
+            "lane": self.name,
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_seconds_avg": self.wait_seconds_total / started if started else 0.0,
+            "wait_seconds_p50": waits[len(waits) // 2] if waits else 0.0,
+            "wait_seconds_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ValidationScheduler:
+    def __init__(self, settings: SchedulerSettings,
+                 executor_factory: Callable[[int], Executor] = ProcessPoolExecutor):
+        self.settings = settings
+        self.lanes = {
+            SMALL_LANE: Lane(SMALL_LANE, settings.SCHEDULER_SMALL_WORKERS,
+                             settings.SCHEDULER_MAX_QUEUED_PER_USER, executor_factory),
+            LARGE_LANE: Lane(LARGE_LANE, settings.SCHEDULER_LARGE_WORKERS,
+                             settings.SCHEDULER_MAX_QUEUED_PER_USER, executor_factory),
+        }
+        self._manager = None
+
+    def choose_lane(self, document) -> str:
+        if (document.document_xml_bytes or 0) >= self.settings.SCHEDULER_LARGE_DOCUMENT_XML_BYTES:
+            return LARGE_LANE
+        if (document.paragraph_count_hint or 0) >= self.settings.SCHEDULER_LARGE_DOCUMENT_PARAGRAPHS:
+            return LARGE_LANE
+        if (document.size_bytes or 0) >= self.settings.SCHEDULER_LARGE_DOCUMENT_BYTES:
+            return LARGE_LANE
+        return SMALL_LANE
+
+    async def validate(self, user_id: int, document, rules: List[str],
+                       max_issues: Optional[int] = None) -> Tuple[List[str], bool, Dict[str, int]]:
+        lane = self.lanes[self.choose_lane(document)]
+        return await lane.submit(user_id, run_validation, document.file_path, rules, max_issues)
+
+    async def annotate(self, user_id: int, document, rules: List[str], output_path: str) -> int:
+        lane = self.lanes[self.choose_lane(document)]
+        return await lane.submit(user_id, run_annotation, document.file_path, rules, output_path)
+
+    async def autofix(self, user_id: int, document, output_path: str) -> Dict[str, int]:
+        lane = self.lanes[self.choose_lane(document)]
+        return await lane.submit(user_id, run_autofix, document.file_path, output_path)
+
+    async def stream(self, user_id: int, document, rules: List[str],
+                     max_issues: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run a check like ``validate`` and yield the validator's rule events while it runs.
+
+        The last item is ``{'event': 'result', 'issues': [...], 'truncated': bool, 'rule_counts': {...}}``;
+        an exception raised by the check is raised after the events it sent.
+        """
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        events = self._manager.Queue()
+        lane = self.lanes[self.choose_lane(document)]
+        future = lane.submit(user_id, run_validation, document.file_path, rules, max_issues, events)
+        loop = asyncio.get_running_loop()
+
+        while not future.done():
+            try:
+                yield await loop.run_in_executor(None, events.get, True, EVENT_POLL_SECONDS)
+            except Empty:
+                pass
+        # The worker has put all its events by the time its job completes, some may still be queued.
+        while True:
+            try:
+                yield events.get_nowait()
+            except Empty:
+                break
+        issues, truncated, rule_counts = await future
+        yield {"event": "result", "issues": issues, "truncated": truncated, "rule_counts": rule_counts}
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        return [lane.metrics() for lane in self.lanes.values()]
+
+    def shutdown(self) -> None:
+        for lane in self.lanes.values():
+            lane.shutdown()
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+@lru_cache
+def get_scheduler() -> ValidationScheduler:
+    return ValidationScheduler(get_settings().scheduler)
@@ -0,0 +1,317 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from inspect import isasyncgenfunction, iscoroutinefunction
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import TracingSettings, get_settings
+from services.logs import request_id_var
+
+SERVICE_NAME = "apa-checker"
+TRACEPARENT_HEADER = "traceparent"
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+MAX_STATEMENT_CHARS = 2000
+
+# OTLP span kinds and status codes.
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+STATUS_ERROR = 2
+
+# (trace id, span id) of the span a job was submitted from, so worker processes can continue the trace.
+TraceParent = Tuple[str, str]
+
+
+class Span:
+    """One timed operation of a sampled trace.
+
+    Finished spans are collected on their local root, the request span or the first span
+    of a worker process, and exported together when it ends.
+    """
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns",
+                 "error", "root", "finished", "exporter", "_token")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any],
+                 kind: int = KIND_INTERNAL, root: Optional["Span"] = None, exporter: "Exporter" = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self.root = root or self
+        self.finished: List["Span"] = []
+        self.exporter = exporter
+        self._token = None
+
+    @property
+    def is_recording(self) -> bool:
+        return True
+
+    @property
+    def trace_parent(self) -> TraceParent:
+        return self.trace_id, self.span_id
+
+    def child(self, name: str, attributes: Dict[str, Any], kind: int = KIND_INTERNAL) -> "Span":
+        return Span(name, self.trace_id, self.span_id, attributes, kind, self.root)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        self.end_ns = time.time_ns()
+        self.root.finished.append(self)
+        if self.root is self:
+            self.exporter.export(self.finished)
+
+    def __enter__(self) -> "Span":
+        self._token = current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current_span.reset(self._token)
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+
+
+class NoopSpan:
+    """Stands in for every span of an unsampled request; using it costs an attribute lookup."""
+
+    is_recording = False
+    trace_parent = None
+
+    def child(self, name: str, attributes: Dict[str, Any], kind: int = KIND_INTERNAL) -> "NoopSpan":
+        return self
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> "NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any):
+    """A child of the current span, to be used as ``with span(...):``; a no-op outside sampled traces."""
+    parent = current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return parent.child(name, attributes, kind)
+
+
+def current_trace_parent() -> Optional[TraceParent]:
+    parent = current_span.get()
+    return parent.trace_parent if parent is not None else None
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator wrapping every call of a function, coroutine function or async generator in a span."""
+
+    def decorate(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if isasyncgenfunction(fn):
+            @wraps(fn)
+            async def generator_wrapper(*args, **kwargs):
+                # Not made current: the generator's steps may run in different contexts.
+                generator_span = span(span_name)
+                try:
+                    async for item in fn(*args, **kwargs):
+                        yield item
+                except BaseException as e:
+                    generator_span.record_error(e)
+                    raise
+                finally:
+                    generator_span.end()
+            return generator_wrapper
+
+        if iscoroutinefunction(fn):
+            @wraps(fn)
+            async def coroutine_wrapper(*args, **kwargs):
+                if current_span.get() is None:
+                    return await fn(*args, **kwargs)
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return coroutine_wrapper
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _attribute_value(value)} for key, value in attributes.items()]
+
+
+def otlp_json(spans: List[Span]) -> Dict[str, Any]:
+    """``spans`` in the OTLP/JSON encoding of an ``ExportTraceServiceRequest``."""
+    encoded = []
+    for finished in spans:
+        encoded_span = {
+            "traceId": finished.trace_id,
+            "spanId": finished.span_id,
+            "name": finished.name,
+            "kind": finished.kind,
+            "startTimeUnixNano": str(finished.start_ns),
+            "endTimeUnixNano": str(finished.end_ns),
+            "attributes": _attributes(finished.attributes),
+            "status": {"code": STATUS_ERROR, "message": finished.error} if finished.error else {},
+        }
+        if finished.parent_id is not None:
+            encoded_span["parentSpanId"] = finished.parent_id
+        encoded.append(encoded_span)
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+        "scopeSpans": [{"scope": {"name": "app"}, "spans": encoded}],
+    }]}
+
+
+class Exporter:
+    """Writes each exported batch as one OTLP/JSON line to stdout or, with ``path``, appends it to a file.
+
+    The file is opened per batch, so scheduler worker processes can export to the same
+    file as the API process.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(otlp_json(spans)) + "\n"
+        with self.lock:
+            if self.path is None:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                with open(self.path, "a") as file:
+                    file.write(line)
+
+
+class Tracer:
+    def __init__(self, settings: TracingSettings):
+        self.sample_rate = settings.TRACING_SAMPLE_RATE
+        self.exporter = Exporter(settings.TRACING_FILE if settings.TRACING_EXPORTER == "file" else None)
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, kind: int = KIND_SERVER,
+                    **attributes: Any):
+        """The root span of a request; callers that sent a sampled ``traceparent`` header are always traced."""
+        match = TRACEPARENT.match(traceparent) if traceparent else None
+        if match is not None:
+            if not int(match.group(3), 16) & 1:
+                return NOOP_SPAN
+            return Span(name, match.group(1), match.group(2), attributes, kind, exporter=self.exporter)
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return NOOP_SPAN
+        return Span(name, os.urandom(16).hex(), None, attributes, kind, exporter=self.exporter)
+
+    def continue_trace(self, name: str, trace_parent: TraceParent, **attributes: Any) -> Span:
+        """A local root continuing a sampled trace started in another process."""
+        trace_id, parent_id = trace_parent
+        return Span(name, trace_id, parent_id, attributes, exporter=self.exporter)
+
+
+@lru_cache
+def get_tracer() -> Tracer:
+    return Tracer(get_settings().tracing)
+
+
+def trace_engine(engine) -> None:
+    """Record every statement ``engine`` runs inside a sampled trace as a ``db.query`` span."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("trace_spans", []).append(
+            span("db.query", KIND_CLIENT, **{"db.system": conn.dialect.name,
+                                             "db.statement": statement[:MAX_STATEMENT_CHARS]}))
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["trace_spans"].pop().end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        if spans:
+            failed = spans.pop()
+            failed.record_error(context.original_exception)
+            failed.end()
+
+
+class TracingMiddleware:
+    """Wrap every HTTP request in a root span named after its route template."""
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        tracer = self.tracer or get_tracer()
+        traceparent = dict(scope["headers"]).get(TRACEPARENT_HEADER.encode())
+        root = tracer.start_trace(f"{scope['method']} {scope['path']}",
+                                  traceparent.decode("latin-1") if traceparent else None,
+                                  **{"http.method": scope["method"]})
+        if not root.is_recording:
+            return await self.app(scope, receive, send)
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_with_status)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+                root.set_attribute("http.route", route.path)
+            root.set_attribute("request_id", request_id_var.get())
@@ -1,7 +1,7 @@
+import logging
 from datetime import timedelta, datetime
-from jose import JWTError, jwt
+from functools import lru_cache
 from typing import Union, Any
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from models.user import User
 from sqlalchemy import select
@@ -11,71 +11,85 @@ from fastapi.security import OAuth2PasswordBearer
 from schemas.user import UserResponseSchemas
 from database.settings import get_session
 from sqlalchemy.ext.asyncio import AsyncSession
-from config import settings
+from config import get_settings
+from services.tracing import traced
 
-ACCESS_TOKEN_EXPIRE_MINUTES = settings.token.ACCESS_TOKEN_EXPIRE_MINUTES
-REFRESH_TOKEN_EXPIRE_MINUTES = settings.token.REFRESH_TOKEN_EXPIRE_MINUTES
-ALGORITHM = settings.token.ALGORITHM
-JWT_SECRET_KEY = settings.token.JWT_SECRET_KEY
-JWT_REFRESH_SECRET_KEY = settings.token.JWT_REFRESH_SECRET_KEY
+logger = logging.getLogger("app.auth")
 
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# passlib/bcrypt and python-jose are only imported on first use to keep worker start-up fast.
+@lru_cache
+def get_password_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def get_jwt():
+    from jose import jwt
+    return jwt
 
 
 def get_hashed_password(password: str) -> str:
-    return password_context.hash(password)
+    return get_password_context().hash(password)
 
 
 def verify_password(password: str, hashed_pass: str) -> bool:
-    return password_context.verify(password, hashed_pass)
+    return get_password_context().verify(password, hashed_pass)
 
 
 async def create_access_token(subject: Union[str, Any], expires_delta: int = None) -> str:
+    token_settings = get_settings().token
     if expires_delta is not None:
         expires_delta = datetime.utcnow() + expires_delta
     else:
-        expires_delta = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta = datetime.utcnow() + timedelta(minutes=token_settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {"exp": expires_delta, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, JWT_SECRET_KEY, ALGORITHM)
+    encoded_jwt = get_jwt().encode(to_encode, token_settings.JWT_SECRET_KEY, token_settings.ALGORITHM)
     return encoded_jwt
 
 
 async def create_refresh_token(subject: Union[str, Any], expires_delta: int = None) -> str:
+    token_settings = get_settings().token
     if expires_delta is not None:
         expires_delta = datetime.utcnow() + expires_delta
     else:
-        expires_delta = datetime.utcnow() + timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES)
+        expires_delta = datetime.utcnow() + timedelta(minutes=token_settings.REFRESH_TOKEN_EXPIRE_MINUTES)
     to_encode = {"exp": expires_delta, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, JWT_REFRESH_SECRET_KEY, ALGORITHM)
+    encoded_jwt = get_jwt().encode(to_encode, token_settings.JWT_REFRESH_SECRET_KEY, token_settings.ALGORITHM)
     return encoded_jwt
 
 
 def verify_token_access(token: str, credentials_exception):
+    jwt = get_jwt()
+    token_settings = get_settings().token
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=ALGORITHM)
+        payload = jwt.decode(token, token_settings.JWT_SECRET_KEY, algorithms=token_settings.ALGORITHM)
         id: str = payload.get("sub")
         if id is None:
             raise credentials_exception
         token_data = id
-    except JWTError as e:
-        print(e)
+    except jwt.JWTError as e:
+        logger.info("access token rejected", extra={"reason": str(e)})
         raise credentials_exception
     return token_data
 
 
 def verify_refresh_token(token: str, credentials_exception):
+    jwt = get_jwt()
+    token_settings = get_settings().token
     try:
-        payload = jwt.decode(token, JWT_REFRESH_SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, token_settings.JWT_REFRESH_SECRET_KEY, algorithms=[token_settings.ALGORITHM])
         id: str = payload.get("sub")
         if id is None:
             raise credentials_exception
         token_data = id
-    except JWTError as e:
-        print(e)
+    except jwt.JWTError as e:
+        logger.info("refresh token rejected", extra={"reason": str(e)})
         raise credentials_exception
     return token_data
 
 
+@traced()
 async def login_user(db: Depends(get_session), user_log: OAuth2PasswordRequestForm = Depends()) -> Token:
     existing_user = await db.execute(select(User).filter(
         (User.username == user_log.username)))
@@ -98,6 +112,7 @@ reuseable_oauth = OAuth2PasswordBearer(
 )
 
 
+@traced()
 async def get_current_user(token: str = Depends(reuseable_oauth),
                            db: AsyncSession = Depends(get_session)) -> UserResponseSchemas:
     credentials_exception = HTTPException(
@@ -106,8 +121,10 @@ async def get_current_user(token: str = Depends(reuseable_oauth),
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    jwt = get_jwt()
+    token_settings = get_settings().token
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, token_settings.JWT_SECRET_KEY, algorithms=[token_settings.ALGORITHM])
         user_id = payload.get("sub")
         exp = payload.get("exp")
 
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import re
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+# Only the token settings matter when the tests run against SQLite, fill in the rest so no .env is needed.
+for name, value in {
+    "DB_HOST": "localhost", "DB_PORT": "5432", "DB_USER": "test", "DB_PASSWORD": "test", "DB_NAME": "test",
+    "ALGORITHM": "HS256", "ACCESS_TOKEN_EXPIRE_MINUTES": "30", "REFRESH_TOKEN_EXPIRE_MINUTES": "60",
+    "JWT_SECRET_KEY": "test-secret", "JWT_REFRESH_SECRET_KEY": "test-refresh-secret",
+}.items():
+    os.environ.setdefault(name, value)
+
+from config import get_settings  # noqa: E402
+from database.settings import Base, get_session  # noqa: E402
+from services.tracing import trace_engine  # noqa: E402
+import models.user, models.document, models.rate_limit, models.search, models.statistics  # noqa: E402,F401
+
+# Statements the transactional fixture issues itself; they are not part of an endpoint's budget.
+FIXTURE_STATEMENTS = re.compile(r"^\s*(BEGIN|SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.IGNORECASE)
+
+
+def pytest_addoption(parser):
+    parser.addoption("--db-backend", choices=("sqlite", "postgres"),
+                     default=os.environ.get("TEST_DB_BACKEND", "sqlite"),
+                     help="database the API tests run against; postgres uses the DB_TEST_* settings")
+
+
+def _postgres_url() -> str:
+    db = get_settings().db
+    return f"postgresql+asyncpg://{db.DB_TEST_USER}:{db.DB_TEST_PASSWORD}@{db.DB_TEST_HOST}:{db.DB_TEST_PORT}/" \
+           f"{db.DB_TEST_NAME}"
+
+
+def _enable_sqlite_savepoints(engine) -> None:
+    # pysqlite manages transactions on its own and breaks SAVEPOINT; let SQLAlchemy emit BEGIN instead.
+    @event.listens_for(engine.sync_engine, "connect")
+    def do_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def do_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+async def _create_schema(engine) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def _drop_schema(engine) -> None:
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def db_engine(request, tmp_path_factory):
+    """One schema per test session; NullPool so every test's event loop gets its own connection."""
+    if request.config.getoption("--db-backend") == "postgres":
+        engine = create_async_engine(_postgres_url(), poolclass=NullPool)
+    else:
+        path = tmp_path_factory.mktemp("db") / "test.sqlite3"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        _enable_sqlite_savepoints(engine)
+    trace_engine(engine)
+
+    asyncio.run(_create_schema(engine))
+    yield engine
+    asyncio.run(_drop_schema(engine))
+
+
+@pytest.fixture
+async def db_session(db_engine, monkeypatch):
+    """A session inside a transaction that is rolled back after the test.
+
+    ``commit()`` in application code only releases a SAVEPOINT, so endpoints behave as
+    usual while nothing they write outlives the test. Sessions streamed responses open
+    for themselves join the same transaction.
+    """
+    from main import app
+    from services.rate_limit import get_rate_limiter
+
+    async with db_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(bind=connection, expire_on_commit=False, join_transaction_mode="create_savepoint")
+        sessions = sessionmaker(connection, class_=AsyncSession, expire_on_commit=False,
+                                join_transaction_mode="create_savepoint")
+
+        async def override_session():
+            yield session
+
+        app.dependency_overrides[get_session] = override_session
+        monkeypatch.setattr("crud.document.get_sessionmaker", lambda: sessions)
+        get_rate_limiter.cache_clear()
+        try:
+            yield session
+        finally:
+            app.dependency_overrides.pop(get_session, None)
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest.fixture
+def assert_max_queries(db_engine):
+    """``with assert_max_queries(n): ...`` fails if the block sends more than ``n`` statements to the database."""
+
+    @contextmanager
+    def assert_max_queries(limit: int):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if not FIXTURE_STATEMENTS.match(statement):
+                statements.append(statement)
+
+        event.listen(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+        assert len(statements) <= limit, \
+            f"{len(statements)} queries, budget is {limit}:\n" + "\n".join(statements)
+
+    return assert_max_queries
+
+
+@pytest.fixture(scope="session", autouse=True)
+def shutdown_scheduler():
+    yield
+    from services.scheduler import get_scheduler
+    get_scheduler().shutdown()
@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from docx import Document as DocxDocument
+from utils.apa_check import main, parse_args
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_apa_check_resumes_from_existing_results(tmp_path):
+    documents = tmp_path / "documents"
+    (documents / "nested").mkdir(parents=True)
+    doc = DocxDocument()
+    doc.add_paragraph("This is a test document.")
+    doc.save(documents / "first.docx")
+    doc.save(documents / "nested" / "second.docx")
+    (documents / "notes.txt").write_text("not a document")
+    output = tmp_path / "results.jsonl"
+
+    assert main([str(documents), "-o", str(output), "-w", "1", "--no-progress"]) == 0
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["path"] for record in records) == [
+        str(documents / "first.docx"), str(documents / "nested" / "second.docx")]
+    assert all(record["issue_count"] == len(record["issues"]) > 0 for record in records)
+
+    (documents / "broken.docx").write_bytes(b"not a zip file")
+    assert main([str(documents), "-o", str(output), "-w", "1", "--no-progress"]) == 1
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(records) == 3
+    assert records[-1]["path"] == str(documents / "broken.docx")
+    assert "error" in records[-1]
+
+
+def test_apa_check_runs_from_the_repository_root(tmp_path):
+    # The documented invocation; utils/ must not depend on modules only importable from inside app/.
+    doc = DocxDocument()
+    doc.add_paragraph("This is a test document.")
+    doc.save(tmp_path / "paper.docx")
+    output = tmp_path / "results.jsonl"
+    env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+
+    result = subprocess.run(
+        [sys.executable, "-m", "app.utils.apa_check", str(tmp_path), "-o", str(output), "-w", "1", "--no-progress"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(output.read_text())["path"] == str(tmp_path / "paper.docx")
+
+
+def test_apa_check_rejects_non_positive_limits(tmp_path, capsys):
+    for option in ("--max-issues", "--workers"):
+        for value in ("0", "-1"):
+            with pytest.raises(SystemExit):
+                parse_args([str(tmp_path), option, value])
+            assert "must be at least 1" in capsys.readouterr().err
+    assert parse_args([str(tmp_path), "--max-issues", "1"]).max_issues == 1
+
+
+def test_apa_check_checks_more_files_than_fit_in_flight(tmp_path):
+    doc = DocxDocument()
+    doc.add_paragraph("This is a test document.")
+    for i in range(10):
+        doc.save(tmp_path / f"paper{i}.docx")
+    output = tmp_path / "results.jsonl"
+
+    assert main([str(tmp_path), "-o", str(output), "-w", "1", "--no-progress"]) == 0
+
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["path"] for record in records) == sorted(str(tmp_path / f"paper{i}.docx") for i in range(10))
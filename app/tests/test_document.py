@@ -1,46 +1,28 @@
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
-from database.settings import get_session, Base
-from app.main import app
+from sqlalchemy.ext.asyncio import AsyncSession
+from main import app
 from sqlalchemy.future import select
 from schemas.token import Token
 from httpx import AsyncClient
-from sqlalchemy.pool import NullPool
-from config import settings
 from io import BytesIO
 import os
 from docx import Document as DocxDocument
 from models.document import FormattingSuggestion
+import crud.document
+from crud.document import get_user_storage_bytes
+from fastapi import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from config import SchedulerSettings
+from services.scheduler import ValidationScheduler
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from database.settings import Base
 
-DATABASE_TEST_URL = f"postgresql+asyncpg://{settings.db.DB_TEST_USER}:{settings.db.DB_TEST_PASSWORD}@{settings.db.DB_TEST_HOST}/{settings.db.DB_TEST_NAME}"
-
-test_engine = create_async_engine(DATABASE_TEST_URL, echo=True, future=True, poolclass=NullPool)
-
-TestSessionLocal = sessionmaker(
-    bind=test_engine, class_=AsyncSession, expire_on_commit=False
-)
-
-
-@pytest.fixture(scope="function")
-async def test_db_session():
-    async with TestSessionLocal() as session:
-        async with test_engine.begin() as conn:
-            await conn.run_sync(Base.metadata.drop_all)
-            await conn.run_sync(Base.metadata.create_all)
-
-        yield session
-
-    async with test_engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-
-
-@pytest.fixture(autouse=True)
-async def override_get_session(test_db_session):
-    async def override_session():
-        yield test_db_session
 
-    app.dependency_overrides[get_session] = override_session
+@pytest.fixture
+def test_db_session(db_session: AsyncSession):
+    return db_session
 
 
 async def create_and_login_user(client, user_data):
@@ -112,3 +94,333 @@ async def test_create_document(test_db_session: AsyncSession):
         assert formatting_suggestion is not None
         assert formatting_suggestion.description == response_data["description"]
         os.remove(file_path)
+
+
+@pytest.mark.asyncio
+async def test_get_documents_with_suggestions(test_db_session: AsyncSession):
+    user_data = {
+        "email": "test3@example.com",
+        "username": "testuser3",
+        "password": "hashedpassword",
+        "first_name": "Test",
+        "last_name": "User"
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        access_token = await create_and_login_user(client, user_data)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        doc = DocxDocument()
+        doc.add_paragraph("This is a test document.")
+        file_content = BytesIO()
+        doc.save(file_content)
+
+        document_ids = []
+        for file_name in ("first.docx", "second.docx"):
+            response = await client.post(
+                "/api/v1/document/create",
+                files={"file": (file_name, BytesIO(file_content.getvalue()),
+                                "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+                headers=headers
+            )
+            assert response.status_code == 201
+            document_ids.append(response.json()["id"])
+
+        response = await client.post(
+            "/api/v1/document/apa_style_check?document_id=" + str(document_ids[0]),
+            headers=headers
+        )
+        assert response.status_code == 201
+
+        response = await client.get("/api/v1/user/documents/suggestions", headers=headers)
+        assert response.status_code == 200
+        summary = {item["id"]: item for item in response.json()}
+        assert summary[document_ids[0]]["suggestion_count"] == 1
+        assert summary[document_ids[0]]["last_checked_at"] is not None
+        assert summary[document_ids[1]]["suggestion_count"] == 0
+        assert "formatting_suggestions" not in summary[document_ids[0]]
+
+        response = await client.get("/api/v1/user/documents/suggestions?details=true", headers=headers)
+        assert response.status_code == 200
+        details = {item["id"]: item for item in response.json()}
+        assert len(details[document_ids[0]]["formatting_suggestions"]) == 1
+        assert details[document_ids[0]]["formatting_suggestions"][0]["description"] != ""
+        assert details[document_ids[1]]["formatting_suggestions"] == []
+
+        # A new version has not been checked yet, the first version's suggestion is no longer its latest.
+        response = await client.post(
+            f"/api/v1/document/{document_ids[0]}/versions",
+            files={"file": ("first.docx", BytesIO(file_content.getvalue()),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        version_id = response.json()["id"]
+        response = await client.get("/api/v1/user/documents/suggestions", headers=headers)
+        assert {item["id"]: item for item in response.json()}[document_ids[0]]["suggestion_count"] == 0
+
+        await client.post(f"/api/v1/document/apa_style_check?document_id={document_ids[0]}", headers=headers)
+        response = await client.get("/api/v1/user/documents/suggestions", headers=headers)
+        assert {item["id"]: item for item in response.json()}[document_ids[0]]["suggestion_count"] == 1
+        response = await client.get("/api/v1/user/documents/suggestions?details=true", headers=headers)
+        suggestions = {item["id"]: item for item in response.json()}[document_ids[0]]["formatting_suggestions"]
+        assert [suggestion["version_id"] for suggestion in suggestions] == [version_id]
+
+
+@pytest.mark.asyncio
+async def test_document_versions(test_db_session: AsyncSession):
+    user_data = {
+        "email": "test4@example.com",
+        "username": "testuser4",
+        "password": "hashedpassword",
+        "first_name": "Test",
+        "last_name": "User"
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        access_token = await create_and_login_user(client, user_data)
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        contents = []
+        for text in ("First draft.", "Second draft."):
+            doc = DocxDocument()
+            doc.add_paragraph(text)
+            content = BytesIO()
+            doc.save(content)
+            contents.append(content.getvalue())
+
+        response = await client.post(
+            "/api/v1/document/create",
+            files={"file": ("thesis.docx", BytesIO(contents[0]),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        assert response.status_code == 201
+        document_id = response.json()["id"]
+
+        response = await client.post(f"/api/v1/document/apa_style_check?document_id={document_id}", headers=headers)
+        assert response.status_code == 201
+
+        response = await client.post(
+            f"/api/v1/document/{document_id}/versions",
+            files={"file": ("thesis.docx", BytesIO(contents[1]),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        assert response.status_code == 201
+        assert response.json()["version"] == 2
+        assert response.json()["stored_bytes"] < response.json()["size_bytes"] / 10
+
+        response = await client.get(f"/api/v1/document/{document_id}/versions", headers=headers)
+        assert response.status_code == 200
+        versions = response.json()
+        assert [version["version"] for version in versions] == [1, 2]
+        assert len(versions[0]["formatting_suggestions"]) == 1
+        assert versions[1]["formatting_suggestions"] == []
+
+        # The working copy of the latest version is kept on disk next to the part store and counts as well.
+        user_id = (await client.get("/api/v1/user/info", headers=headers)).json()["id"]
+        assert await get_user_storage_bytes(user_id, test_db_session) == \
+            len(contents[1]) + sum(version["stored_bytes"] for version in versions)
+
+        response = await client.get(
+            f"/api/v1/document/{document_id}/versions/diff?from_version=1&to_version=2", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["changed"] == ["word/document.xml"]
+
+        response = await client.get(f"/api/v1/document/{document_id}/versions/1/file", headers=headers)
+        assert response.status_code == 200
+        assert DocxDocument(BytesIO(response.content)).paragraphs[0].text == "First draft."
+
+        response = await client.delete(f"/api/v1/document/delete/{document_id}", headers=headers)
+        assert response.status_code == 204
+
+
+@pytest.mark.asyncio
+async def test_concurrent_version_number_conflict_is_reported(test_db_session: AsyncSession, monkeypatch):
+    user_data = {
+        "email": "test5@example.com",
+        "username": "testuser5",
+        "password": "hashedpassword",
+        "first_name": "Test",
+        "last_name": "User"
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        access_token = await create_and_login_user(client, user_data)
+        headers = {"Authorization": f"Bearer {access_token}"}
+        doc = DocxDocument()
+        doc.add_paragraph("Draft.")
+        content = BytesIO()
+        doc.save(content)
+        response = await client.post(
+            "/api/v1/document/create",
+            files={"file": ("race.docx", BytesIO(content.getvalue()),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        document = await test_db_session.get(crud.document.Document, response.json()["id"])
+
+    async def stale_latest_version(document_id, db):
+        return None
+
+    # What a second upload that read the latest version before the first one committed would do.
+    monkeypatch.setattr(crud.document, "get_latest_version", stale_latest_version)
+    with pytest.raises(HTTPException) as error:
+        await crud.document.create_document_version(document, document.file_path, "race.docx", test_db_session)
+    assert error.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_uploads_with_the_same_name_keep_separate_files(test_db_session: AsyncSession):
+    doc = DocxDocument()
+    doc.add_paragraph("Shared name.")
+    content = BytesIO()
+    doc.save(content)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        paths = []
+        for username in ("samename1", "samename2"):
+            access_token = await create_and_login_user(client, {
+                "email": f"{username}@example.com", "username": username, "password": "hashedpassword",
+                "first_name": "Test", "last_name": "User"})
+            headers = {"Authorization": f"Bearer {access_token}"}
+            response = await client.post(
+                "/api/v1/document/create",
+                files={"file": ("paper.docx", BytesIO(content.getvalue()),
+                                "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+                headers=headers
+            )
+            assert response.status_code == 201
+            paths.append(response.json()["file_path"])
+
+        assert paths[0] != paths[1]
+        response = await client.delete(f"/api/v1/document/delete/{response.json()['id']}", headers=headers)
+        assert response.status_code == 204
+        assert os.path.exists(paths[0]) and not os.path.exists(paths[1])
+
+
+@pytest.mark.asyncio
+async def test_stream_reports_a_failed_check_as_an_error_event(test_db_session: AsyncSession, monkeypatch):
+    def failing_validation(file_path, rules, max_issues, events):
+        events.put({"event": "rule", "rule": "font"})
+        raise ValueError("corrupt document")
+
+    scheduler = ValidationScheduler(SchedulerSettings(), executor_factory=ThreadPoolExecutor)
+    monkeypatch.setattr("services.scheduler.run_validation", failing_validation)
+    monkeypatch.setattr(crud.document, "get_scheduler", lambda: scheduler)
+    doc = DocxDocument()
+    doc.add_paragraph("Streamed.")
+    content = BytesIO()
+    doc.save(content)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        access_token = await create_and_login_user(client, {
+            "email": "streamer@example.com", "username": "streamer", "password": "hashedpassword",
+            "first_name": "Test", "last_name": "User"})
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = await client.post(
+            "/api/v1/document/create",
+            files={"file": ("paper.docx", BytesIO(content.getvalue()),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        response = await client.get(f"/api/v1/document/apa_style_check/stream?document_id={response.json()['id']}",
+                                    headers=headers)
+    scheduler.shutdown()
+
+    assert response.status_code == 200
+    events = [block.split("\n")[0] for block in response.text.strip().split("\n\n")]
+    assert events == ["event: rule", "event: error"]
+
+
+@pytest.mark.asyncio
+async def test_stream_saves_the_result_on_its_own_session(tmp_path, monkeypatch):
+    """No session override here: the stream runs after get_session has closed the request's session."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stream.sqlite3'}", poolclass=AsyncAdaptedQueuePool)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    sessions = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    monkeypatch.setattr("database.settings.get_sessionmaker", lambda: sessions)
+    monkeypatch.setattr(crud.document, "get_sessionmaker", lambda: sessions)
+
+    def validation(file_path, rules, max_issues, events):
+        events.put({"event": "rule", "rule": "font"})
+        return ["Font is not Times New Roman: 'Streamed.'"], False, {"font": 1}
+
+    scheduler = ValidationScheduler(SchedulerSettings(), executor_factory=ThreadPoolExecutor)
+    monkeypatch.setattr("services.scheduler.run_validation", validation)
+    monkeypatch.setattr(crud.document, "get_scheduler", lambda: scheduler)
+    doc = DocxDocument()
+    doc.add_paragraph("Streamed.")
+    content = BytesIO()
+    doc.save(content)
+
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            access_token = await create_and_login_user(client, {
+                "email": "ownsession@example.com", "username": "ownsession", "password": "hashedpassword",
+                "first_name": "Test", "last_name": "User"})
+            headers = {"Authorization": f"Bearer {access_token}"}
+            response = await client.post(
+                "/api/v1/document/create",
+                files={"file": ("paper.docx", BytesIO(content.getvalue()),
+                                "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+                headers=headers
+            )
+            document_id = response.json()["id"]
+            response = await client.get(f"/api/v1/document/apa_style_check/stream?document_id={document_id}",
+                                        headers=headers)
+            assert response.text.strip().split("\n\n")[-1].startswith("event: done")
+
+            response = await client.get(f"/api/v1/document/apa_style_suggestions/{document_id}", headers=headers)
+            assert response.json()["description"] == "Font is not Times New Roman: 'Streamed.'"
+            assert engine.sync_engine.pool.checkedout() == 0
+            await client.delete(f"/api/v1/document/delete/{document_id}", headers=headers)
+    finally:
+        scheduler.shutdown()
+        await engine.dispose()
+
+
+def test_prune_annotated_files_evicts_the_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(crud.document, "ANNOTATED_FILES_DIR", str(tmp_path))
+    paths = []
+    for i, document_id in enumerate((1, 1, 2)):
+        os.makedirs(tmp_path / str(document_id), exist_ok=True)
+        path = tmp_path / str(document_id) / f"{i}.docx"
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(path)
+    (tmp_path / "2" / "pending.tmp").write_bytes(b"x" * 100)
+
+    crud.document.prune_annotated_files(150, keep=str(paths[0]))
+
+    assert [path.exists() for path in paths] == [True, False, False]
+    assert (tmp_path / "2" / "pending.tmp").exists()
+
+
+@pytest.mark.asyncio
+async def test_delete_removes_the_annotated_files(test_db_session: AsyncSession):
+    doc = DocxDocument()
+    doc.add_paragraph("Annotated.")
+    content = BytesIO()
+    doc.save(content)
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        access_token = await create_and_login_user(client, {
+            "email": "annotated@example.com", "username": "annotated", "password": "hashedpassword",
+            "first_name": "Test", "last_name": "User"})
+        headers = {"Authorization": f"Bearer {access_token}"}
+        response = await client.post(
+            "/api/v1/document/create",
+            files={"file": ("paper.docx", BytesIO(content.getvalue()),
+                            "application/vnd.openxmlformats-officedocument.wordprocessingml.document")},
+            headers=headers
+        )
+        document_id = response.json()["id"]
+        response = await client.get(f"/api/v1/document/apa_annotated/{document_id}", headers=headers)
+        assert response.status_code == 200
+        assert os.listdir(crud.document.annotated_files_dir(document_id))
+
+        response = await client.delete(f"/api/v1/document/delete/{document_id}", headers=headers)
+        assert response.status_code == 204
+        assert not os.path.exists(crud.document.annotated_files_dir(document_id))
@@ -0,0 +1,58 @@
+import zipfile
+from docx import Document as DocxDocument
+from utils.docx_annotate import annotate_docx, group_issues
+from utils.helper_apa import APAValidator
+
+
+def test_group_issues_puts_document_level_issues_on_first_paragraph():
+    grouped = group_issues(["a", "b", "c"], [2, None, 2])
+
+    assert grouped == {0: ["b"], 2: ["a", "c"]}
+
+
+def test_annotate_docx_adds_comments(tmp_path):
+    doc = DocxDocument()
+    doc.add_paragraph("Title")
+    doc.add_paragraph("Body text").runs[0].font.name = "Arial"
+    src = tmp_path / "src.docx"
+    doc.save(src)
+
+    validator = APAValidator(["font"])
+    issues = validator.validate_document(str(src))
+    assert set(validator.issue_paragraphs) == {0, 1}
+
+    dst = tmp_path / "annotated.docx"
+    assert annotate_docx(str(src), str(dst), issues, validator.issue_paragraphs) == 2
+
+    with zipfile.ZipFile(dst) as archive:
+        comments = archive.read("word/comments.xml")
+        document_xml = archive.read("word/document.xml")
+        assert b"/word/comments.xml" in archive.read("[Content_Types].xml")
+        assert b"relationships/comments" in archive.read("word/_rels/document.xml.rels")
+    assert comments.count(b"<w:comment ") == 2
+    assert document_xml.count(b"<w:commentReference ") == 2
+    assert [p.text for p in DocxDocument(str(dst)).paragraphs] == ["Title", "Body text"]
+
+
+def test_annotate_docx_follows_an_absolute_comments_target(tmp_path):
+    doc = DocxDocument()
+    doc.add_paragraph("Body text").runs[0].font.name = "Arial"
+    src = tmp_path / "src.docx"
+    doc.save(src)
+    annotated = tmp_path / "annotated.docx"
+    annotate_docx(str(src), str(annotated), ["Reviewed"], [0])
+
+    absolute = tmp_path / "absolute.docx"
+    with zipfile.ZipFile(annotated) as archive, zipfile.ZipFile(absolute, "w") as out:
+        for name in archive.namelist():
+            data = archive.read(name)
+            if name == "word/_rels/document.xml.rels":
+                data = data.replace(b'Target="comments.xml"', b'Target="/word/comments.xml"')
+            out.writestr(name, data)
+
+    dst = tmp_path / "annotated_again.docx"
+    assert annotate_docx(str(absolute), str(dst), ["Font"], [0]) == 1
+
+    with zipfile.ZipFile(dst) as archive:
+        assert not [name for name in archive.namelist() if name.startswith("/")]
+        assert archive.read("word/comments.xml").count(b"<w:comment ") == 2
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+import zipfile
+from docx import Document as DocxDocument
+from docx.shared import Inches, Pt
+from utils.docx_autofix import autofix_docx
+from utils.helper_apa import APAValidator
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARK_PARAGRAPHS = int(os.environ.get("AUTOFIX_BENCHMARK_PARAGRAPHS", 20000))
+FIXED_ISSUES = ("Font is not", "Font size is not", "Margins are not", "Text is not double-spaced",
+                "Extra space found", "References should be double-spaced", "References should have a hanging")
+
+MEASURE_SCRIPT = """
+import resource, sys
+from utils.docx_autofix import autofix_docx
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+autofix_docx(sys.argv[1], sys.argv[2])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+def build_large_docx(path, paragraphs: int) -> int:
+    DocxDocument().save(path)
+    with zipfile.ZipFile(path) as template:
+        parts = {name: template.read(name) for name in template.namelist()}
+
+    document_xml = parts["word/document.xml"].decode()
+    head, tail = document_xml.split("<w:body>")
+    paragraph = ('<w:p><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr>'
+                 '<w:r><w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial"/><w:sz w:val="22"/></w:rPr>'
+                 '<w:t>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</w:t></w:r></w:p>')
+    parts["word/document.xml"] = (head + "<w:body>" + paragraph * paragraphs + tail).encode()
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return len(parts["word/document.xml"])
+
+
+def test_autofix_round_trip(tmp_path):
+    doc = DocxDocument()
+    paragraph = doc.add_paragraph("Introduction text")
+    paragraph.runs[0].font.name = "Arial"
+    paragraph.runs[0].font.size = Pt(11)
+    paragraph.paragraph_format.space_after = Pt(6)
+    doc.add_paragraph("References")
+    doc.add_paragraph("Smith, J. (2020). Title of the book. Publisher.")
+    doc.sections[0].left_margin = Inches(1.5)
+    src, dst = tmp_path / "src.docx", tmp_path / "fixed.docx"
+    doc.save(src)
+
+    rules = ["font", "margins", "line_spacing", "references"]
+    before = APAValidator(rules).validate_document(str(src))
+    fixes = autofix_docx(str(src), str(dst))
+    after = APAValidator(rules).validate_document(str(dst))
+
+    assert any(issue.startswith(FIXED_ISSUES) for issue in before)
+    assert not [issue for issue in after if issue.startswith(FIXED_ISSUES)]
+    assert fixes == {"font": 3, "font_size": 3, "line_spacing": 3, "margins": 1, "hanging_indent": 1}
+    assert [p.text for p in DocxDocument(str(dst)).paragraphs] == [p.text for p in doc.paragraphs]
+    assert autofix_docx(str(dst), str(tmp_path / "again.docx")) == dict.fromkeys(fixes, 0)
+
+
+def test_autofix_indents_only_after_the_references_heading(tmp_path):
+    doc = DocxDocument()
+    doc.add_paragraph("Earlier studies and their references are discussed below.")
+    doc.add_paragraph("Body text that must keep its indentation.")
+    doc.add_paragraph("References")
+    doc.add_paragraph("Smith, J. (2020). Title of the book. Publisher.")
+    src, dst = tmp_path / "src.docx", tmp_path / "fixed.docx"
+    doc.save(src)
+
+    assert autofix_docx(str(src), str(dst))["hanging_indent"] == 1
+    indents = [p.paragraph_format.first_line_indent for p in DocxDocument(str(dst)).paragraphs]
+    assert indents[:3] == [None, None, None]
+    assert indents[3] < 0
+
+
+def test_autofix_stops_indenting_at_an_appendix_after_the_references(tmp_path):
+    doc = DocxDocument()
+    doc.add_paragraph("References")
+    doc.add_paragraph("Smith, J. (2020). Title of the book. Publisher.")
+    doc.add_paragraph("Appendix", style="Heading 1")
+    doc.add_paragraph("Survey questions that must keep their indentation.")
+    src, dst = tmp_path / "src.docx", tmp_path / "fixed.docx"
+    doc.save(src)
+
+    assert autofix_docx(str(src), str(dst))["hanging_indent"] == 1
+    indents = [p.paragraph_format.first_line_indent for p in DocxDocument(str(dst)).paragraphs]
+    assert indents[1] < 0
+    assert indents[2:] == [None, None]
+
+
+def test_autofix_memory_is_bounded_on_large_documents(tmp_path):
+    src, dst = tmp_path / "large.docx", tmp_path / "fixed.docx"
+    document_xml_bytes = build_large_docx(src, BENCHMARK_PARAGRAPHS)
+
+    result = subprocess.run([sys.executable, "-c", MEASURE_SCRIPT, str(src), str(dst)],
+                            cwd=APP_DIR, capture_output=True, text=True, check=True)
+    peak_growth_bytes = int(result.stdout) * 1024
+
+    # Parsing the whole part into a tree would need several times its size.
+    assert peak_growth_bytes < document_xml_bytes, \
+        f"autofix grew peak RSS by {peak_growth_bytes} bytes for a {document_xml_bytes} byte document.xml"
@@ -0,0 +1,50 @@
+import zipfile
+import pytest
+from io import BytesIO
+from docx import Document as DocxDocument
+from utils.docx_inspect import inspect_docx, DocxInspectionError
+
+LIMITS = dict(max_uncompressed_bytes=50 * 1024 * 1024, max_compression_ratio=100, max_entries=100)
+
+
+def build_zip(parts: dict) -> BytesIO:
+    content = BytesIO()
+    with zipfile.ZipFile(content, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in parts.items():
+            archive.writestr(name, data)
+    return content
+
+
+def test_inspect_valid_document():
+    doc = DocxDocument()
+    doc.add_paragraph("This is a test document.")
+    content = BytesIO()
+    doc.save(content)
+
+    inspection = inspect_docx(content, **LIMITS)
+
+    assert inspection.size_bytes == len(content.getvalue())
+    assert inspection.document_xml_bytes > 0
+    assert inspection.uncompressed_bytes > inspection.document_xml_bytes
+
+
+def test_inspect_reads_paragraph_hint():
+    content = build_zip({
+        "[Content_Types].xml": "<Types/>",
+        "word/document.xml": "<w:document/>",
+        "docProps/app.xml": "<Properties><Pages>3</Pages><Paragraphs>42</Paragraphs></Properties>",
+    })
+
+    assert inspect_docx(content, **LIMITS).paragraph_count_hint == 42
+
+
+@pytest.mark.parametrize("content", [
+    BytesIO(b"definitely not a zip file"),
+    build_zip({"[Content_Types].xml": "<Types/>"}),
+    build_zip({"word/document.xml": "<w:document/>"}),
+    build_zip({"[Content_Types].xml": "<Types/>", "word/document.xml": "<w:document/>",
+               "word/media/bomb.bin": b"\0" * (10 * 1024 * 1024)}),
+])
+def test_inspect_rejects_invalid_archives(content):
+    with pytest.raises(DocxInspectionError):
+        inspect_docx(content, **LIMITS)
@@ -0,0 +1,38 @@
+import zipfile
+from docx import Document as DocxDocument
+from utils.docx_store import store_docx_parts, build_docx, diff_manifests
+
+
+def save_document(path, paragraphs):
+    doc = DocxDocument()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+def test_revisions_only_store_changed_parts(tmp_path):
+    store_dir = str(tmp_path / "parts")
+    save_document(tmp_path / "v1.docx", ["First draft"])
+    save_document(tmp_path / "v2.docx", ["Second draft", "With another paragraph"])
+
+    first_manifest, first_stored = store_docx_parts(str(tmp_path / "v1.docx"), store_dir)
+    second_manifest, second_stored = store_docx_parts(str(tmp_path / "v2.docx"), store_dir)
+
+    diff = diff_manifests(first_manifest, second_manifest)
+    assert "word/document.xml" in diff["changed"]
+    assert "word/styles.xml" in diff["unchanged"]
+    assert diff["added"] == diff["removed"] == []
+    assert second_stored < first_stored / 10
+
+
+def test_build_docx_restores_every_part(tmp_path):
+    store_dir = str(tmp_path / "parts")
+    save_document(tmp_path / "v1.docx", ["First draft"])
+    manifest, _ = store_docx_parts(str(tmp_path / "v1.docx"), store_dir)
+
+    build_docx(manifest, store_dir, str(tmp_path / "rebuilt.docx"))
+
+    with zipfile.ZipFile(tmp_path / "v1.docx") as original, zipfile.ZipFile(tmp_path / "rebuilt.docx") as rebuilt:
+        assert rebuilt.namelist() == original.namelist()
+        assert all(rebuilt.read(name) == original.read(name) for name in original.namelist())
+    assert [p.text for p in DocxDocument(str(tmp_path / "rebuilt.docx")).paragraphs] == ["First draft"]
@@ -0,0 +1,257 @@
+import pytest
+from contextlib import contextmanager
+from io import BytesIO
+from types import SimpleNamespace
+from docx import Document as DocxDocument
+from docx.oxml import OxmlElement
+from docx.shared import Pt
+from utils.helper_apa import APAValidator, DocumentFeatures, RULES, rule, select_rules
+from utils.run_table import RunTable
+from utils.outline import DocumentOutline, Span
+
+
+def build_document():
+    doc = DocxDocument()
+
+    paragraph = doc.add_paragraph()
+    paragraph.paragraph_format.line_spacing = 2
+    run = paragraph.add_run("Correct run")
+    run.font.name = "Times New Roman"
+    run.font.size = Pt(12)
+    run = paragraph.add_run(" wrong run")
+    run.font.name = "Arial"
+    run.font.size = Pt(11)
+
+    paragraph = doc.add_paragraph("Spaced paragraph")
+    paragraph.paragraph_format.space_after = Pt(6)
+    paragraph.runs[0].font.name = "Times New Roman"
+
+    doc.add_paragraph("")
+
+    content = BytesIO()
+    doc.save(content)
+    content.seek(0)
+    return DocxDocument(content)
+
+
+def test_run_table_columns():
+    table = RunTable(build_document())
+
+    assert len(table.paragraphs) == 3
+    assert table.run_paragraph.tolist() == [0, 0, 1]
+    assert [table.font_names[i] for i in table.run_font] == ["Times New Roman", "Arial", "Times New Roman"]
+    assert table.run_size.tolist() == [24, 22, 22]
+    assert table.paragraph_line_spacing[0] == 2
+    assert table.paragraph_space_after[1] == Pt(6).twips
+    assert table.paragraph_text == ["Correct run wrong run", "Spaced paragraph", ""]
+    assert table.paragraph_has_text.tolist() == [True, True, False]
+
+
+def test_font_and_line_spacing_checks():
+    validator = APAValidator()
+
+    features = DocumentFeatures(build_document())
+    validator._check_font(features)
+    validator._check_line_spacing(features)
+
+    # The template's document defaults add 11pt text and 10pt after every paragraph unless overridden.
+    assert validator.issues == [
+        "Font is not Times New Roman: ' wrong run'",
+        "Font size is not 12pt: ' wrong run'",
+        "Font size is not 12pt: 'Spaced paragraph'",
+        "Extra space found between paragraphs: 'Correct run wrong run'",
+        "Text is not double-spaced: 'Spaced paragraph'",
+        "Extra space found between paragraphs: 'Spaced paragraph'",
+    ]
+
+
+def test_inherited_formatting_is_resolved():
+    doc = DocxDocument()
+    normal = doc.styles["Normal"]
+    normal.font.name = "Times New Roman"
+    normal.font.size = Pt(12)
+    normal.paragraph_format.line_spacing = 2
+    normal.paragraph_format.space_after = Pt(0)
+    doc.add_paragraph("Inherits everything")
+    doc.add_paragraph("Bold heading", style="Heading 1")
+    content = BytesIO()
+    doc.save(content)
+    content.seek(0)
+
+    validator = APAValidator()
+    features = DocumentFeatures(DocxDocument(content))
+    validator._check_font(features)
+    validator._check_line_spacing(features)
+
+    assert [issue for issue in validator.issues if "Inherits everything" in issue] == []
+    assert features.styles.paragraph_runs(features.paragraphs[1]._p)[0].bold
+    assert features.styles.paragraph_runs(features.paragraphs[0]._p)[0].bold is None
+
+
+def test_paragraph_runs_match_run_table_runs():
+    doc = DocxDocument()
+    paragraph = doc.add_paragraph("Plain text, ")
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.append(paragraph.add_run("bold link")._r)
+    hyperlink[0].get_or_add_rPr().append(OxmlElement("w:b"))
+    paragraph._p.append(hyperlink)
+
+    features = DocumentFeatures(doc)
+    runs = features.styles.paragraph_runs(paragraph._p)
+
+    assert len(runs) == len(features.run_table.runs) == 1
+    assert not runs[0].bold
+
+
+def test_select_rules():
+    assert select_rules() == list(RULES)
+    assert select_rules("formatting", skip=["header"]) == ["font", "margins", "line_spacing"]
+    assert select_rules("tenant", profiles={"tenant": ["references", "keywords"]}) == ["references", "keywords"]
+
+    with pytest.raises(ValueError):
+        select_rules("missing")
+    with pytest.raises(ValueError):
+        select_rules(skip=["missing"])
+
+
+def test_validator_extracts_only_needed_features(monkeypatch):
+    doc = build_document()
+    content = BytesIO()
+    doc.save(content)
+    content.seek(0)
+
+    def fail(self):
+        raise AssertionError("feature should not be extracted")
+
+    monkeypatch.setattr(DocumentFeatures, "headers", property(fail))
+    monkeypatch.setattr(DocumentFeatures, "tables", property(fail))
+
+    issues = APAValidator(select_rules("references")).validate_document(content)
+
+    assert issues == ["References section not found"]
+
+
+def test_rules_extract_their_declared_features_first():
+    content = BytesIO()
+    build_document().save(content)
+    content.seek(0)
+    spans = []
+
+    @contextmanager
+    def record(name, **attributes):
+        spans.append((name, attributes))
+        yield SimpleNamespace(set_attribute=lambda key, value: None)
+
+    APAValidator(["font", "line_spacing"], span=record).validate_document(content)
+
+    assert spans == [("docx.open", {}),
+                     ("docx.features", {"rule": "font", "features": "run_table"}),
+                     ("apa.rule", {"rule": "font"}),
+                     ("apa.rule", {"rule": "line_spacing"})]
+    with pytest.raises(ValueError):
+        rule("misspelled", scope="document", cost=1, features=("paragraph",))
+    assert "misspelled" not in RULES
+
+
+def test_validator_stops_at_max_issues():
+    content = BytesIO()
+    build_document().save(content)
+
+    content.seek(0)
+    validator = APAValidator(max_issues=2)
+    issues = validator.validate_document(content)
+    assert len(issues) == 2
+    assert validator.truncated
+
+    content.seek(0)
+    validator = APAValidator(max_issues=1000)
+    issues = validator.validate_document(content)
+    assert sorted(issues) == sorted(APAValidator().validate_document(BytesIO(content.getvalue())))
+    assert not validator.truncated
+
+    all_issues = APAValidator().validate_document(BytesIO(content.getvalue()))
+    content.seek(0)
+    validator = APAValidator(max_issues=len(all_issues))
+    issues = validator.validate_document(content)
+    assert sorted(issues) == sorted(all_issues)
+    assert not validator.truncated
+
+
+def test_validator_reports_rule_events():
+    content = BytesIO()
+    build_document().save(content)
+    content.seek(0)
+    events = []
+
+    issues = APAValidator(["font", "margins"], listener=events.append).validate_document(content)
+
+    assert [(event["event"], event["rule"]) for event in events] == [
+        ("rule_started", "font"), ("rule_finished", "font"),
+        ("rule_started", "margins"), ("rule_finished", "margins"),
+    ]
+    assert events[1]["issues"] == issues[:3]
+    assert events[-1]["issue_count"] == len(issues)
+    assert events[-1]["progress"] == 100
+
+
+def build_paper():
+    doc = DocxDocument()
+    doc.add_paragraph("A Study Of Meadows", style="Title")
+    doc.add_paragraph("Jane Doe")
+    doc.add_paragraph("Author Note")
+    doc.add_paragraph("Abstract")
+    doc.add_paragraph("This abstract mentions references and keywords in passing.")
+    doc.add_paragraph("Keywords: meadows, ecology")
+    doc.add_paragraph("A Study Of Meadows")
+    doc.add_paragraph("Method", style="Heading 1")
+    doc.add_paragraph("Sampling", style="Heading 2")
+    doc.add_paragraph("The references to earlier work are in the list below.")
+    doc.add_paragraph("References")
+    doc.add_paragraph("Doe, J. (2020). Meadows. Publisher.")
+
+    content = BytesIO()
+    doc.save(content)
+    content.seek(0)
+    return DocxDocument(content)
+
+
+def test_document_outline():
+    doc = build_paper()
+    outline = DocumentOutline(doc.paragraphs, doc.styles)
+
+    assert (outline.title, outline.author) == (0, 1)
+    assert outline.sections == {
+        "title_page": Span(0, 3),
+        "author_note": Span(2, 3),
+        "abstract": Span(3, 5),
+        "keywords": Span(5, 6),
+        "main_text": Span(6, 10),
+        "references": Span(10, 12),
+    }
+    assert outline.headings == [(7, 1), (8, 2)]
+    assert outline.headings_in(Span(8, 12)) == [(8, 2)]
+
+
+def test_section_rules_ignore_section_words_in_body_text():
+    validator = APAValidator()
+    features = DocumentFeatures(build_paper())
+    validator._check_document_structure(features)
+    validator._check_abstract(features)
+    validator._check_keywords(features)
+    validator._check_references(features)
+
+    assert "Missing required sections" not in " ".join(validator.issues)
+    assert "Abstract exceeds 250 words" not in validator.issues
+    assert [issue for issue in validator.issues if issue.startswith("Reference format incorrect")] == []
+    assert "Keywords should be listed in lowercase" not in validator.issues
+
+
+def test_citation_rules_only_read_the_main_text():
+    doc = build_paper()
+    citation = " (Doe & Roe & Poe, 2020)"
+    doc.paragraphs[4].add_run(citation)
+    doc.paragraphs[9].add_run(citation)
+    validator = APAValidator()
+    validator._check_main_text(DocumentFeatures(doc))
+
+    assert validator.issues.count("More than two authors in citation should be in the form of 'Smith et al.'") == 1
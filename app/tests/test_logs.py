@@ -0,0 +1,107 @@
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import LoggingSettings
+from main import app
+from services.logs import JsonFormatter, LogSampler, RequestIdFilter, instrument_engine, request_id_var
+from services.scheduler import Lane
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.addFilter(RequestIdFilter())
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    handler = ListHandler()
+    logger = logging.getLogger("app")
+    logger.addHandler(handler)
+    level = logger.level
+    logger.setLevel(logging.DEBUG)
+    yield handler.records
+    logger.setLevel(level)
+    logger.removeHandler(handler)
+
+
+def test_json_formatter_includes_request_id_and_extra_fields(captured):
+    token = request_id_var.set("abc123")
+    try:
+        logging.getLogger("app.test").warning("slow %s", "thing", extra={"duration_ms": 12.5})
+    finally:
+        request_id_var.reset(token)
+
+    line = json.loads(JsonFormatter().format(captured[-1]))
+    assert line["message"] == "slow thing"
+    assert line["level"] == "WARNING"
+    assert line["request_id"] == "abc123"
+    assert line["duration_ms"] == 12.5
+
+
+def test_sampler_limits_each_key_per_minute():
+    now = [0.0]
+    sampler = LogSampler(rate=1.0, per_minute=2, clock=lambda: now[0])
+
+    assert [sampler.allow("GET /a") for _ in range(3)] == [True, True, False]
+    assert sampler.allow("GET /b")
+    now[0] = 60.0
+    assert sampler.allow("GET /a")
+    assert sampler.counts == {"GET /a": 1}
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_echoed_and_attached_to_logs(db_session, captured):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post("/api/v1/user/login", data={"username": "nobody", "password": "x"},
+                                     headers={"X-Request-ID": "req-42"})
+        generated = await client.post("/api/v1/user/login", data={"username": "nobody", "password": "x"})
+
+    assert response.headers["x-request-id"] == "req-42"
+    assert len(generated.headers["x-request-id"]) == 32
+    requests = [record for record in captured if record.name == "app.request"]
+    assert requests[0].request_id == "req-42"
+    assert requests[0].path == "/api/v1/user/login"
+
+
+@pytest.mark.asyncio
+async def test_slow_queries_are_logged_with_the_request_id(tmp_path, captured):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.sqlite3'}")
+    instrument_engine(engine, LoggingSettings(LOG_SLOW_QUERY_MS=0, LOG_SLOW_MAX_PER_MINUTE=1))
+
+    token = request_id_var.set("req-7")
+    try:
+        async with engine.connect() as connection:
+            for _ in range(3):
+                await connection.execute(text("SELECT 1"))
+    finally:
+        request_id_var.reset(token)
+        await engine.dispose()
+
+    slow = [record for record in captured if record.name == "app.db"]
+    assert len(slow) == 1
+    assert slow[0].statement == "SELECT 1"
+    assert slow[0].request_id == "req-7"
+
+
+@pytest.mark.asyncio
+async def test_scheduler_jobs_run_with_the_submitting_request_id():
+    lane = Lane("test", workers=1, max_queued_per_user=10, executor_factory=ThreadPoolExecutor)
+    token = request_id_var.set("req-9")
+    try:
+        future = lane.submit(1, request_id_var.get)
+    finally:
+        request_id_var.reset(token)
+
+    assert await future == "req-9"
+    lane.shutdown()
@@ -0,0 +1,143 @@
+import pytest
+from io import BytesIO
+from httpx import AsyncClient
+from docx import Document as DocxDocument
+from main import app
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+USER = {
+    "email": "budget@example.com",
+    "username": "budget",
+    "password": "password",
+    "first_name": "Query",
+    "last_name": "Budget",
+}
+
+
+def docx_file(text: str):
+    doc = DocxDocument()
+    doc.add_paragraph(text)
+    content = BytesIO()
+    doc.save(content)
+    return {"file": ("budget.docx", BytesIO(content.getvalue()), DOCX_TYPE)}
+
+
+@pytest.mark.asyncio
+async def test_endpoint_query_budgets(db_session, assert_max_queries):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        with assert_max_queries(3):
+            response = await client.post("/api/v1/user/sign_up", json=USER)
+        assert response.status_code == 201
+
+        with assert_max_queries(1):
+            response = await client.post("/api/v1/user/login",
+                                         data={"username": USER["username"], "password": USER["password"]})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        with assert_max_queries(7):
+            response = await client.post("/api/v1/document/create", files=docx_file("First draft."), headers=headers)
+        assert response.status_code == 201
+        document_id = response.json()["id"]
+
+        with assert_max_queries(8):
+            response = await client.post(f"/api/v1/document/apa_style_check?document_id={document_id}",
+                                         headers=headers)
+        assert response.status_code == 201
+
+        with assert_max_queries(2):
+            response = await client.get(f"/api/v1/document/apa_style_suggestions/{document_id}", headers=headers)
+        assert response.status_code == 200
+
+        # One more than before: the replaced working copy is only removed if no older document still uses it.
+        with assert_max_queries(12):
+            response = await client.post(f"/api/v1/document/{document_id}/versions", files=docx_file("Second."),
+                                         headers=headers)
+        assert response.status_code == 201
+
+        with assert_max_queries(4):
+            response = await client.get(f"/api/v1/document/{document_id}/versions", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/user/documents/suggestions", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(3):
+            response = await client.get("/api/v1/user/documents/suggestions?details=true", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(1):
+            response = await client.get("/api/v1/user/info", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/user/documents", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/user/documents/search?q=draft", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(5):
+            response = await client.get(f"/api/v1/document/{document_id}/versions/diff?from_version=1&to_version=2",
+                                        headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(3):
+            response = await client.get(f"/api/v1/document/{document_id}/versions/1/file", headers=headers)
+        assert response.status_code == 200
+
+        # The result is saved on the stream's own session, that work is counted here as well.
+        with assert_max_queries(9):
+            response = await client.get(f"/api/v1/document/apa_style_check/stream?document_id={document_id}",
+                                        headers=headers)
+        assert "event: done" in response.text
+
+        with assert_max_queries(2):
+            response = await client.get(f"/api/v1/document/apa_annotated/{document_id}", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(12):
+            response = await client.post(f"/api/v1/document/{document_id}/apa_autofix", headers=headers)
+        assert response.status_code == 201
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/statistics/me", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(3):
+            response = await client.post("/api/v1/statistics/cohorts", json={"name": "budget-101"}, headers=headers)
+        assert response.status_code == 201
+
+        with assert_max_queries(4):
+            response = await client.put(f"/api/v1/statistics/cohorts/budget-101/members/{USER['username']}",
+                                        headers=headers)
+        assert response.status_code == 204
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/statistics/cohorts/budget-101", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(4):
+            response = await client.delete(f"/api/v1/statistics/cohorts/budget-101/members/{USER['username']}",
+                                           headers=headers)
+        assert response.status_code == 204
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/statistics/global", headers=headers)
+        assert response.status_code == 200
+
+        with assert_max_queries(1):
+            response = await client.get("/api/v1/document/scheduler/metrics", headers=headers)
+        assert response.status_code == 200
+
+        suggestion_id = (await client.get(f"/api/v1/document/apa_style_suggestions/{document_id}",
+                                          headers=headers)).json()["id"]
+        with assert_max_queries(3):
+            response = await client.delete(f"/api/v1/document/apa_style_suggestions/{suggestion_id}", headers=headers)
+        assert response.status_code == 204
+
+        # The same for any number of versions, their suggestions are loaded in one query.
+        with assert_max_queries(11):
+            response = await client.delete(f"/api/v1/document/delete/{document_id}", headers=headers)
+        assert response.status_code == 204
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from models.rate_limit import RateLimitCounter
+from services.rate_limit import DatabaseRateLimiter, MemoryRateLimiter, UPLOAD_SCOPE, CHECK_SCOPE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_memory_rate_limiter_refills_tokens():
+    clock = FakeClock()
+    limiter = MemoryRateLimiter({UPLOAD_SCOPE: 2, CHECK_SCOPE: 60}, clock=clock)
+
+    assert (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+    assert (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+    allowed, retry_after = await limiter.hit(UPLOAD_SCOPE, 1)
+    assert not allowed
+    assert retry_after == pytest.approx(30)
+
+    assert (await limiter.hit(UPLOAD_SCOPE, 2))[0]
+    assert (await limiter.hit(CHECK_SCOPE, 1))[0]
+
+    clock.now += 30
+    assert (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+    assert not (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+
+
+@pytest.mark.asyncio
+async def test_database_rate_limiter_counts_fixed_windows(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rate_limit.sqlite3'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(RateLimitCounter.__table__.create)
+    clock = FakeClock()
+    clock.now = 1210.0
+    limiter = DatabaseRateLimiter({UPLOAD_SCOPE: 2, CHECK_SCOPE: 60}, clock=clock, engine=engine)
+
+    try:
+        assert await limiter.hit(UPLOAD_SCOPE, 1) == (True, 0.0)
+        assert await limiter.hit(UPLOAD_SCOPE, 1) == (True, 0.0)
+        allowed, retry_after = await limiter.hit(UPLOAD_SCOPE, 1)
+        assert not allowed
+        assert retry_after == pytest.approx(50)
+        assert (await limiter.hit(UPLOAD_SCOPE, 2))[0]
+
+        clock.now += 50
+        assert (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+        assert (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+        assert not (await limiter.hit(UPLOAD_SCOPE, 1))[0]
+    finally:
+        await engine.dispose()
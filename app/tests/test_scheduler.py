@@ -0,0 +1,140 @@
+import asyncio
+import os
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from config import SchedulerSettings
+from services.scheduler import Lane, ValidationScheduler, SchedulerQueueFull, SMALL_LANE, LARGE_LANE
+
+
+def record(order: list, name: str) -> str:
+    order.append(name)
+    return name
+
+
+@pytest.mark.asyncio
+async def test_lane_serves_users_round_robin():
+    lane = Lane("test", workers=1, max_queued_per_user=10, executor_factory=ThreadPoolExecutor)
+    order = []
+
+    futures = [lane.submit(1, record, order, f"a{i}") for i in range(4)]
+    futures.append(lane.submit(2, record, order, "b0"))
+    await asyncio.gather(*futures)
+    lane.shutdown()
+
+    assert order == ["a0", "a1", "b0", "a2", "a3"]
+    metrics = lane.metrics()
+    assert metrics["completed"] == 5
+    assert metrics["queued"] == metrics["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lane_limits_queued_jobs_per_user():
+    lane = Lane("test", workers=1, max_queued_per_user=1, executor_factory=ThreadPoolExecutor)
+    order = []
+
+    first = lane.submit(1, record, order, "running")
+    second = lane.submit(1, record, order, "queued")
+    with pytest.raises(SchedulerQueueFull):
+        lane.submit(1, record, order, "rejected")
+    other_user = lane.submit(2, record, order, "other")
+
+    await asyncio.gather(first, second, other_user)
+    lane.shutdown()
+    assert "rejected" not in order
+
+
+@pytest.mark.asyncio
+async def test_lane_rejects_jobs_without_leaving_an_empty_queue():
+    lane = Lane("test", workers=1, max_queued_per_user=0, executor_factory=ThreadPoolExecutor)
+
+    with pytest.raises(SchedulerQueueFull):
+        lane.submit(1, record, [], "rejected")
+    assert not lane.queues
+    lane.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_lane_skips_cancelled_jobs():
+    lane = Lane("test", workers=1, max_queued_per_user=10, executor_factory=ThreadPoolExecutor)
+    order = []
+
+    first = lane.submit(1, record, order, "first")
+    cancelled = lane.submit(1, record, order, "cancelled")
+    cancelled.cancel()
+    last = lane.submit(1, record, order, "last")
+    await asyncio.gather(first, last)
+    lane.shutdown()
+
+    assert order == ["first", "last"]
+    assert lane.metrics()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_lane_replaces_a_broken_process_pool():
+    lane = Lane("test", workers=1, max_queued_per_user=10)
+
+    with pytest.raises(BrokenProcessPool):
+        await lane.submit(1, os._exit, 1)
+    assert await lane.submit(1, abs, -3) == 3
+    lane.shutdown()
+
+
+def test_scheduler_chooses_lane_by_document_size():
+    settings = SchedulerSettings(SCHEDULER_LARGE_DOCUMENT_XML_BYTES=1000,
+                                 SCHEDULER_LARGE_DOCUMENT_PARAGRAPHS=100,
+                                 SCHEDULER_LARGE_DOCUMENT_BYTES=10000)
+    scheduler = ValidationScheduler(settings, executor_factory=ThreadPoolExecutor)
+
+    def document(**hints):
+        return SimpleNamespace(**{"document_xml_bytes": None, "paragraph_count_hint": None, "size_bytes": None,
+                                  **hints})
+
+    assert scheduler.choose_lane(document()) == SMALL_LANE
+    assert scheduler.choose_lane(document(document_xml_bytes=500, paragraph_count_hint=10)) == SMALL_LANE
+    assert scheduler.choose_lane(document(document_xml_bytes=5000)) == LARGE_LANE
+    assert scheduler.choose_lane(document(paragraph_count_hint=150)) == LARGE_LANE
+    assert scheduler.choose_lane(document(size_bytes=20000)) == LARGE_LANE
+
+
+def rule_events(count: int, error: Exception = None):
+    def fake_validation(file_path, rules, max_issues, events):
+        for i in range(count):
+            events.put({"event": "rule", "rule": f"rule{i}"})
+        if error is not None:
+            raise error
+        return ["An issue."], False, {"rule0": 1}
+    return fake_validation
+
+
+def small_document():
+    return SimpleNamespace(file_path="paper.docx", document_xml_bytes=None, paragraph_count_hint=None,
+                           size_bytes=None)
+
+
+@pytest.mark.asyncio
+async def test_stream_yields_every_event_before_the_result(monkeypatch):
+    scheduler = ValidationScheduler(SchedulerSettings(), executor_factory=ThreadPoolExecutor)
+    monkeypatch.setattr("services.scheduler.run_validation", rule_events(50))
+
+    events = [event async for event in scheduler.stream(1, small_document(), ["font"])]
+    scheduler.shutdown()
+
+    assert [event["rule"] for event in events[:-1]] == [f"rule{i}" for i in range(50)]
+    assert events[-1] == {"event": "result", "issues": ["An issue."], "truncated": False,
+                          "rule_counts": {"rule0": 1}}
+
+
+@pytest.mark.asyncio
+async def test_stream_raises_a_failed_check_after_its_events(monkeypatch):
+    scheduler = ValidationScheduler(SchedulerSettings(), executor_factory=ThreadPoolExecutor)
+    monkeypatch.setattr("services.scheduler.run_validation", rule_events(3, ValueError("corrupt document")))
+
+    events = []
+    with pytest.raises(ValueError):
+        async for event in scheduler.stream(1, small_document(), ["font"]):
+            events.append(event)
+    scheduler.shutdown()
+
+    assert [event["rule"] for event in events] == ["rule0", "rule1", "rule2"]
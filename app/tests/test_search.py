@@ -0,0 +1,122 @@
+import os
+import re
+import time
+from io import BytesIO
+
+import pytest
+from docx import Document as DocxDocument
+from httpx import AsyncClient
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from crud.search import search_documents, search_statement
+from main import app
+from models.document import Document
+from models.search import DocumentSearch
+from models.user import User
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+SEARCH_BENCHMARK_DOCUMENTS = int(os.environ.get("SEARCH_BENCHMARK_DOCUMENTS", 10000))
+SEARCH_BUDGET_MS = int(os.environ.get("SEARCH_BUDGET_MS", 50))
+
+
+def docx_file(file_name: str, text: str):
+    doc = DocxDocument()
+    doc.add_paragraph(text)
+    content = BytesIO()
+    doc.save(content)
+    return {"file": (file_name, BytesIO(content.getvalue()), DOCX_TYPE)}
+
+
+async def sign_up_and_login(client, username: str) -> dict:
+    user = {"email": f"{username}@example.com", "username": username, "password": "password",
+            "first_name": "Search", "last_name": "User"}
+    response = await client.post("/api/v1/user/sign_up", json=user)
+    assert response.status_code == 201
+    response = await client.post("/api/v1/user/login", data={"username": username, "password": "password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_search_documents(db_session: AsyncSession, assert_max_queries):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        headers = await sign_up_and_login(client, "searcher")
+        other_headers = await sign_up_and_login(client, "other_searcher")
+
+        response = await client.post("/api/v1/document/create", headers=headers,
+                                     files=docx_file("thesis_draft.docx", "Photosynthesis in alpine meadows."))
+        thesis_id = response.json()["id"]
+        await client.post("/api/v1/document/create", headers=headers,
+                          files=docx_file("essay.docx", "Notes on glaciers and meadow ecology."))
+        await client.post("/api/v1/document/create", headers=other_headers,
+                          files=docx_file("thesis.docx", "Photosynthesis again."))
+
+        with assert_max_queries(2):
+            response = await client.get("/api/v1/user/documents/search?q=photosynthesis", headers=headers)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["total"] == 1
+        assert result["hits"][0]["document"]["id"] == thesis_id
+        assert "<b>Photosynthesis</b>" in result["hits"][0]["snippet"]
+
+        response = await client.get("/api/v1/user/documents/search?q=thes", headers=headers)
+        assert [hit["document"]["file_name"] for hit in response.json()["hits"]] == ["thesis_draft.docx"]
+
+        response = await client.get("/api/v1/user/documents/search?q=meadow&limit=1", headers=headers)
+        assert response.json()["total"] == 2
+        assert len(response.json()["hits"]) == 1
+
+        await client.post(f"/api/v1/document/apa_style_check?document_id={thesis_id}", headers=headers)
+        response = await client.get(f"/api/v1/document/apa_style_suggestions/{thesis_id}", headers=headers)
+        issue_word = response.json()["description"].split()[0]
+        response = await client.get(f"/api/v1/user/documents/search?q={issue_word}", headers=headers)
+        assert thesis_id in [hit["document"]["id"] for hit in response.json()["hits"]]
+
+        response = await client.get("/api/v1/user/documents/search?q=%22%29%2A", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"total": 0, "hits": []}
+
+
+async def query_plan(db: AsyncSession, statement) -> str:
+    compiled = statement.compile(dialect=db.bind.dialect)
+    explain = "EXPLAIN " if db.bind.dialect.name == "postgresql" else "EXPLAIN QUERY PLAN "
+    connection = await db.connection()
+    rows = await connection.exec_driver_sql(explain + str(compiled),
+                                            tuple(compiled.params[name] for name in compiled.positiontup))
+    return "\n".join(str(row[-1]) for row in rows)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_search_documents_time_budget(db_session: AsyncSession):
+    user = User(email="many@example.com", username="many_documents", password="x")
+    db_session.add(user)
+    await db_session.flush()
+
+    await db_session.execute(insert(Document), [
+        {"id": 100000 + i, "user_id": user.id, "file_path": f"{i}.docx", "file_name": f"draft_{i}.docx"}
+        for i in range(SEARCH_BENCHMARK_DOCUMENTS)
+    ])
+    await db_session.execute(insert(DocumentSearch), [
+        {"document_id": 100000 + i, "user_id": user.id, "file_name": f"draft_{i}.docx",
+         "content": f"Chapter {i} discusses {'glacier' if i % 100 == 0 else 'river'} erosion and sediment.",
+         "issues": "Line spacing should be double."}
+        for i in range(SEARCH_BENCHMARK_DOCUMENTS)
+    ])
+
+    await search_documents(user.id, "glacier", db_session)
+    started = time.perf_counter()
+    result = await search_documents(user.id, "glacier erosion", db_session)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert result.total == SEARCH_BENCHMARK_DOCUMENTS // 100
+    assert len(result.hits) == 20
+
+    plan = await query_plan(db_session, search_statement(user.id, "glacier erosion",
+                                                         db_session.bind.dialect.name).limit(20))
+    if db_session.bind.dialect.name == "postgresql":
+        assert "ix_document_search_search_vector" in plan, plan
+    else:
+        # FTS5 answers the MATCH (the ":M" constraint) from its full-text index, not by reading every row.
+        assert re.search(r"SCAN document_search_fts VIRTUAL TABLE INDEX \d+:M", plan), plan
+    assert elapsed_ms < SEARCH_BUDGET_MS, f"search took {elapsed_ms:.1f}ms, budget is {SEARCH_BUDGET_MS}ms"
@@ -0,0 +1,129 @@
+import inspect
+import json
+import os
+import time
+from datetime import datetime
+from io import BytesIO
+from typing import List, Union
+
+import pytest
+from docx import Document as DocxDocument
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from fastapi.utils import create_model_field
+from httpx import AsyncClient
+
+from main import app
+from models.document import Document, FormattingSuggestion
+from schemas.document import DocumentSuggestionsSummarySchema, DocumentWithSuggestionsSchema
+from services.responses import SchemaResponse
+
+SERIALIZATION_BENCHMARK_DOCUMENTS = int(os.environ.get("SERIALIZATION_BENCHMARK_DOCUMENTS", 1000))
+SUGGESTIONS_PER_DOCUMENT = 3
+
+
+def documents(count: int) -> List[Document]:
+    created_at = datetime(2024, 5, 1, 12, 30)
+    result = []
+    for i in range(count):
+        document = Document(id=i, user_id=1, file_path=f"uploaded_files/{i}.docx", file_name=f"{i}.docx",
+                            status="uploaded")
+        document.formatting_suggestions = [
+            FormattingSuggestion(id=i * SUGGESTIONS_PER_DOCUMENT + j, document_id=i, description="Issue. " * 40,
+                                 status="complete", created_at=created_at)
+            for j in range(SUGGESTIONS_PER_DOCUMENT)
+        ]
+        result.append(document)
+    return result
+
+
+def listing_field():
+    return create_model_field(
+        "Response", Union[List[DocumentWithSuggestionsSchema], List[DocumentSuggestionsSummarySchema]],
+        mode="serialization")
+
+
+async def response_model_body(field, content: list) -> bytes:
+    content = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+@pytest.mark.asyncio
+async def test_schema_response_matches_the_response_model_path():
+    """``/user/documents/suggestions?details=true``: SchemaResponse renders what the response_model pass did."""
+    content = [DocumentWithSuggestionsSchema.model_validate(document) for document in documents(20)]
+
+    assert json.loads(SchemaResponse(content).body) == json.loads(await response_model_body(listing_field(), content))
+
+
+def route_response_field(method: str, path: str):
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path_format == path and method in route.methods:
+            return route.response_field
+    raise LookupError(f"{method} {path}")
+
+
+@pytest.mark.asyncio
+async def test_schema_response_routes_match_their_response_model(db_session):
+    """Every route returning SchemaResponse sends what its ``response_model`` would have, unfiltered and valid."""
+    doc = DocxDocument()
+    doc.add_paragraph("Checked draft.")
+    content = BytesIO()
+    doc.save(content)
+    docx_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        await client.post("/api/v1/user/sign_up", json={
+            "email": "schema@example.com", "username": "schema", "password": "password",
+            "first_name": "Schema", "last_name": "Response"})
+        response = await client.post("/api/v1/user/login", data={"username": "schema", "password": "password"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await client.post("/api/v1/document/create", headers=headers,
+                                     files={"file": ("draft.docx", BytesIO(content.getvalue()), docx_type)})
+        document_id = response.json()["id"]
+
+        routes = [
+            ("POST", "/api/v1/document/apa_style_check", f"/api/v1/document/apa_style_check?document_id={document_id}"),
+            ("GET", "/api/v1/document/{document_id}/versions", f"/api/v1/document/{document_id}/versions"),
+            ("GET", "/api/v1/document/apa_style_suggestions/{document_id}",
+             f"/api/v1/document/apa_style_suggestions/{document_id}"),
+            ("GET", "/api/v1/user/documents", "/api/v1/user/documents"),
+            ("GET", "/api/v1/user/documents/search", "/api/v1/user/documents/search?q=draft"),
+            ("GET", "/api/v1/user/documents/suggestions", "/api/v1/user/documents/suggestions"),
+            ("GET", "/api/v1/user/documents/suggestions", "/api/v1/user/documents/suggestions?details=true"),
+        ]
+        for method, path, url in routes:
+            response = await client.request(method, url, headers=headers)
+            assert response.status_code < 300, url
+            assert response.json(), url
+            expected = await response_model_body(route_response_field(method, path), response.json())
+            assert response.json() == json.loads(expected), url
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_schema_response_serializes_listings_faster():
+    """Run with ``pytest -m benchmark -s``; the model_validate both paths share is timed on its own."""
+    orm_documents = documents(SERIALIZATION_BENCHMARK_DOCUMENTS)
+    field = listing_field()
+
+    async def best_of(fn) -> float:
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            result = fn()
+            if inspect.isawaitable(result):
+                await result
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    validate_seconds = await best_of(lambda: [DocumentWithSuggestionsSchema.model_validate(document)
+                                              for document in orm_documents])
+    content = [DocumentWithSuggestionsSchema.model_validate(document) for document in orm_documents]
+    before_seconds = await best_of(lambda: response_model_body(field, content))
+    after_seconds = await best_of(lambda: SchemaResponse(content).body)
+
+    per_thousand = 1000 / SERIALIZATION_BENCHMARK_DOCUMENTS * 1000
+    print(f"\nper 1k documents: model_validate {validate_seconds * per_thousand:.1f} ms, then "
+          f"response_model {before_seconds * per_thousand:.1f} ms or SchemaResponse {after_seconds * per_thousand:.1f} ms")
+    assert after_seconds < before_seconds
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_BUDGET_US = int(os.environ.get("IMPORT_TIME_BUDGET_MS", 2500)) * 1000
+LAZY_MODULES = ("docx", "lxml", "numpy", "passlib", "bcrypt", "jose", "asyncpg")
+
+
+def measure_import_time(module: str) -> dict:
+    # An empty environment: importing the app must not build the settings, which need the DB and token values.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True, env={},
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(total)
+    return cumulative
+
+
+def test_app_import_skips_heavy_dependencies():
+    imported = measure_import_time("main")
+
+    assert not [name for name in imported if name.split(".")[0] in LAZY_MODULES]
+
+
+def test_app_import_time_budget():
+    imported = measure_import_time("main")
+
+    assert imported["main"] < IMPORT_TIME_BUDGET_US, \
+        f"importing main took {imported['main'] / 1000:.0f}ms, budget is {IMPORT_TIME_BUDGET_US / 1000:.0f}ms"
@@ -0,0 +1,100 @@
+from io import BytesIO
+
+import pytest
+from docx import Document as DocxDocument
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from main import app
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def docx_file(text: str):
+    doc = DocxDocument()
+    doc.add_paragraph(text)
+    content = BytesIO()
+    doc.save(content)
+    return {"file": ("paper.docx", BytesIO(content.getvalue()), DOCX_TYPE)}
+
+
+async def sign_up_and_login(client, username: str, cohort: str = None) -> dict:
+    # A cohort sent at sign-up is ignored, only the cohort's instructor can add members.
+    user = {"email": f"{username}@example.com", "username": username, "password": "password",
+            "first_name": "Stats", "last_name": "User", "cohort": cohort}
+    response = await client.post("/api/v1/user/sign_up", json=user)
+    assert response.status_code == 201
+    response = await client.post("/api/v1/user/login", data={"username": username, "password": "password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def check_document(client, headers: dict) -> None:
+    response = await client.post("/api/v1/document/create", files=docx_file("A short paper."), headers=headers)
+    document_id = response.json()["id"]
+    response = await client.post(f"/api/v1/document/apa_style_check?document_id={document_id}", headers=headers)
+    assert response.status_code == 201
+
+
+@pytest.mark.asyncio
+async def test_issue_statistics(db_session: AsyncSession, assert_max_queries):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        instructor = await sign_up_and_login(client, "instructor")
+        student = await sign_up_and_login(client, "student")
+        classmate = await sign_up_and_login(client, "classmate")
+        outsider = await sign_up_and_login(client, "outsider", cohort="psych-101")
+
+        response = await client.post("/api/v1/statistics/cohorts", json={"name": "psych-101"}, headers=instructor)
+        assert response.status_code == 201
+        response = await client.post("/api/v1/statistics/cohorts", json={"name": "psych-101"}, headers=outsider)
+        assert response.status_code == 409
+        for username in ("student", "classmate"):
+            response = await client.put(f"/api/v1/statistics/cohorts/psych-101/members/{username}",
+                                        headers=instructor)
+            assert response.status_code == 204
+        response = await client.put("/api/v1/statistics/cohorts/psych-101/members/outsider", headers=outsider)
+        assert response.status_code == 403
+
+        await check_document(client, student)
+        await check_document(client, student)
+        await check_document(client, classmate)
+        await check_document(client, outsider)
+
+        response = await client.post("/api/v1/document/create", files=docx_file("A short paper."), headers=student)
+        document_id = response.json()["id"]
+        response = await client.post(f"/api/v1/document/apa_style_check?document_id={document_id}",
+                                     headers=outsider)
+        assert response.status_code == 403
+        response = await client.post(f"/api/v1/document/apa_style_check?document_id={document_id}&fail_fast=true",
+                                     headers=student)
+        assert response.json()["status"] == "partial"
+
+        with assert_max_queries(2) as statements:
+            response = await client.get("/api/v1/statistics/me", headers=student)
+        assert not [statement for statement in statements if "formatting_suggestions" in statement]
+        assert response.status_code == 200
+        mine = response.json()
+        assert mine["checks"] == 2
+        assert mine["issue_count"] == sum(rule["issue_count"] for rule in mine["rules"])
+        assert [rule["issue_count"] for rule in mine["rules"]] == \
+            sorted((rule["issue_count"] for rule in mine["rules"]), reverse=True)
+        assert all(rule["checks"] == 2 for rule in mine["rules"])
+
+        response = await client.get("/api/v1/statistics/cohorts/psych-101", headers=classmate)
+        assert response.json()["checks"] == 3
+        assert response.json()["issue_count"] == mine["issue_count"] * 3 // 2
+
+        response = await client.get("/api/v1/statistics/cohorts/psych-101", headers=instructor)
+        assert response.json()["checks"] == 3
+
+        response = await client.get("/api/v1/statistics/cohorts/psych-101", headers=outsider)
+        assert response.status_code == 403
+
+        response = await client.get("/api/v1/statistics/global", headers=outsider)
+        assert response.json()["checks"] >= 4
+
+        response = await client.get("/api/v1/statistics/me?start=2020-01-01&end=2020-01-31", headers=student)
+        assert response.json()["checks"] == 0
+        assert response.json()["rules"] == []
+
+        response = await client.get("/api/v1/statistics/me?start=2020-02-01&end=2020-01-01", headers=student)
+        assert response.status_code == 400
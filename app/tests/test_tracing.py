@@ -0,0 +1,111 @@
+import json
+import time
+from io import BytesIO
+
+import pytest
+from docx import Document as DocxDocument
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import services.tracing as tracing
+from config import TracingSettings
+from main import app
+from services.scheduler import run_job
+from services.tracing import NOOP_SPAN, Tracer, current_span, span
+from utils.helper_apa import APAValidator
+
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+SAMPLED_TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def docx_bytes(text: str) -> bytes:
+    doc = DocxDocument()
+    doc.add_paragraph(text)
+    content = BytesIO()
+    doc.save(content)
+    return content.getvalue()
+
+
+def exported_spans(path) -> list:
+    if not path.exists():
+        return []
+    return [span for line in path.read_text().splitlines()
+            for resource in json.loads(line)["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]]
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(TracingSettings(TRACING_SAMPLE_RATE=0, TRACING_EXPORTER="file", TRACING_FILE=str(path)))
+    monkeypatch.setattr(tracing, "get_tracer", lambda: tracer)
+    monkeypatch.setattr("services.scheduler.get_tracer", lambda: tracer)
+    return path
+
+
+@pytest.mark.asyncio
+async def test_create_document_is_traced_end_to_end(db_session: AsyncSession, trace_file):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        user = {"email": "tracer@example.com", "username": "tracer", "password": "password",
+                "first_name": "Trace", "last_name": "User"}
+        await client.post("/api/v1/user/sign_up", json=user)
+        response = await client.post("/api/v1/user/login", data={"username": "tracer", "password": "password"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        assert not exported_spans(trace_file)
+
+        response = await client.post("/api/v1/document/create",
+                                     headers={**headers, "traceparent": SAMPLED_TRACEPARENT},
+                                     files={"file": ("traced.docx", BytesIO(docx_bytes("Traced")), DOCX_TYPE)})
+    assert response.status_code == 201
+
+    spans = exported_spans(trace_file)
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["POST /api/v1/document/create"]
+    assert root["parentSpanId"] == "b7ad6b7169203331"
+    assert {span["traceId"] for span in spans} == {"0af7651916cd43dd8448eb211c80319c"}
+    for name in ("services.user_auth.get_current_user", "crud.document.document_create",
+                 "upload.read", "docx.inspect", "file.write", "db.query"):
+        assert name in by_name
+    assert by_name["crud.document.document_create"]["parentSpanId"] == root["spanId"]
+    assert by_name["file.write"]["startTimeUnixNano"] >= root["startTimeUnixNano"]
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post(f"/api/v1/document/{response.json()['id']}/versions",
+                                     headers={**headers, "traceparent": SAMPLED_TRACEPARENT},
+                                     files={"file": ("traced.docx", BytesIO(docx_bytes("Traced again")), DOCX_TYPE)})
+    assert response.status_code == 201
+
+    version_spans = exported_spans(trace_file)[len(spans):]
+    version_root = next(span for span in version_spans
+                        if span["name"] == "POST /api/v1/document/{document_id}/versions")
+    file_write = next(span for span in version_spans if span["name"] == "file.write")
+    assert file_write["startTimeUnixNano"] >= version_root["startTimeUnixNano"]
+
+
+def test_worker_spans_continue_the_submitting_trace(tmp_path, trace_file):
+    path = tmp_path / "paper.docx"
+    path.write_bytes(docx_bytes("Worker"))
+    trace_parent = ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331")
+
+    run_job("req-1", trace_parent, {"scheduler.lane": "small"},
+            lambda file_path: APAValidator(["font", "margins"], span=span).validate_document(file_path), str(path))
+
+    spans = exported_spans(trace_file)
+    worker = next(span for span in spans if span["name"].startswith("scheduler."))
+    assert worker["parentSpanId"] == "b7ad6b7169203331"
+    rules = [span for span in spans if span["name"] == "apa.rule"]
+    assert [attribute["value"]["stringValue"] for rule in rules for attribute in rule["attributes"]
+            if attribute["key"] == "rule"] == ["font", "margins"]
+    assert all(rule["parentSpanId"] == worker["spanId"] for rule in rules)
+
+
+def test_unsampled_spans_are_free():
+    assert current_span.get() is None
+    assert span("anything") is NOOP_SPAN
+
+    started = time.perf_counter()
+    for _ in range(100_000):
+        with span("noop", rule="font"):
+            pass
+    assert time.perf_counter() - started < 0.5
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Set
+
+from tqdm import tqdm
+
+from .helper_apa import APAValidator, select_rules
+
+IN_FLIGHT_PER_WORKER = 4
+
+
+def find_documents(root: str) -> Iterator[str]:
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.lower().endswith('.docx') and not file_name.startswith('~$'):
+                yield os.path.join(dir_path, file_name)
+
+
+def load_checked(output_path: str) -> Set[str]:
+    checked = set()
+    if not os.path.exists(output_path):
+        return checked
+
+    with open(output_path, encoding='utf-8') as output:
+        for line in output:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if 'error' not in record:
+                checked.add(record['path'])
+    return checked
+
+
+def check_file(path: str, rules: List[str], max_issues: Optional[int]) -> dict:
+    validator = APAValidator(rules, max_issues)
+    try:
+        issues = validator.validate_document(path)
+    except Exception as e:
+        return {'path': path, 'error': f"{type(e).__name__}: {e}"}
+    return {'path': path, 'issue_count': len(issues), 'truncated': validator.truncated, 'issues': issues}
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Validate every .docx file under a directory against APA rules.")
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output', default='apa_check.jsonl',
+                        help="JSONL file results are appended to; files already in it are skipped")
+    parser.add_argument('-w', '--workers', type=positive_int, default=os.cpu_count())
+    parser.add_argument('--profile', default='full')
+    parser.add_argument('--skip', action='append', default=[], help="rule id to skip, can be repeated")
+    parser.add_argument('--max-issues', type=positive_int, default=None)
+    parser.add_argument('--no-progress', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    try:
+        rules = select_rules(args.profile, args.skip)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    checked = load_checked(args.output)
+    paths = [path for path in find_documents(args.directory) if path not in checked]
+    failed = 0
+
+    with open(args.output, 'a', encoding='utf-8') as output, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor, \
+            tqdm(total=len(paths), unit='doc', disable=args.no_progress) as progress:
+        # A few files per worker in flight at a time, a large tree is not queued all at once.
+        remaining = iter(paths)
+        pending = set()
+        while True:
+            for path in remaining:
+                pending.add(executor.submit(check_file, path, rules, args.max_issues))
+                if len(pending) >= args.workers * IN_FLIGHT_PER_WORKER:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                if 'error' in record:
+                    failed += 1
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+                progress.update()
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
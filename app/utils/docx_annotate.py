@@ -0,0 +1,157 @@
+import posixpath
+import shutil
+import zipfile
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from lxml import etree
+
+from .docx_inspect import CONTENT_TYPES_PART, DOCUMENT_PART
+
+DOCUMENT_RELS_PART = 'word/_rels/document.xml.rels'
+DEFAULT_COMMENTS_PART = 'word/comments.xml'
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+CONTENT_TYPES_NS = 'http://schemas.openxmlformats.org/package/2006/content-types'
+RELATIONSHIPS_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+COMMENTS_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments'
+COMMENTS_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.comments+xml'
+
+COMMENT_AUTHOR = 'APA Checker'
+COMMENT_INITIALS = 'APA'
+
+XML_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=True, remove_blank_text=False)
+
+
+def w(tag: str) -> str:
+    return f'{{{W_NS}}}{tag}'
+
+
+def _parse(data: bytes):
+    return etree.fromstring(data, XML_PARSER)
+
+
+def _serialize(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def group_issues(issues: Sequence[str], paragraphs: Sequence[Optional[int]]) -> Dict[int, List[str]]:
+    """Map body paragraph index -> messages; issues without a location go on the first paragraph."""
+    grouped = defaultdict(list)
+    for issue, paragraph in zip(issues, paragraphs):
+        grouped[0 if paragraph is None else paragraph].append(issue)
+    return dict(sorted(grouped.items()))
+
+
+def _comments_target(rels) -> Optional[str]:
+    for relationship in rels.iterchildren(f'{{{RELATIONSHIPS_NS}}}Relationship'):
+        if relationship.get('Type') == COMMENTS_RELATIONSHIP:
+            return relationship.get('Target')
+    return None
+
+
+def _add_comments_relationship(rels) -> None:
+    ids = {relationship.get('Id') for relationship in rels}
+    n = len(ids) + 1
+    while f'rId{n}' in ids:
+        n += 1
+    etree.SubElement(rels, f'{{{RELATIONSHIPS_NS}}}Relationship',
+                     Id=f'rId{n}', Type=COMMENTS_RELATIONSHIP, Target='comments.xml')
+
+
+def _add_comments_override(content_types, part_name: str) -> None:
+    for override in content_types.iterchildren(f'{{{CONTENT_TYPES_NS}}}Override'):
+        if override.get('PartName') == f'/{part_name}':
+            return
+    etree.SubElement(content_types, f'{{{CONTENT_TYPES_NS}}}Override',
+                     PartName=f'/{part_name}', ContentType=COMMENTS_CONTENT_TYPE)
+
+
+def _append_comment(comments, comment_id: int, messages: List[str], date: str) -> None:
+    comment = etree.SubElement(comments, w('comment'), {
+        w('id'): str(comment_id), w('author'): COMMENT_AUTHOR, w('initials'): COMMENT_INITIALS, w('date'): date,
+    })
+    for message in messages:
+        t = etree.SubElement(etree.SubElement(etree.SubElement(comment, w('p')), w('r')), w('t'))
+        t.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+        t.text = message
+
+
+def _anchor_comment(p, comment_id: int) -> None:
+    # The range starts after the paragraph properties, which must stay the first child.
+    position = 1 if len(p) and p[0].tag == w('pPr') else 0
+    p.insert(position, etree.Element(w('commentRangeStart'), {w('id'): str(comment_id)}))
+    etree.SubElement(p, w('commentRangeEnd'), {w('id'): str(comment_id)})
+    etree.SubElement(etree.SubElement(p, w('r')), w('commentReference'), {w('id'): str(comment_id)})
+
+
+def annotate_docx(src_path: str, dst_path: str, issues: Sequence[str], paragraphs: Sequence[Optional[int]]) -> int:
+    """Write a copy of ``src_path`` to ``dst_path`` with one Word comment per offending paragraph.
+
+    ``paragraphs`` holds, for every issue, the index of the body ``w:p`` it refers to
+    (``APAValidator.issue_paragraphs``). Only ``word/document.xml``, the comments part,
+    its relationship and content type are touched, every other entry is copied as is.
+    Returns the number of comments added.
+    """
+    grouped = group_issues(issues, paragraphs)
+
+    with zipfile.ZipFile(src_path) as src:
+        names = set(src.namelist())
+
+        rels = _parse(src.read(DOCUMENT_RELS_PART)) if DOCUMENT_RELS_PART in names else \
+            etree.Element(f'{{{RELATIONSHIPS_NS}}}Relationships', nsmap={None: RELATIONSHIPS_NS})
+        target = _comments_target(rels)
+        if target is None:
+            comments_part = DEFAULT_COMMENTS_PART
+        elif target.startswith('/'):
+            # Absolute targets are relative to the package root, zip entry names have no leading slash.
+            comments_part = posixpath.normpath(target.lstrip('/'))
+        else:
+            comments_part = posixpath.normpath(posixpath.join('word', target))
+        if target is None:
+            _add_comments_relationship(rels)
+
+        if comments_part in names:
+            comments = _parse(src.read(comments_part))
+        else:
+            comments = etree.Element(w('comments'), nsmap={'w': W_NS})
+        existing_ids = [int(c.get(w('id'))) for c in comments.iterchildren(w('comment'))
+                        if (c.get(w('id')) or '').isdigit()]
+        next_id = max(existing_ids, default=-1) + 1
+
+        document = _parse(src.read(DOCUMENT_PART))
+        body = document.find(w('body'))
+        body_paragraphs = list(body.iterchildren(w('p'))) if body is not None else []
+
+        date = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        added = 0
+        for index, messages in grouped.items():
+            if index >= len(body_paragraphs):
+                continue
+            _anchor_comment(body_paragraphs[index], next_id)
+            _append_comment(comments, next_id, messages, date)
+            next_id += 1
+            added += 1
+
+        content_types = _parse(src.read(CONTENT_TYPES_PART))
+        _add_comments_override(content_types, comments_part)
+
+        patched = {
+            DOCUMENT_PART: _serialize(document),
+            comments_part: _serialize(comments),
+            DOCUMENT_RELS_PART: _serialize(rels),
+            CONTENT_TYPES_PART: _serialize(content_types),
+        }
+
+        with zipfile.ZipFile(dst_path, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename in patched:
+                    dst.writestr(info, patched.pop(info.filename), compress_type=zipfile.ZIP_DEFLATED)
+                    continue
+                with src.open(info) as source, dst.open(info, 'w') as destination:
+                    shutil.copyfileobj(source, destination)
+            for name, data in patched.items():
+                dst.writestr(name, data)
+
+    return added
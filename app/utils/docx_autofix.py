@@ -0,0 +1,220 @@
+import re
+import shutil
+import zipfile
+from collections import Counter
+from typing import Dict, FrozenSet, IO
+
+from lxml import etree
+from docx.oxml.ns import qn
+from docx.oxml.parser import element_class_lookup
+
+from .docx_inspect import DOCUMENT_PART
+from .outline import KEYWORDS_LABEL, REFERENCES, section_heading
+from .run_table import W_P, W_R, W_T, W_VAL, W_ASCII, W_LINE, W_LINE_RULE, W_BEFORE, W_AFTER, W_LEFT, \
+    W_FIRST_LINE, W_HANGING
+
+TIMES_NEW_ROMAN = 'Times New Roman'
+FONT_SIZE_HALF_POINTS = '24'
+DOUBLE_SPACING_TWIPS = '480'
+ONE_INCH_TWIPS = '1440'
+HALF_INCH_TWIPS = '720'
+
+STYLES_PART = 'word/styles.xml'
+
+W_BODY = qn('w:body')
+W_STYLE = qn('w:style')
+W_NAME = qn('w:name')
+W_TYPE = qn('w:type')
+W_STYLE_ID = qn('w:styleId')
+W_SECTPR = qn('w:sectPr')
+W_H_ANSI = qn('w:hAnsi')
+FONT_THEME_ATTRIBUTES = (qn('w:asciiTheme'), qn('w:hAnsiTheme'))
+LINE_SPACING_OVERRIDES = (qn('w:beforeLines'), qn('w:afterLines'),
+                          qn('w:beforeAutospacing'), qn('w:afterAutospacing'))
+MARGIN_ATTRIBUTES = (qn('w:top'), qn('w:bottom'), qn('w:left'), qn('w:right'))
+PAGE_MARGIN_DEFAULTS = {qn('w:header'): HALF_INCH_TWIPS, qn('w:footer'): HALF_INCH_TWIPS, qn('w:gutter'): '0'}
+
+FIXES = ('font', 'font_size', 'line_spacing', 'margins', 'hanging_indent')
+NAMESPACE_DECLARATION = re.compile(rb'\sxmlns(?::([\w.-]+))?="([^"]*)"')
+NAMESPACE_DECLARATIONS = re.compile(rb'(?:\sxmlns(?::[\w.-]+)?="[^"]*")+')
+
+
+def _set(element, attribute: str, value: str) -> bool:
+    if element.get(attribute) == value:
+        return False
+    element.set(attribute, value)
+    return True
+
+
+def _paragraph_text(p) -> str:
+    return ''.join(t.text or '' for t in p.iter(W_T))
+
+
+def fix_runs(element, counts: Counter) -> None:
+    for r in element.iter(W_R):
+        rPr = r.get_or_add_rPr()
+        rFonts = rPr.get_or_add_rFonts()
+        changed = any([_set(rFonts, W_ASCII, TIMES_NEW_ROMAN), _set(rFonts, W_H_ANSI, TIMES_NEW_ROMAN)])
+        for attribute in FONT_THEME_ATTRIBUTES:
+            changed = rFonts.attrib.pop(attribute, None) is not None or changed
+        counts['font'] += changed
+        counts['font_size'] += _set(rPr.get_or_add_sz(), W_VAL, FONT_SIZE_HALF_POINTS)
+
+
+def fix_paragraph(p, counts: Counter, hanging_indent: bool) -> None:
+    pPr = p.get_or_add_pPr()
+    spacing = pPr.get_or_add_spacing()
+    changed = any([_set(spacing, W_LINE, DOUBLE_SPACING_TWIPS), _set(spacing, W_LINE_RULE, 'auto'),
+                   _set(spacing, W_BEFORE, '0'), _set(spacing, W_AFTER, '0')])
+    for attribute in LINE_SPACING_OVERRIDES:
+        changed = spacing.attrib.pop(attribute, None) is not None or changed
+    counts['line_spacing'] += changed
+
+    if hanging_indent:
+        ind = pPr.get_or_add_ind()
+        changed = any([_set(ind, W_LEFT, HALF_INCH_TWIPS), _set(ind, W_HANGING, HALF_INCH_TWIPS)])
+        counts['hanging_indent'] += ind.attrib.pop(W_FIRST_LINE, None) is not None or changed
+
+
+def fix_sections(element, counts: Counter) -> None:
+    for sectPr in element.iter(W_SECTPR):
+        pgMar = sectPr.get_or_add_pgMar()
+        changed = any([_set(pgMar, attribute, ONE_INCH_TWIPS) for attribute in MARGIN_ATTRIBUTES])
+        for attribute, value in PAGE_MARGIN_DEFAULTS.items():
+            if pgMar.get(attribute) is None:
+                pgMar.set(attribute, value)
+        counts['margins'] += changed
+
+
+def _start_tag(element, nsmap) -> bytes:
+    # An empty copy serializes as '<w:body .../>'; turn it into an opening tag.
+    tag = etree.tostring(etree.Element(element.tag, dict(element.attrib), nsmap=nsmap))
+    return tag[:-2] + b'>'
+
+
+def _end_tag(element) -> bytes:
+    name = etree.QName(element).localname
+    return f'</{element.prefix}:{name}>'.encode() if element.prefix else f'</{name}>'.encode()
+
+
+class _DeclarationStripper:
+    """Drop the namespace declarations a body element inherits from the already written root tag.
+
+    lxml repeats every in-scope namespace on each serialized subtree, which would add
+    a few hundred bytes to every paragraph of a typical Word document. The repeated
+    block is the same for every element, so each distinct one is only parsed once.
+    """
+
+    def __init__(self, declared: Dict):
+        self.declared = declared
+        self.stripped = {}
+
+    def _keep(self, match) -> bytes:
+        prefix = match.group(1).decode() if match.group(1) else None
+        return b'' if self.declared.get(prefix) == match.group(2).decode() else match.group(0)
+
+    def __call__(self, data: bytes) -> bytes:
+        match = NAMESPACE_DECLARATIONS.search(data, 0, data.index(b'>'))
+        if match is None:
+            return data
+        declarations = match.group(0)
+        if declarations not in self.stripped:
+            self.stripped[declarations] = NAMESPACE_DECLARATION.sub(self._keep, declarations)
+        return data[:match.start()] + self.stripped[declarations] + data[match.end():]
+
+
+def level_one_heading_styles(styles_xml: bytes) -> FrozenSet[str]:
+    """Ids of the paragraph styles named "Heading 1" in ``word/styles.xml``."""
+    styles = etree.fromstring(styles_xml, etree.XMLParser(resolve_entities=False))
+    return frozenset(style.get(W_STYLE_ID) for style in styles.iterchildren(W_STYLE)
+                     if style.get(W_TYPE) == 'paragraph' and style.find(W_NAME) is not None
+                     and style.find(W_NAME).get(W_VAL, '').lower() == 'heading 1')
+
+
+def _ends_references(p, text: str, level_one_styles: FrozenSet[str]) -> bool:
+    # Where DocumentOutline ends the References section: the next section marker or level 1 heading.
+    pPr = p.pPr
+    if pPr is not None and pPr.style in level_one_styles:
+        return True
+    return section_heading(text) is not None or KEYWORDS_LABEL.match(text.strip()) is not None
+
+
+def fix_document_xml(source: IO[bytes], target: IO[bytes],
+                     level_one_styles: FrozenSet[str] = frozenset()) -> Counter:
+    """Stream ``word/document.xml`` from ``source`` to ``target`` fixing body elements one at a time.
+
+    Each top-level body element (paragraph, table, final ``w:sectPr``) is fixed, written
+    and dropped as soon as it has been parsed, so memory stays bounded by the largest
+    single element rather than the document. ``level_one_styles`` are the style ids of
+    level 1 headings, which end the References section.
+    """
+    counts = Counter({fix: 0 for fix in FIXES})
+    in_references = False
+    root = strip = None
+    open_tags = []
+
+    def write_start_tags(element):
+        # Start tags of the root and the body are written lazily, once their first child is complete.
+        ancestors = []
+        while element is not None and element not in open_tags:
+            ancestors.append(element)
+            element = element.getparent()
+        for ancestor in reversed(ancestors):
+            tag = _start_tag(ancestor, ancestor.nsmap)
+            target.write(strip(tag) if open_tags else tag)
+            open_tags.append(ancestor)
+
+    events = etree.iterparse(source, events=('end',), resolve_entities=False, huge_tree=True)
+    events.set_element_class_lookup(element_class_lookup)
+    target.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n')
+    for _, element in events:
+        parent = element.getparent()
+        if root is None:
+            root = element
+            while root.getparent() is not None:
+                root = root.getparent()
+            strip = _DeclarationStripper(root.nsmap)
+
+        if parent is None or (element.tag == W_BODY and parent is root):
+            write_start_tags(element)
+            target.write(_end_tag(element))
+            if parent is not None:
+                parent.remove(element)
+        elif parent is root or (parent.tag == W_BODY and parent.getparent() is root):
+            write_start_tags(parent)
+            if parent is not root:
+                fix_runs(element, counts)
+                fix_sections(element, counts)
+                if element.tag == W_P:
+                    text = _paragraph_text(element)
+                    heading = section_heading(text) == REFERENCES
+                    if heading:
+                        in_references = True
+                    elif in_references and _ends_references(element, text, level_one_styles):
+                        in_references = False
+                    fix_paragraph(element, counts, hanging_indent=in_references and not heading and bool(text.strip()))
+            target.write(strip(etree.tostring(element, encoding='UTF-8')))
+            parent.remove(element)
+
+    return counts
+
+
+def autofix_docx(src_path: str, dst_path: str) -> Dict[str, int]:
+    """Write a copy of ``src_path`` to ``dst_path`` with the mechanical APA formatting issues fixed.
+
+    Runs get Times New Roman 12pt, body paragraphs double spacing without extra space
+    before or after, every section 1 inch margins and the paragraphs of the References
+    section a 0.5 inch hanging indent. Only ``word/document.xml`` is
+    rewritten; every other part is copied as is. Returns how many elements each fix changed.
+    """
+    with zipfile.ZipFile(src_path) as src, zipfile.ZipFile(dst_path, 'w', zipfile.ZIP_DEFLATED) as dst:
+        counts = Counter()
+        level_one_styles = level_one_heading_styles(src.read(STYLES_PART)) if STYLES_PART in src.namelist() \
+            else frozenset()
+        for info in src.infolist():
+            with src.open(info) as source, dst.open(info, 'w') as target:
+                if info.filename == DOCUMENT_PART:
+                    counts = fix_document_xml(source, target, level_one_styles)
+                else:
+                    shutil.copyfileobj(source, target)
+    return dict(counts)
@@ -0,0 +1,82 @@
+import re
+import zipfile
+import zlib
+from typing import IO, Optional
+
+from pydantic import BaseModel
+
+CONTENT_TYPES_PART = '[Content_Types].xml'
+DOCUMENT_PART = 'word/document.xml'
+APP_PROPERTIES_PART = 'docProps/app.xml'
+
+MAX_APP_PROPERTIES_BYTES = 64 * 1024
+# Small XML parts legitimately compress very well, only large entries are checked for bomb-like ratios.
+MIN_RATIO_CHECK_BYTES = 1024 * 1024
+PARAGRAPHS_PATTERN = re.compile(rb'<(?:\w+:)?Paragraphs>\s*(\d+)\s*</(?:\w+:)?Paragraphs>')
+
+
+class DocxInspectionError(ValueError):
+    pass
+
+
+class DocxInspection(BaseModel):
+    size_bytes: int
+    uncompressed_bytes: int
+    document_xml_bytes: int
+    paragraph_count_hint: Optional[int] = None
+
+
+def inspect_docx(file: IO[bytes],
+                 max_uncompressed_bytes: int,
+                 max_compression_ratio: float,
+                 max_entries: int) -> DocxInspection:
+    """Check that ``file`` looks like a sane .docx package using only the zip central directory.
+
+    Nothing is decompressed except ``docProps/app.xml``, which is tiny and carries the
+    paragraph count Word stores when saving.
+    """
+    file.seek(0, 2)
+    size_bytes = file.tell()
+    file.seek(0)
+
+    try:
+        archive = zipfile.ZipFile(file)
+    except (zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+        raise DocxInspectionError(f"File is not a valid .docx archive: {e}")
+
+    with archive:
+        entries = archive.infolist()
+        if len(entries) > max_entries:
+            raise DocxInspectionError(f"Archive has too many entries ({len(entries)} > {max_entries})")
+
+        parts = {entry.filename: entry for entry in entries}
+        for required_part in (CONTENT_TYPES_PART, DOCUMENT_PART):
+            if required_part not in parts:
+                raise DocxInspectionError(f"File is not a Word document: '{required_part}' is missing")
+
+        uncompressed_bytes = sum(entry.file_size for entry in entries)
+        if uncompressed_bytes > max_uncompressed_bytes:
+            raise DocxInspectionError(
+                f"Uncompressed size {uncompressed_bytes} exceeds the limit of {max_uncompressed_bytes} bytes")
+
+        for entry in entries:
+            if entry.file_size >= MIN_RATIO_CHECK_BYTES and \
+                    entry.file_size > max_compression_ratio * max(entry.compress_size, 1):
+                raise DocxInspectionError(f"Compression ratio of '{entry.filename}' is suspiciously high")
+
+        paragraph_count_hint = None
+        app_properties = parts.get(APP_PROPERTIES_PART)
+        if app_properties is not None and app_properties.file_size <= MAX_APP_PROPERTIES_BYTES:
+            try:
+                match = PARAGRAPHS_PATTERN.search(archive.read(app_properties))
+            except (zipfile.BadZipFile, OSError, zlib.error):
+                match = None
+            if match:
+                paragraph_count_hint = int(match.group(1))
+
+        return DocxInspection(
+            size_bytes=size_bytes,
+            uncompressed_bytes=uncompressed_bytes,
+            document_xml_bytes=parts[DOCUMENT_PART].file_size,
+            paragraph_count_hint=paragraph_count_hint,
+        )
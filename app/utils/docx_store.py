@@ -0,0 +1,83 @@
+import hashlib
+import os
+import tempfile
+import zipfile
+import zlib
+from typing import Dict, List, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def part_path(store_dir: str, sha256: str) -> str:
+    return os.path.join(store_dir, sha256[:2], sha256)
+
+
+def store_docx_parts(src_path: str, store_dir: str) -> Tuple[List[Dict], int]:
+    """Split a .docx into its zip entries and keep each distinct one once in ``store_dir``.
+
+    Parts are content addressed by sha256 and kept zlib-compressed, so a revision that
+    only changes ``word/document.xml`` adds a single part and re-uses media, styles,
+    fonts and everything else from earlier versions. Returns the manifest needed to
+    rebuild the file and the number of bytes newly written to the store.
+    """
+    manifest = []
+    stored_bytes = 0
+    os.makedirs(store_dir, exist_ok=True)
+
+    with zipfile.ZipFile(src_path) as archive:
+        for info in archive.infolist():
+            digest = hashlib.sha256()
+            compressor = zlib.compressobj()
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=store_dir, suffix=".tmp")
+            try:
+                with os.fdopen(file_descriptor, "wb") as temporary, archive.open(info) as part:
+                    for chunk in iter(lambda: part.read(CHUNK_SIZE), b""):
+                        digest.update(chunk)
+                        temporary.write(compressor.compress(chunk))
+                    temporary.write(compressor.flush())
+
+                sha256 = digest.hexdigest()
+                path = part_path(store_dir, sha256)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    stored_bytes += os.path.getsize(temporary_path)
+                    os.replace(temporary_path, path)
+            finally:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+
+            manifest.append({
+                "name": info.filename,
+                "sha256": sha256,
+                "size": info.file_size,
+                "compress_type": info.compress_type,
+                "date_time": list(info.date_time),
+            })
+
+    return manifest, stored_bytes
+
+
+def build_docx(manifest: List[Dict], store_dir: str, dst_path: str) -> None:
+    """Reassemble the .docx described by ``manifest`` from the part store."""
+    with zipfile.ZipFile(dst_path, "w") as archive:
+        for entry in manifest:
+            info = zipfile.ZipInfo(entry["name"], date_time=tuple(entry["date_time"]))
+            info.compress_type = entry["compress_type"]
+            decompressor = zlib.decompressobj()
+            with open(part_path(store_dir, entry["sha256"]), "rb") as part, archive.open(info, "w") as target:
+                for chunk in iter(lambda: part.read(CHUNK_SIZE), b""):
+                    target.write(decompressor.decompress(chunk))
+                target.write(decompressor.flush())
+
+
+def diff_manifests(old: List[Dict], new: List[Dict]) -> Dict[str, List[str]]:
+    """Compare two versions part by part using only their manifests."""
+    old_parts = {entry["name"]: entry["sha256"] for entry in old}
+    new_parts = {entry["name"]: entry["sha256"] for entry in new}
+
+    return {
+        "added": [name for name in new_parts if name not in old_parts],
+        "removed": [name for name in old_parts if name not in new_parts],
+        "changed": [name for name in new_parts if name in old_parts and old_parts[name] != new_parts[name]],
+        "unchanged": [name for name in new_parts if old_parts.get(name) == new_parts[name]],
+    }
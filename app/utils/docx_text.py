@@ -0,0 +1,32 @@
+import zipfile
+from typing import List
+
+from .docx_inspect import DOCUMENT_PART
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_P = f'{W_NS}p'
+W_T = f'{W_NS}t'
+
+# A Postgres tsvector holds at most 1MB, the start of a long document is plenty to find it by.
+MAX_TEXT_CHARS = 200_000
+
+
+def extract_docx_text(file_path: str, max_chars: int = MAX_TEXT_CHARS) -> str:
+    """Plain text of the document body, one line per paragraph, read in a single streaming pass."""
+    from lxml import etree
+
+    lines: List[str] = []
+    length = 0
+
+    with zipfile.ZipFile(file_path) as archive, archive.open(DOCUMENT_PART) as document:
+        for _, p in etree.iterparse(document, tag=W_P, resolve_entities=False, huge_tree=True):
+            # Clearing each paragraph keeps memory flat and stops text boxes nested in a paragraph being counted twice.
+            text = ''.join(t.text or '' for t in p.iter(W_T))
+            p.clear(keep_tail=True)
+            if text:
+                lines.append(text)
+                length += len(text) + 1
+                if length >= max_chars:
+                    break
+
+    return '\n'.join(lines)[:max_chars]
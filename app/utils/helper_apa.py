@@ -1,43 +1,219 @@
 import docx
-from docx.shared import Pt, Inches
+from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-from typing import List
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, List, Dict, Iterable, Optional, Tuple
+import numpy as np
+import logging
 import re
+import time
+from .run_table import RunTable, NONE, W_P
+from .style_resolver import StyleResolver, ParagraphFormat
+from .outline import DocumentOutline, TITLE_PAGE, AUTHOR_NOTE, ABSTRACT, KEYWORDS, MAIN_TEXT, REFERENCES
+
+# Bump whenever a rule changes what it reports, cached annotated documents are keyed on it.
+RULES_VERSION = 3
+
+TIMES_NEW_ROMAN = 'Times New Roman'
+FONT_SIZE_HALF_POINTS = 24
+HALF_INCH_TWIPS = 720
+
+RULE_SCOPES = ('document', 'section', 'paragraph', 'run', 'table')
+
+
+@dataclass(frozen=True)
+class Rule:
+    id: str
+    scope: str
+    cost: int
+    features: Tuple[str, ...]
+    method: str
+
+
+RULES: Dict[str, Rule] = {}
+
+
+def rule(rule_id: str, scope: str, cost: int, features: Tuple[str, ...]):
+    if scope not in RULE_SCOPES:
+        raise ValueError(f"Unknown rule scope: {scope}")
+    unknown_features = [name for name in features if not isinstance(getattr(DocumentFeatures, name, None),
+                                                                     cached_property)]
+    if unknown_features:
+        raise ValueError(f"Unknown document features: {', '.join(unknown_features)}")
+
+    def decorator(method):
+        RULES[rule_id] = Rule(rule_id, scope, cost, features, method.__name__)
+        return method
+
+    return decorator
+
+
+class DocumentFeatures:
+    """Parts of a document the rules work on, extracted on first use only."""
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    def missing(self, names: Iterable[str]) -> List[str]:
+        """The features of ``names`` not extracted yet."""
+        return [name for name in names if name not in self.__dict__]
+
+    @cached_property
+    def paragraphs(self):
+        return self.doc.paragraphs
+
+    @cached_property
+    def styles(self) -> StyleResolver:
+        return StyleResolver(self.doc)
+
+    @cached_property
+    def run_table(self) -> RunTable:
+        return RunTable(self.doc, self.styles)
+
+    @cached_property
+    def outline(self) -> DocumentOutline:
+        return DocumentOutline(self.paragraphs, self.doc.styles)
+
+    @cached_property
+    def sections(self):
+        return list(self.doc.sections)
+
+    @cached_property
+    def headers(self):
+        return [section.header for section in self.sections]
+
+    @cached_property
+    def tables(self):
+        return self.doc.tables
+
+
+class IssueLimitReached(Exception):
+    pass
+
+
+class IssueList(list):
+    """Issue messages plus, in ``locations``, the ``w:p`` element each one refers to (or ``None``)."""
+
+    def __init__(self, max_issues: Optional[int] = None):
+        super().__init__()
+        self.max_issues = max_issues
+        self.locations = []
+
+    def append(self, issue: str, location=None) -> None:
+        # Raised by the issue past the limit, a document with exactly max_issues issues is checked in full.
+        if self.max_issues is not None and len(self) >= self.max_issues:
+            raise IssueLimitReached
+        super().append(issue)
+        self.locations.append(location)
+
+
+logger = logging.getLogger('app.validator')
+
+
+class NoSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> 'NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+NO_SPAN = NoSpan()
+
+
+def no_span(name: str, **attributes: Any) -> NoSpan:
+    return NO_SPAN
 
 
 class APAValidator:
-    def __init__(self):
-        self.issues = []
+    def __init__(self, rules: Optional[Iterable[str]] = None, max_issues: Optional[int] = None,
+                 listener: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 span: Callable[..., Any] = no_span):
+        # span(name, **attributes) times a step; the app passes its tracer's, utils/ stays free of app imports.
+        self.rules = list(RULES) if rules is None else [RULES[rule_id].id for rule_id in rules]
+        self.max_issues = max_issues
+        self.listener = listener
+        self.span = span
+        self.issues = IssueList(max_issues)
+        self.issue_paragraphs: List[Optional[int]] = []
+        self.rule_counts: Dict[str, int] = {}
+        self.truncated = False
 
     def validate_document(self, doc_path: str) -> List[str]:
 
-        doc = docx.Document(doc_path)
-        self.issues = []
-
-        self._check_font(doc)
-        self._check_margins(doc)
-        self._check_line_spacing(doc)
-        self._check_document_structure(doc)
-
-        self._check_title_page(doc)
-        self._check_abstract(doc)
-        self._check_keywords(doc)
-        self._check_main_text(doc)
-        self._check_references(doc)
-        self._check_header(doc)
-
-        return self.issues
-
-    def _check_font(self, doc):
-        for paragraph in doc.paragraphs:
-            for run in paragraph.runs:
-                if run.font.name != 'Times New Roman':
-                    self.issues.append(f"Font is not Times New Roman: '{run.text}'")
-                if run.font.size and run.font.size.pt != 12:
-                    self.issues.append(f"Font size is not 12pt: '{run.text}'")
-
-    def _check_margins(self, doc):
-        sections = doc.sections
+        with self.span('docx.open'):
+            doc = docx.Document(doc_path)
+        self.issues = IssueList(self.max_issues)
+        self.rule_counts = {}
+        self.truncated = False
+        features = DocumentFeatures(doc)
+
+        rules = self.rules
+        if self.max_issues is not None:
+            rules = sorted(rules, key=lambda rule_id: RULES[rule_id].cost)
+
+        total_cost = sum(RULES[rule_id].cost for rule_id in rules) or 1
+        done_cost = 0
+        started = time.perf_counter()
+        try:
+            for rule_id in rules:
+                self._emit('rule_started', rule=rule_id)
+                first_issue = len(self.issues)
+                rule_started = time.perf_counter()
+                # Extract what the rule declared first, so its apa.rule span times the check alone.
+                missing = features.missing(RULES[rule_id].features)
+                if missing:
+                    with self.span('docx.features', rule=rule_id, features=','.join(missing)):
+                        for name in missing:
+                            getattr(features, name)
+                try:
+                    with self.span('apa.rule', rule=rule_id) as rule_span:
+                        getattr(self, RULES[rule_id].method)(features)
+                finally:
+                    done_cost += RULES[rule_id].cost
+                    self.rule_counts[rule_id] = len(self.issues) - first_issue
+                    rule_span.set_attribute('issues', self.rule_counts[rule_id])
+                    logger.debug('rule finished', extra={
+                        'rule': rule_id, 'issues': self.rule_counts[rule_id],
+                        'duration_ms': round((time.perf_counter() - rule_started) * 1000, 1)})
+                    self._emit('rule_finished', rule=rule_id, issues=self.issues[first_issue:],
+                               issue_count=len(self.issues), progress=round(100 * done_cost / total_cost))
+        except IssueLimitReached:
+            self.truncated = True
+        logger.info('document validated', extra={
+            'rules': len(self.rule_counts), 'issues': len(self.issues), 'truncated': self.truncated,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 1)})
+
+        body_index = {p: i for i, p in enumerate(doc.element.body.iterchildren(W_P))}
+        self.issue_paragraphs = [None if location is None else body_index.get(location)
+                                 for location in self.issues.locations]
+        return list(self.issues)
+
+    def _emit(self, event: str, **data) -> None:
+        if self.listener is not None:
+            self.listener({'event': event, **data})
+
+    @rule('font', scope='run', cost=3, features=('run_table',))
+    def _check_font(self, features: DocumentFeatures):
+        table = features.run_table
+        wrong_font = (table.run_font == NONE) | (table.run_font != table.font_id(TIMES_NEW_ROMAN))
+        wrong_size = (table.run_size > 0) & (table.run_size != FONT_SIZE_HALF_POINTS)
+
+        for i in np.flatnonzero(wrong_font | wrong_size):
+            text = table.run_text(i)
+            location = table.paragraphs[table.run_paragraph[i]]
+            if wrong_font[i]:
+                self.issues.append(f"Font is not Times New Roman: '{text}'", location=location)
+            if wrong_size[i]:
+                self.issues.append(f"Font size is not 12pt: '{text}'", location=location)
+
+    @rule('margins', scope='section', cost=1, features=('sections',))
+    def _check_margins(self, features: DocumentFeatures):
+        sections = features.sections
         for section in sections:
             if (section.left_margin.inches != 1 or
                     section.right_margin.inches != 1 or
@@ -45,192 +221,171 @@ class APAValidator:
                     section.bottom_margin.inches != 1):
                 self.issues.append("Margins are not set to 1 inch on all sides")
 
-    def _check_line_spacing(self, doc):
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                if paragraph.paragraph_format.line_spacing != 2:
-                    self.issues.append(f"Text is not double-spaced: '{paragraph.text}'")
-
-                space_after = paragraph.paragraph_format.space_after
-                space_before = paragraph.paragraph_format.space_before
-
-                if (space_after is not None and space_after > 0) or (space_before is not None and space_before > 0):
-                    self.issues.append(f"Extra space found between paragraphs: '{paragraph.text}'")
-
-    def _check_document_structure(self, doc):
-        required_sections = ['Title Page', 'Abstract', 'Keywords', 'References']
-        found_sections = []
-
-        for paragraph in doc.paragraphs:
-            for section in required_sections:
-                if section.lower() in paragraph.text.lower():
-                    found_sections.append(section)
-
-        missing_sections = set(required_sections) - set(found_sections)
+    @rule('line_spacing', scope='paragraph', cost=2, features=('run_table',))
+    def _check_line_spacing(self, features: DocumentFeatures):
+        table = features.run_table
+        has_text = table.paragraph_has_text
+        not_double = has_text & (table.paragraph_line_spacing != 2)
+        extra_space = has_text & ((table.paragraph_space_after > 0) | (table.paragraph_space_before > 0))
+
+        for i in np.flatnonzero(not_double | extra_space):
+            text = table.paragraph_text[i]
+            if not_double[i]:
+                self.issues.append(f"Text is not double-spaced: '{text}'", location=table.paragraphs[i])
+            if extra_space[i]:
+                self.issues.append(f"Extra space found between paragraphs: '{text}'", location=table.paragraphs[i])
+
+    @rule('document_structure', scope='document', cost=1, features=('outline',))
+    def _check_document_structure(self, features: DocumentFeatures):
+        required_sections = {'Title Page': TITLE_PAGE, 'Abstract': ABSTRACT, 'Keywords': KEYWORDS,
+                             'References': REFERENCES}
+        missing_sections = [name for name, section in required_sections.items()
+                            if features.outline.section(section) is None]
         if missing_sections:
             self.issues.append(f"Missing required sections: {', '.join(missing_sections)}")
 
-    def _check_title_page(self, doc):
-        first_page = doc.paragraphs[:10]
-        found_title = False
-        for para in first_page:
-            if para.style.name == 'Title':
-                found_title = True
-                if not self._is_title_case(para.text):
-                    self.issues.append("Title is not in title case")
-                if not self._is_centered(para):
-                    self.issues.append("Title is not centered")
-                if not any(run.bold for run in para.runs):
-                    self.issues.append("Title is not bolded")
-                break
-
-        if not found_title:
+    @rule('title_page', scope='document', cost=1, features=('paragraphs', 'outline', 'styles'))
+    def _check_title_page(self, features: DocumentFeatures):
+        outline = features.outline
+        if outline.title is None:
             self.issues.append("Title not found in upper half of first page")
-
-        author_info_found = False
-        for para in first_page[1:]:
-            if para.text.strip():
-                author_info_found = True
-                if not self._is_centered(para):
-                    self.issues.append("Author information is not centered")
-                break
-
-        if not author_info_found:
+        else:
+            para = features.paragraphs[outline.title]
+            if not self._is_title_case(outline.texts[outline.title]):
+                self.issues.append("Title is not in title case", location=para._p)
+            if not self._is_centered(features, para):
+                self.issues.append("Title is not centered", location=para._p)
+            if not self._is_bold(features, para):
+                self.issues.append("Title is not bolded", location=para._p)
+
+        if outline.author is None:
             self.issues.append("Author information not found")
+        elif not self._is_centered(features, features.paragraphs[outline.author]):
+            self.issues.append("Author information is not centered", location=features.paragraphs[outline.author]._p)
 
-        author_note_found = False
-        for para in first_page:
-            if 'Author Note' in para.text:
-                author_note_found = True
-                if para.alignment != WD_ALIGN_PARAGRAPH.CENTER:
-                    self.issues.append("Author Note is not centered")
-                if not any(run.bold for run in para.runs):
-                    self.issues.append("Author Note heading is not bolded")
-                break
-
-        if not author_note_found:
+        author_note = outline.section(AUTHOR_NOTE)
+        if author_note is None:
             self.issues.append("Author Note not found")
-
-    def _check_abstract(self, doc):
-        abstract_found = False
-        for paragraph in doc.paragraphs:
-            if 'abstract' in paragraph.text.lower():
-                abstract_found = True
-                if not self._is_centered(paragraph):
-                    self.issues.append("Abstract heading is not centered")
-                if not any(run.bold for run in paragraph.runs):
-                    self.issues.append("Abstract heading is not bolded")
-                words = len(paragraph.text.split())
-                if words > 250:
-                    self.issues.append("Abstract exceeds 250 words")
-                break
-
-        if not abstract_found:
+        else:
+            para = features.paragraphs[author_note.start]
+            if not self._is_centered(features, para):
+                self.issues.append("Author Note is not centered", location=para._p)
+            if not self._is_bold(features, para):
+                self.issues.append("Author Note heading is not bolded", location=para._p)
+
+    @rule('abstract', scope='document', cost=1, features=('paragraphs', 'outline', 'styles'))
+    def _check_abstract(self, features: DocumentFeatures):
+        abstract = features.outline.section(ABSTRACT)
+        if abstract is None:
             self.issues.append("Abstract section not found")
-
-    def _check_keywords(self, doc):
-        keywords_found = False
-        for paragraph in doc.paragraphs:
-            if 'keywords' in paragraph.text.lower():
-                keywords_found = True
-
-                if not paragraph.text.lower().startswith("keywords:"):
-                    self.issues.append("Keywords heading should begin with 'Keywords:'")
-                if not any(run.font.italic for run in paragraph.runs):
-                    self.issues.append("Keywords heading is not italicized")
-
-                if paragraph.paragraph_format.left_indent != Inches(0.5):
-                    self.issues.append("Keywords heading is not indented 0.5 inches")
-
-                content_found = False
-                for para in doc.paragraphs:
-                    if 'keywords:' in para.text.lower():
-                        keywords = para.text.split(":")[1].strip()
-                        if not keywords.islower():
-                            self.issues.append("Keywords should be listed in lowercase")
-                        if ',' not in keywords:
-                            self.issues.append("Keywords should be separated by commas")
-                        content_found = True
-                        break
-
-                if not content_found:
-                    self.issues.append("Keywords content not found below 'Keywords:'")
-
-                break
-
-        if not keywords_found:
+            return
+
+        paragraph = features.paragraphs[abstract.start]
+        if not self._is_centered(features, paragraph):
+            self.issues.append("Abstract heading is not centered", location=paragraph._p)
+        if not self._is_bold(features, paragraph):
+            self.issues.append("Abstract heading is not bolded", location=paragraph._p)
+        words = sum(len(features.outline.texts[i].split()) for i in range(abstract.start + 1, abstract.end))
+        if words > 250:
+            self.issues.append("Abstract exceeds 250 words", location=paragraph._p)
+
+    @rule('keywords', scope='document', cost=1, features=('paragraphs', 'outline', 'styles'))
+    def _check_keywords(self, features: DocumentFeatures):
+        keywords_line = features.outline.section(KEYWORDS)
+        if keywords_line is None:
             self.issues.append("Keywords section not found")
-
-    def _check_main_text(self, doc):
-        main_text_started = False
-        for i, paragraph in enumerate(doc.paragraphs):
-            if 'keywords' in paragraph.text.lower():
-                main_text_started = True
-            elif 'references' in paragraph.text.lower() and main_text_started:
-                break
-            elif main_text_started:
-                if i == 0:
-                    if not paragraph.text.strip():
-                        self.issues.append("Main text should start on a new page after 'Keywords'.")
-
-        title_found = False
-        first_paragraph = doc.paragraphs[0]
-        if first_paragraph.alignment == WD_ALIGN_PARAGRAPH.CENTER and first_paragraph.bold:
-            title_found = True
-        if not title_found:
-            self.issues.append(
-                "The title should be repeated in bold and centered at the top of the first page of the main text.")
+            return
+
+        paragraph = features.paragraphs[keywords_line.start]
+        text = features.outline.texts[keywords_line.start].strip()
+        if not text.lower().startswith("keywords:"):
+            self.issues.append("Keywords heading should begin with 'Keywords:'", location=paragraph._p)
+        if not self._is_italic(features, paragraph):
+            self.issues.append("Keywords heading is not italicized", location=paragraph._p)
+
+        if self._format(features, paragraph).left_indent != HALF_INCH_TWIPS:
+            self.issues.append("Keywords heading is not indented 0.5 inches", location=paragraph._p)
+
+        keywords = text.split(":", 1)[1].strip() if ":" in text else ""
+        if not keywords:
+            self.issues.append("Keywords content not found below 'Keywords:'", location=paragraph._p)
+        else:
+            if not keywords.islower():
+                self.issues.append("Keywords should be listed in lowercase", location=paragraph._p)
+            if ',' not in keywords:
+                self.issues.append("Keywords should be separated by commas", location=paragraph._p)
+
+    @rule('main_text', scope='paragraph', cost=3, features=('paragraphs', 'outline', 'styles'))
+    def _check_main_text(self, features: DocumentFeatures):
+        outline = features.outline
+        main_text = outline.section(MAIN_TEXT)
+        title = next((i for i in main_text if outline.texts[i].strip()), None)
+        if title is not None:
+            first_paragraph = features.paragraphs[title]
+            if not (self._is_centered(features, first_paragraph) and self._is_bold(features, first_paragraph)):
+                self.issues.append(
+                    "The title should be repeated in bold and centered at the top of the first page of the main text.",
+                    location=first_paragraph._p)
 
         citation_pattern = r'\(([\w\s&]+, \d{4}(?:, .+)?(?:, p. \d{1,3})?)\)'
-        for paragraph in doc.paragraphs:
-            if re.search(citation_pattern, paragraph.text):
-                citations = re.findall(citation_pattern, paragraph.text)
+        for i in main_text:
+            paragraph, text = features.paragraphs[i], outline.texts[i]
+            if re.search(citation_pattern, text):
+                citations = re.findall(citation_pattern, text)
                 for citation in citations:
                     authors = citation.split(",")[0].strip()
                     if '&' in authors and len(authors.split('&')) > 2:
-                        self.issues.append(f"More than two authors in citation should be in the form of 'Smith et al.'")
+                        self.issues.append(f"More than two authors in citation should be in the form of 'Smith et al.'",
+                                           location=paragraph._p)
                     if 'et al.' in citation and len(authors.split()) == 1:
                         self.issues.append(
-                            f"Correct citation format for multiple authors should be '(Smith et al., 2020)'")
+                            f"Correct citation format for multiple authors should be '(Smith et al., 2020)'",
+                            location=paragraph._p)
                         if "p." in citation:
                             if not re.search(r'\(.*p\. \d+\)', citation):
                                 self.issues.append(
-                                    f"Direct quotes should include page number, e.g., '(Smith, 2020, p. 15)'.")
+                                    f"Direct quotes should include page number, e.g., '(Smith, 2020, p. 15)'.",
+                                    location=paragraph._p)
 
         first_heading_checked = False
-        for paragraph in doc.paragraphs:
-            if 'abstract' in paragraph.text.lower() or 'references' in paragraph.text.lower():
-                continue
-
-            if paragraph.style.name == 'Heading 1':
+        for i, level in outline.headings_in(main_text):
+            paragraph = features.paragraphs[i]
+            text = outline.texts[i]
+            if level == 1:
                 if not first_heading_checked:
-                    if paragraph.alignment != WD_ALIGN_PARAGRAPH.CENTER or not paragraph.bold:
-                        self.issues.append(f"First Level 1 heading should be centered and bold: {paragraph.text}")
+                    if not self._is_centered(features, paragraph) or not self._is_bold(features, paragraph):
+                        self.issues.append(f"First Level 1 heading should be centered and bold: {text}",
+                                           location=paragraph._p)
                     first_heading_checked = True
-                else:
-                    pass
-            elif paragraph.style.name == 'Heading 2':
-                if paragraph.alignment != WD_ALIGN_PARAGRAPH.LEFT or not paragraph.bold:
-                    self.issues.append(f"Level 2 heading should be flush left and bold: {paragraph.text}")
-            elif paragraph.style.name == 'Heading 3':
-                if paragraph.alignment != WD_ALIGN_PARAGRAPH.LEFT or not paragraph.bold or not paragraph.italic:
-                    self.issues.append(f"Level 3 heading should be flush left, bold, and italic: {paragraph.text}")
-            elif paragraph.style.name == 'Heading 4':
-                if paragraph.alignment != WD_ALIGN_PARAGRAPH.LEFT or not paragraph.bold or paragraph.text[-1] != '.':
+            elif level == 2:
+                if not self._is_flush_left(features, paragraph) or not self._is_bold(features, paragraph):
+                    self.issues.append(f"Level 2 heading should be flush left and bold: {text}", location=paragraph._p)
+            elif level == 3:
+                if not self._is_flush_left(features, paragraph) or not self._is_bold(features, paragraph) or \
+                        not self._is_italic(features, paragraph):
+                    self.issues.append(f"Level 3 heading should be flush left, bold, and italic: {text}",
+                                       location=paragraph._p)
+            elif level == 4:
+                if not self._is_flush_left(features, paragraph) or not self._is_bold(features, paragraph) or \
+                        not text.endswith('.'):
                     self.issues.append(
-                        f"Level 4 heading should be flush left, bold, ending with a period: {paragraph.text}")
-            elif paragraph.style.name == 'Heading 5':
-                if paragraph.alignment != WD_ALIGN_PARAGRAPH.LEFT or not paragraph.bold or not paragraph.italic or \
-                        paragraph.text[-1] != '.':
+                        f"Level 4 heading should be flush left, bold, ending with a period: {text}",
+                        location=paragraph._p)
+            elif level == 5:
+                if not self._is_flush_left(features, paragraph) or not self._is_bold(features, paragraph) or \
+                        not self._is_italic(features, paragraph) or not text.endswith('.'):
                     self.issues.append(
-                        f"Level 5 heading should be flush left, bold, italic, ending with a period: {paragraph.text}")
+                        f"Level 5 heading should be flush left, bold, italic, ending with a period: {text}",
+                        location=paragraph._p)
 
-        for table in doc.tables:
+    @rule('tables', scope='table', cost=2, features=('tables', 'styles'))
+    def _check_tables(self, features: DocumentFeatures):
+        for table in features.tables:
             for row in table.rows:
                 if row.cells[0].paragraphs[0].text.strip():
-                    if row.cells[0].paragraphs[0].alignment != WD_ALIGN_PARAGRAPH.LEFT:
+                    if not self._is_flush_left(features, row.cells[0].paragraphs[0]):
                         self.issues.append("Table title should be flush left above the table")
-                if any(cell.paragraphs[0].runs[0].bold for cell in row.cells):
+                if any(self._is_bold(features, cell.paragraphs[0]) for cell in row.cells):
                     self.issues.append("Table heading should be in bold")
             for row in table.rows:
                 for cell in row.cells:
@@ -239,62 +394,63 @@ class APAValidator:
             if table.rows[0].cells[0].text.strip()[:6].lower() != "table":
                 self.issues.append("Tables should be numbered consecutively starting with 'Table 1'")
 
-        for i, paragraph in enumerate(doc.paragraphs):
+    @rule('figures', scope='paragraph', cost=2, features=('paragraphs',))
+    def _check_figures(self, features: DocumentFeatures):
+        for i, paragraph in enumerate(features.paragraphs):
             if "figure" in paragraph.text.lower():
-                figure_found = True
                 if not re.search(r"Figure \d+", paragraph.text):
-                    self.issues.append("Figures should be numbered sequentially, e.g., 'Figure 1'.")
+                    self.issues.append("Figures should be numbered sequentially, e.g., 'Figure 1'.",
+                                       location=paragraph._p)
                 if not re.search(r"\b[a-zA-Z0-9\s]+$", paragraph.text):
-                    self.issues.append(f"Figure caption should be brief and italicized: {paragraph.text}")
-
-    def _check_references(self, doc):
-        references_found = False
-        check_references = False
+                    self.issues.append(f"Figure caption should be brief and italicized: {paragraph.text}",
+                                       location=paragraph._p)
 
+    @rule('references', scope='paragraph', cost=3, features=('paragraphs', 'outline', 'styles'))
+    def _check_references(self, features: DocumentFeatures):
         book_pattern = r'^[A-Za-z, ]+\.\s\(\d{4}\)\.\s[A-Za-z\s]+(?:\.\s)?[A-Za-z\s]+(?:\.\s)?[A-Za-z]+[\.]{1}$'  # Match books
         journal_pattern = r'^[A-Za-z, ]+\.\s\(\d{4}\)\.\s[A-Za-z\s]+(?:\.\s)?[A-Za-z\s]+(?:,|\s)?\d{1,2}\([0-9]+\)[,\s]\d{1,3}-\d{1,3}[\.]{1}$'  # Match journal articles
         website_pattern = r'^[A-Za-z, ]+\.\s\(\d{4},\s[A-Za-z]{3}\s\d{1,2}\)\.\s[A-Za-z\s]+(?:\.\s)?[A-Za-z\s]+(?:\.\s)?https?://[A-Za-z0-9./-]+$'  # Match websites
         doi_pattern = r'^[A-Za-z, ]+\.\s\(\d{4}\)\.\s[A-Za-z\s]+(?:\.\s)?[A-Za-z\s]+(?:,|\s)?\d{1,2}\([0-9]+\)[,\s]\d{1,3}-\d{1,3}\shttps://doi.org/[A-Za-z0-9/.-]+$'  # Match DOI format
 
-        for paragraph in doc.paragraphs:
-            if 'references' in paragraph.text.lower():
-                references_found = True
-                if not self._is_centered(paragraph):
-                    self.issues.append("References title should be centered")
-                if not any(run.font.bold for run in paragraph.runs):
-                    self.issues.append("References title should be bold")
-                check_references = True
-                continue
-
-            if check_references:
-                if paragraph.text.strip():
-                    if paragraph.paragraph_format.line_spacing != 2:
-                        self.issues.append("References should be double-spaced")
-
-                    text = paragraph.text.strip()
-                    if not (re.match(book_pattern, text) or re.match(journal_pattern, text) or
-                            re.match(website_pattern, text) or re.match(doi_pattern, text)):
-                        self.issues.append(f"Reference format incorrect: '{text}'")
-
-                    if paragraph.paragraph_format.first_line_indent != Inches(-0.5):
-                        self.issues.append("References should have a hanging indent of 0.5 inches")
-
-        if not references_found:
+        references = features.outline.section(REFERENCES)
+        if references is None:
             self.issues.append("References section not found")
-
-    def _check_header(self, doc):
-        for section in doc.sections:
-            header = section.header
+            return
+
+        paragraph = features.paragraphs[references.start]
+        if not self._is_centered(features, paragraph):
+            self.issues.append("References title should be centered", location=paragraph._p)
+        if not self._is_bold(features, paragraph):
+            self.issues.append("References title should be bold", location=paragraph._p)
+
+        for i in range(references.start + 1, references.end):
+            paragraph = features.paragraphs[i]
+            text = features.outline.texts[i].strip()
+            if text:
+                if self._format(features, paragraph).line_spacing != 2:
+                    self.issues.append("References should be double-spaced", location=paragraph._p)
+
+                if not (re.match(book_pattern, text) or re.match(journal_pattern, text) or
+                        re.match(website_pattern, text) or re.match(doi_pattern, text)):
+                    self.issues.append(f"Reference format incorrect: '{text}'", location=paragraph._p)
+
+                if self._format(features, paragraph).first_line_indent != -HALF_INCH_TWIPS:
+                    self.issues.append("References should have a hanging indent of 0.5 inches", location=paragraph._p)
+
+    @rule('header', scope='section', cost=1, features=('sections', 'headers', 'styles'))
+    def _check_header(self, features: DocumentFeatures):
+        for header in features.headers:
             running_head_found = False
             page_number_found = False
 
             for paragraph in header.paragraphs:
-                if paragraph.alignment == WD_ALIGN_PARAGRAPH.LEFT:
+                if self._is_flush_left(features, paragraph):
                     running_head_found = True
                     if paragraph.text != paragraph.text.upper():
                         self.issues.append("Running head should be in all uppercase letters")
 
-                if paragraph.alignment == WD_ALIGN_PARAGRAPH.RIGHT and 'page' in paragraph.text.lower():
+                if (self._alignment(features, paragraph) == WD_ALIGN_PARAGRAPH.RIGHT
+                        and 'page' in paragraph.text.lower()):
                     page_number_found = True
                     if not any(run.text.isdigit() for run in paragraph.runs):
                         self.issues.append("Page number is missing or not correct")
@@ -314,15 +470,46 @@ class APAValidator:
                 return False
         return True
 
-    def _is_centered(self, paragraph) -> bool:
-        return paragraph.alignment == WD_ALIGN_PARAGRAPH.CENTER
-
-# validator = APAValidator()
-# issues = validator.validate_document(doc_path)
-#
-# if issues:
-#     print("Issues found:")
-#     for issue in issues:
-#         print(f"- {issue}")
-# else:
-#     print("No issues found.")
+    def _format(self, features: DocumentFeatures, paragraph) -> ParagraphFormat:
+        return features.styles.paragraph(paragraph._p)
+
+    def _alignment(self, features: DocumentFeatures, paragraph) -> int:
+        # Paragraphs without an alignment anywhere in their style chain are flush left.
+        alignment = self._format(features, paragraph).alignment
+        return WD_ALIGN_PARAGRAPH.LEFT if alignment is None else alignment
+
+    def _is_centered(self, features: DocumentFeatures, paragraph) -> bool:
+        return self._alignment(features, paragraph) == WD_ALIGN_PARAGRAPH.CENTER
+
+    def _is_flush_left(self, features: DocumentFeatures, paragraph) -> bool:
+        return self._alignment(features, paragraph) == WD_ALIGN_PARAGRAPH.LEFT
+
+    def _is_bold(self, features: DocumentFeatures, paragraph) -> bool:
+        return any(run.bold for run in features.styles.paragraph_runs(paragraph._p))
+
+    def _is_italic(self, features: DocumentFeatures, paragraph) -> bool:
+        return any(run.italic for run in features.styles.paragraph_runs(paragraph._p))
+
+
+RULE_PROFILES: Dict[str, List[str]] = {
+    'full': list(RULES),
+    'formatting': ['font', 'margins', 'line_spacing', 'header'],
+    'structure': ['document_structure', 'title_page', 'abstract', 'keywords', 'main_text', 'tables', 'figures'],
+    'references': ['references'],
+}
+
+
+def select_rules(profile: str = 'full',
+                 skip: Optional[Iterable[str]] = None,
+                 profiles: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    available_profiles = {**RULE_PROFILES, **(profiles or {})}
+    if profile not in available_profiles:
+        raise ValueError(f"Unknown rule profile: {profile}")
+
+    skipped = set(skip or ())
+    unknown_rules = (set(available_profiles[profile]) | skipped) - set(RULES)
+    if unknown_rules:
+        raise ValueError(f"Unknown rules: {', '.join(sorted(unknown_rules))}")
+
+    return [rule_id for rule_id in available_profiles[profile] if rule_id not in skipped]
+
@@ -0,0 +1,134 @@
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from docx.enum.style import WD_STYLE_TYPE
+
+from .run_table import paragraph_text
+
+TITLE_PAGE = 'title_page'
+AUTHOR_NOTE = 'author_note'
+ABSTRACT = 'abstract'
+KEYWORDS = 'keywords'
+MAIN_TEXT = 'main_text'
+REFERENCES = 'references'
+
+# The title page is looked for in the first paragraphs only, as the title page rule always did.
+TITLE_PAGE_PARAGRAPHS = 10
+SECTION_HEADINGS = {
+    'author note': AUTHOR_NOTE,
+    'abstract': ABSTRACT,
+    'references': REFERENCES,
+    'reference list': REFERENCES,
+}
+KEYWORDS_LABEL = re.compile(r'keywords\s*(?::|$)', re.IGNORECASE)
+HEADING_STYLE = re.compile(r'Heading (\d)$')
+
+
+def section_heading(text: str) -> Optional[str]:
+    """The section a paragraph reading ``text`` is the heading of, if it is nothing but a section heading."""
+    return SECTION_HEADINGS.get(text.strip().rstrip(':.').lower())
+
+
+@dataclass(frozen=True)
+class Span:
+    """Paragraph indices ``start`` (the section's heading, if it has one) up to, not including, ``end``."""
+    start: int
+    end: int
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(self.start, self.end))
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+
+class DocumentOutline:
+    """Where the parts of an APA paper are, found in one pass over the body paragraphs.
+
+    A section is recognised by a paragraph that consists of nothing but its heading
+    ("Abstract", "References", ...) or, for keywords, a paragraph starting with the
+    "Keywords:" label, so the words appearing in body text no longer count. Headings are
+    the paragraphs with a "Heading N" style. Rules look parts up here instead of
+    scanning the paragraphs themselves.
+    """
+
+    def __init__(self, paragraphs, styles):
+        style_names = {style.style_id: style.name for style in styles}
+        default_style = styles.default(WD_STYLE_TYPE.PARAGRAPH)
+        default_style_name = default_style.name if default_style is not None else 'Normal'
+
+        self.texts: List[str] = []
+        self.style_names: List[str] = []
+        self.headings: List[Tuple[int, int]] = []
+        self.title: Optional[int] = None
+        self.author: Optional[int] = None
+        markers: Dict[str, int] = {}
+
+        for i, paragraph in enumerate(paragraphs):
+            text = paragraph_text(paragraph._p)
+            pPr = paragraph._p.pPr
+            style_id = pPr.style if pPr is not None else None
+            style_name = style_names.get(style_id, default_style_name) if style_id else default_style_name
+            self.texts.append(text)
+            self.style_names.append(style_name)
+
+            heading = HEADING_STYLE.match(style_name)
+            if heading:
+                self.headings.append((i, int(heading.group(1))))
+
+            stripped = text.strip()
+            section = section_heading(stripped)
+            if section is None and KEYWORDS_LABEL.match(stripped):
+                section = KEYWORDS
+            if section is not None and section not in markers:
+                markers[section] = i
+
+            if self.title is None and i < TITLE_PAGE_PARAGRAPHS and style_name == 'Title':
+                self.title = i
+
+        # The author line is the first non-empty paragraph after the title (or the first paragraph) on the title page.
+        first_page = range(1 if self.title is None else self.title + 1, min(TITLE_PAGE_PARAGRAPHS, len(self.texts)))
+        self.author = next((i for i in first_page if self.texts[i].strip()), None)
+        self.heading_positions = [i for i, _ in self.headings]
+
+        self.sections: Dict[str, Span] = {}
+        # A section runs until the next recognised section or level 1 heading.
+        boundaries = sorted(set(markers.values()) | {i for i, level in self.headings if level == 1})
+        for section, start in markers.items():
+            following = boundaries[bisect_left(boundaries, start + 1):]
+            self.sections[section] = Span(start, following[0] if following else len(self.texts))
+        if KEYWORDS in markers:
+            # The keywords are listed on the label's own line.
+            self.sections[KEYWORDS] = Span(markers[KEYWORDS], markers[KEYWORDS] + 1)
+
+        abstract = self.sections.get(ABSTRACT)
+        if abstract is not None and KEYWORDS not in markers:
+            # Without a keywords line to close it, the abstract is its heading and the paragraph after it.
+            body = next((i for i in range(abstract.start + 1, abstract.end) if self.texts[i].strip()), None)
+            self.sections[ABSTRACT] = Span(abstract.start, abstract.end if body is None else body + 1)
+
+        if self.title is not None:
+            following = [self.sections[name].start for name in (ABSTRACT, KEYWORDS) if name in self.sections]
+            if following:
+                self.sections[TITLE_PAGE] = Span(0, min(following))
+            else:
+                last = max(i for i in (self.title, self.author) if i is not None)
+                self.sections[TITLE_PAGE] = Span(0, last + 1)
+
+        preceding = [self.sections[name].end for name in (TITLE_PAGE, AUTHOR_NOTE, ABSTRACT, KEYWORDS)
+                     if name in self.sections]
+        main_text_start = max(preceding, default=0)
+        references = self.sections.get(REFERENCES)
+        main_text_end = references.start if references is not None and references.start >= main_text_start \
+            else len(self.texts)
+        self.sections[MAIN_TEXT] = Span(main_text_start, main_text_end)
+
+    def section(self, name: str) -> Optional[Span]:
+        return self.sections.get(name)
+
+    def headings_in(self, span: Span) -> List[Tuple[int, int]]:
+        """``(paragraph index, level)`` of the headings inside ``span``."""
+        return self.headings[bisect_left(self.heading_positions, span.start):
+                             bisect_left(self.heading_positions, span.end)]
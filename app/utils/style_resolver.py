@@ -0,0 +1,247 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from lxml import etree
+
+W_PPR = qn('w:pPr')
+W_RPR = qn('w:rPr')
+W_R = qn('w:r')
+W_PSTYLE = qn('w:pStyle')
+W_RSTYLE = qn('w:rStyle')
+W_JC = qn('w:jc')
+W_SPACING = qn('w:spacing')
+W_IND = qn('w:ind')
+W_RFONTS = qn('w:rFonts')
+W_SZ = qn('w:sz')
+W_B = qn('w:b')
+W_I = qn('w:i')
+W_VAL = qn('w:val')
+W_ASCII = qn('w:ascii')
+W_ASCII_THEME = qn('w:asciiTheme')
+W_LINE = qn('w:line')
+W_LINE_RULE = qn('w:lineRule')
+W_BEFORE = qn('w:before')
+W_AFTER = qn('w:after')
+W_LEFT = qn('w:left')
+W_START = qn('w:start')
+W_FIRST_LINE = qn('w:firstLine')
+W_HANGING = qn('w:hanging')
+W_STYLE = qn('w:style')
+W_STYLE_ID = qn('w:styleId')
+W_TYPE = qn('w:type')
+W_DEFAULT = qn('w:default')
+W_BASED_ON = qn('w:basedOn')
+W_DOC_DEFAULTS = qn('w:docDefaults')
+W_RPR_DEFAULT = qn('w:rPrDefault')
+W_PPR_DEFAULT = qn('w:pPrDefault')
+A_NS = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+
+TWIPS_PER_LINE = 240
+EMU_PER_TWIP = 635
+FALSE_VALUES = ('0', 'false', 'off')
+
+
+class ParagraphFormat(NamedTuple):
+    """Paragraph properties; lengths in twips, ``line_spacing`` as a multiple of lines or a length in EMU."""
+    alignment: Optional[int] = None
+    line_spacing: Optional[float] = None
+    space_before: Optional[float] = None
+    space_after: Optional[float] = None
+    left_indent: Optional[float] = None
+    first_line_indent: Optional[float] = None
+
+
+class RunFormat(NamedTuple):
+    """Character properties; ``size`` in half-points."""
+    font: Optional[str] = None
+    size: Optional[int] = None
+    bold: Optional[bool] = None
+    italic: Optional[bool] = None
+
+
+EMPTY_PARAGRAPH_FORMAT = ParagraphFormat()
+EMPTY_RUN_FORMAT = RunFormat()
+ALIGNMENTS: Dict[str, int] = {}
+
+
+def _merge(base: tuple, override: tuple) -> tuple:
+    # Properties set on the more specific level win, unset ones (None) fall through to the base.
+    return type(base)(*(value if value is not None else inherited for inherited, value in zip(base, override)))
+
+
+def _on_off(element) -> Optional[bool]:
+    if element is None:
+        return None
+    return element.get(W_VAL) not in FALSE_VALUES
+
+
+def _twips(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _alignment(value: str) -> int:
+    if value not in ALIGNMENTS:
+        ALIGNMENTS[value] = int(WD_ALIGN_PARAGRAPH.from_xml(value))
+    return ALIGNMENTS[value]
+
+
+def read_paragraph_format(pPr) -> ParagraphFormat:
+    """The paragraph properties set directly in ``pPr``."""
+    if pPr is None:
+        return EMPTY_PARAGRAPH_FORMAT
+
+    alignment = line_spacing = space_before = space_after = left_indent = first_line_indent = None
+    jc = pPr.find(W_JC)
+    if jc is not None:
+        alignment = _alignment(jc.get(W_VAL))
+    spacing = pPr.find(W_SPACING)
+    if spacing is not None:
+        line = spacing.get(W_LINE)
+        if line is not None:
+            if spacing.get(W_LINE_RULE, 'auto') == 'auto':
+                line_spacing = int(line) / TWIPS_PER_LINE
+            else:
+                line_spacing = float(int(line) * EMU_PER_TWIP)
+        space_before = _twips(spacing.get(W_BEFORE))
+        space_after = _twips(spacing.get(W_AFTER))
+    ind = pPr.find(W_IND)
+    if ind is not None:
+        left_indent = _twips(ind.get(W_LEFT, ind.get(W_START)))
+        hanging = ind.get(W_HANGING)
+        first_line_indent = -float(hanging) if hanging is not None else _twips(ind.get(W_FIRST_LINE))
+    return ParagraphFormat(alignment, line_spacing, space_before, space_after, left_indent, first_line_indent)
+
+
+def read_run_format(rPr, theme_fonts: Dict[str, str]) -> RunFormat:
+    """The character properties set directly in ``rPr``, theme fonts replaced by their typeface."""
+    if rPr is None:
+        return EMPTY_RUN_FORMAT
+
+    font = size = bold = italic = None
+    # One pass over the children, run properties are read for every run of the document.
+    for child in rPr:
+        tag = child.tag
+        if tag == W_RFONTS:
+            # A theme font takes precedence over the explicit name next to it.
+            theme = child.get(W_ASCII_THEME)
+            font = theme_fonts.get(theme[:5]) if theme is not None else child.get(W_ASCII)
+        elif tag == W_SZ:
+            size = int(child.get(W_VAL))
+        elif tag == W_B:
+            bold = _on_off(child)
+        elif tag == W_I:
+            italic = _on_off(child)
+    return RunFormat(font, size, bold, italic)
+
+
+def read_theme_fonts(doc) -> Dict[str, str]:
+    """``{'major': typeface, 'minor': typeface}`` of the document theme's latin fonts."""
+    fonts = {}
+    for rel in doc.part.rels.values():
+        if rel.reltype == RT.THEME and not rel.is_external:
+            theme = etree.fromstring(rel.target_part.blob)
+            for kind in ('major', 'minor'):
+                latin = theme.find(f'.//{{{A_NS}}}{kind}Font/{{{A_NS}}}latin')
+                if latin is not None and latin.get('typeface'):
+                    fonts[kind] = latin.get('typeface')
+            break
+    return fonts
+
+
+class StyleResolver:
+    """Effective paragraph and run formatting, following docDefaults, the style chain and direct formatting.
+
+    python-docx only reports what is set on the element itself and returns ``None`` for
+    anything inherited. Here every style is resolved once, and every distinct
+    combination of style and direct formatting once, so looking up the formatting of
+    each run of a large document mostly costs a dictionary hit.
+    """
+
+    def __init__(self, doc):
+        self.theme_fonts = read_theme_fonts(doc)
+        self.styles = {}
+        self.default_paragraph_style = None
+        self.default_character_style = None
+        styles_element = doc.styles.element
+        for style in styles_element.iterchildren(W_STYLE):
+            style_id = style.get(W_STYLE_ID)
+            self.styles[style_id] = style
+            if style.get(W_DEFAULT) in ('1', 'true'):
+                if style.get(W_TYPE) == 'paragraph':
+                    self.default_paragraph_style = style_id
+                elif style.get(W_TYPE) == 'character':
+                    self.default_character_style = style_id
+
+        defaults = styles_element.find(W_DOC_DEFAULTS)
+        rPr = defaults.find(f'{W_RPR_DEFAULT}/{W_RPR}') if defaults is not None else None
+        pPr = defaults.find(f'{W_PPR_DEFAULT}/{W_PPR}') if defaults is not None else None
+        self.document_defaults = (read_paragraph_format(pPr), read_run_format(rPr, self.theme_fonts))
+
+        self._paragraph_styles: Dict[Optional[str], Tuple[ParagraphFormat, RunFormat]] = {}
+        self._character_styles: Dict[Optional[str], RunFormat] = {}
+        self._paragraphs: Dict[Tuple[Optional[str], ParagraphFormat], ParagraphFormat] = {}
+        self._runs: Dict[Tuple[Optional[str], Optional[str], RunFormat], RunFormat] = {}
+
+    def style_chain(self, style_id: Optional[str]) -> List:
+        """The style elements ``style_id`` inherits from, root first."""
+        chain = []
+        while style_id is not None and style_id in self.styles and len(chain) < 32:
+            style = self.styles[style_id]
+            if style in chain:
+                break
+            chain.append(style)
+            based_on = style.find(W_BASED_ON)
+            style_id = based_on.get(W_VAL) if based_on is not None else None
+        return chain[::-1]
+
+    def paragraph_style(self, style_id: Optional[str]) -> Tuple[ParagraphFormat, RunFormat]:
+        """docDefaults and paragraph style ``style_id`` (or the default one) merged together."""
+        if style_id not in self._paragraph_styles:
+            paragraph_format, run_format = self.document_defaults
+            for style in self.style_chain(style_id or self.default_paragraph_style):
+                paragraph_format = _merge(paragraph_format, read_paragraph_format(style.find(W_PPR)))
+                run_format = _merge(run_format, read_run_format(style.find(W_RPR), self.theme_fonts))
+            self._paragraph_styles[style_id] = (paragraph_format, run_format)
+        return self._paragraph_styles[style_id]
+
+    def character_style(self, style_id: Optional[str]) -> RunFormat:
+        if style_id not in self._character_styles:
+            run_format = EMPTY_RUN_FORMAT
+            for style in self.style_chain(style_id or self.default_character_style):
+                run_format = _merge(run_format, read_run_format(style.find(W_RPR), self.theme_fonts))
+            self._character_styles[style_id] = run_format
+        return self._character_styles[style_id]
+
+    @staticmethod
+    def paragraph_style_id(p) -> Optional[str]:
+        pPr = p.find(W_PPR)
+        pStyle = pPr.find(W_PSTYLE) if pPr is not None else None
+        return pStyle.get(W_VAL) if pStyle is not None else None
+
+    def paragraph(self, p) -> ParagraphFormat:
+        """Effective formatting of the ``w:p`` element ``p``."""
+        pPr = p.find(W_PPR)
+        pStyle = pPr.find(W_PSTYLE) if pPr is not None else None
+        style_id = pStyle.get(W_VAL) if pStyle is not None else None
+        key = (style_id, read_paragraph_format(pPr))
+        if key not in self._paragraphs:
+            self._paragraphs[key] = _merge(self.paragraph_style(style_id)[0], key[1])
+        return self._paragraphs[key]
+
+    def run(self, r, paragraph_style_id: Optional[str] = None) -> RunFormat:
+        """Effective formatting of the ``w:r`` element ``r`` inside a paragraph of style ``paragraph_style_id``."""
+        rPr = r.find(W_RPR)
+        rStyle = rPr.find(W_RSTYLE) if rPr is not None else None
+        style_id = rStyle.get(W_VAL) if rStyle is not None else None
+        key = (paragraph_style_id, style_id, read_run_format(rPr, self.theme_fonts))
+        if key not in self._runs:
+            run_format = _merge(self.paragraph_style(paragraph_style_id)[1], self.character_style(style_id))
+            self._runs[key] = _merge(run_format, key[2])
+        return self._runs[key]
+
+    def paragraph_runs(self, p) -> List[RunFormat]:
+        style_id = self.paragraph_style_id(p)
+        # Direct children only, like RunTable and python-docx's Paragraph.runs; runs nested in hyperlinks are left out.
+        return [self.run(r, style_id) for r in p.iterchildren(W_R)]